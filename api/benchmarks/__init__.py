@@ -0,0 +1,6 @@
+"""Benchmarks for the API.
+
+Run them from the `api` directory as modules:
+- `python -m benchmarks.run`: suite of the hot paths, compared with `baseline.json`.
+- `python -m benchmarks.bench_concurrency --help`: load test of a running API.
+"""
@@ -0,0 +1,90 @@
+"""Requests/sec of `/booking/get_week` under concurrency against a running API.
+
+Run it once against the API started with the synchronous driver and once with the
+asynchronous one, with the same MongoDB behind, and compare the results:
+
+    MONGO_DRIVER=pymongo uvicorn src.main:app --workers 1
+    python -m benchmarks.bench_concurrency --username dan --password secret
+
+    MONGO_DRIVER=motor uvicorn src.main:app --workers 1
+    python -m benchmarks.bench_concurrency --username dan --password secret
+
+The same goes for the other settings of the API, e.g. `EMBEDDED_BOOKINGS_QUERY=find` and
+`EMBEDDED_BOOKINGS_QUERY=aggregate` with `BOOKINGS_STORE=embedded`.
+
+The user must be registered in both the auth and slot booking DBs.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    headers: dict,
+    deadline: float,
+    latencies: list[float],
+    errors: list[int],
+):
+    offset = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        resp = await client.get(
+            "/booking/get_week", params={"offset": offset}, headers=headers
+        )
+        latencies.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+        # Alternate between the hot weeks, like the frontend does.
+        offset = (offset + 1) % 2
+
+
+async def run(
+    url: str, username: str, password: str, concurrency: int, duration: float
+):
+    """Fire `concurrency` clients at `get_week` for `duration` seconds."""
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        resp = await client.post(
+            "/auth/login", data={"username": username, "password": password}
+        )
+        resp.raise_for_status()
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        latencies: list[float] = []
+        errors: list[int] = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(
+                _worker(client, headers, deadline, latencies, errors)
+                for _ in range(concurrency)
+            )
+        )
+
+    latencies.sort()
+    print(f"concurrency:  {concurrency}")
+    print(f"requests:     {len(latencies)} ({len(errors)} errors)")
+    print(f"requests/sec: {len(latencies) / duration:.1f}")
+    print(f"latency p50:  {1000 * statistics.median(latencies):.1f} ms")
+    print(f"latency p99:  {1000 * latencies[int(0.99 * (len(latencies) - 1))]:.1f} ms")
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(
+        run(args.url, args.username, args.password, args.concurrency, args.duration)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Benchmarks of the full request path, with an in-process MongoDB stand-in.
+
+The API runs in-process (through the fastapi test client) on top of mongomock, so the
+timings include the routing, auth, validation, DB access and serialization, but the DB
+access costs what mongomock costs and not what a real MongoDB would.
+"""
+import contextlib
+import datetime as dt
+import itertools
+import typing as t
+from unittest import mock
+
+import fastapi as fa
+import mongomock
+from fastapi import testclient
+
+from src import config, main
+from src import slot_booking as lb
+from src.auth.utils import token as auth_token
+from src.mongodb import user_cache as m_user_cache
+from src.mongodb.models.slot_booking import booking as lb_booking
+from src.mongodb.models.slot_booking import history as lb_history
+from src.routers import auth_router
+from src.routers import slot_booking_router as lb_router
+
+from . import data
+from .harness import benchmark
+
+STORES = ("collection", "embedded")
+
+
+@contextlib.contextmanager
+def _setup_client(
+    store: str, n_residents: int, history_weeks: int = data.HISTORY_WEEKS
+) -> t.Iterator[tuple[testclient.TestClient, dict]]:
+    """Load a building in mongomock and get a client and the headers of a resident.
+
+    The configuration and the collections of the routers are restored on exit, and the
+    client is closed.
+    """
+    lb.week_occupancy_cache.clear()
+    m_user_cache.user_cache.clear()
+
+    building = data.make_building(n_residents, history_weeks=history_weeks)
+    database = mongomock.MongoClient()["dc_slot_booking"]
+    database["users"].insert_many(building.users)
+    database["bookings"].insert_many(building.bookings)
+    # After the inserts, mongomock checks the unique indexes by scanning.
+    lb_booking.Booking.create_indexes(database["bookings"])
+
+    token = auth_token.create_access_token(building.usernames[0]).access_token
+    headers = {"Authorization": f"Bearer {token}"}
+    with contextlib.ExitStack() as stack:
+        for obj, name, value in [
+            (config, "BOOKINGS_STORE", store),
+            # The collections are replaced by mongomock ones, there's no MongoDB to ping.
+            (config, "MONGO_WARMUP", False),
+            (auth_router, "user_coll", database["auth"]),
+            (lb_router, "lb_user_coll", database["users"]),
+            (lb_router, "lb_booking_coll", database["bookings"]),
+            (lb_router, "lb_week_version_coll", database["week_versions"]),
+        ]:
+            stack.enter_context(mock.patch.object(obj, name, value))
+        # Keep the event loop of the client running between requests, like a server
+        # does.
+        client = stack.enter_context(testclient.TestClient(main.app))
+        yield client, headers
+    lb.week_occupancy_cache.clear()
+    m_user_cache.user_cache.clear()
+
+
+def _check(resp):
+    assert resp.status_code == 200, resp.text
+    return resp
+
+
+@benchmark("request.get_week", params=list(itertools.product(STORES, data.RESIDENTS)))
+@contextlib.contextmanager
+def setup_get_week(param: tuple[str, int]):
+    """Get next week with nothing cached."""
+    with _setup_client(*param) as (client, headers):
+
+        def run():
+            lb.week_occupancy_cache.clear()
+            return _check(client.get("/booking/get_week?offset=1", headers=headers))
+
+        yield run
+
+
+@benchmark("request.get_week_cached", params=data.RESIDENTS)
+@contextlib.contextmanager
+def setup_get_week_cached(n_residents: int):
+    """Get next week with its occupancy cached."""
+    with _setup_client("collection", n_residents) as (client, headers):
+
+        def run():
+            return _check(client.get("/booking/get_week?offset=1", headers=headers))
+
+        yield run
+
+
+@benchmark("request.get_weeks_format", params=("default", "compact"))
+@contextlib.contextmanager
+def setup_get_weeks_format(week_format: str):
+    """Get the next 8 weeks with their occupancy cached, in the default or compact format."""
+    with _setup_client("collection", 100) as (client, headers):
+        url = f"/booking/get_weeks?count=8&format={week_format}"
+
+        def run():
+            return _check(client.get(url, headers=headers))
+
+        yield run
+
+
+@benchmark("request.get_week_not_modified", params=data.RESIDENTS)
+@contextlib.contextmanager
+def setup_get_week_not_modified(n_residents: int):
+    """Poll next week with the ETag of the last response, while nothing changes."""
+    with _setup_client("collection", n_residents) as (client, headers):
+        etag = _check(client.get("/booking/get_week?offset=1", headers=headers)).headers
+        headers = {**headers, "If-None-Match": etag["ETag"]}
+
+        def run():
+            resp = client.get("/booking/get_week?offset=1", headers=headers)
+            assert resp.status_code == 304, resp.text
+            return resp
+
+        yield run
+
+
+@benchmark("request.book_slot", params=list(itertools.product(STORES, data.RESIDENTS)))
+@contextlib.contextmanager
+def setup_book_slot(param: tuple[str, int]):
+    """Book a slot and unbook it."""
+    with _setup_client(*param) as (client, headers):
+        body = {
+            "date_str": (dt.date.today() + dt.timedelta(weeks=3)).strftime("%Y-%m-%d"),
+            "slot_id": 0,
+        }
+
+        def run():
+            _check(client.post("/booking/book_slot", json=body, headers=headers))
+            return _check(
+                client.request(
+                    "DELETE", "/booking/unbook_slot", json=body, headers=headers
+                )
+            )
+
+        yield run
+
+
+@benchmark("request.book_slots", params=list(itertools.product(STORES, data.RESIDENTS)))
+@contextlib.contextmanager
+def setup_book_slots(param: tuple[str, int]):
+    """Book the same slot for 8 weeks in a batch, and unbook them in a batch."""
+    with _setup_client(*param) as (client, headers):
+        first = dt.date.today() + dt.timedelta(weeks=3)
+        body = [
+            {
+                "date_str": (first + dt.timedelta(weeks=i)).strftime("%Y-%m-%d"),
+                "slot_id": 0,
+            }
+            for i in range(8)
+        ]
+
+        def run():
+            _check(client.post("/booking/book_slots", json=body, headers=headers))
+            return _check(
+                client.request(
+                    "DELETE", "/booking/unbook_slots", json=body, headers=headers
+                )
+            )
+
+        yield run
+
+
+@benchmark(
+    "request.get_week_embedded_query",
+    params=list(itertools.product(config.EMBEDDED_BOOKINGS_QUERIES, data.RESIDENTS)),
+)
+@contextlib.contextmanager
+def setup_get_week_embedded_query(param: tuple[str, int]):
+    """Get next week from the embedded bookings, filtered in Python or in MongoDB.
+
+    mongomock runs the aggregation pipelines in Python, way slower than MongoDB, and
+    there's no wire to save. Compare both against a real MongoDB with
+    `bench_concurrency`.
+    """
+    query, n_residents = param
+    with _setup_client("embedded", n_residents) as (client, headers), mock.patch.object(
+        config, "EMBEDDED_BOOKINGS_QUERY", query
+    ):
+
+        def run():
+            return _check(client.get("/booking/get_week?offset=1", headers=headers))
+
+        yield run
+
+
+@benchmark(
+    "request.get_week_embedded_history",
+    params=list(itertools.product(("kept", "rolled_over"), (4, 52, 520))),
+)
+@contextlib.contextmanager
+def setup_get_week_embedded_history(param: tuple[str, int]):
+    """Get next week from the embedded bookings, by weeks of booking history.
+
+    With the history rolled over, the user documents only hold the present and future
+    bookings, so the cost doesn't depend on the age of the building.
+    """
+    history, history_weeks = param
+    setup_client = _setup_client("embedded", 100, history_weeks=history_weeks)
+    with setup_client as (client, headers):
+        if history == "rolled_over":
+            lb_history.rollover(
+                user_coll=lb_router.lb_user_coll,
+                history_coll=lb_router.lb_user_coll.database["booking_history"],
+                before=dt.date.today(),
+            )
+
+        def run():
+            m_user_cache.user_cache.clear()
+            return _check(client.get("/booking/get_week?offset=1", headers=headers))
+
+        yield run
+
+
+@benchmark("request.metrics_middleware", params=("off", "on"))
+@contextlib.contextmanager
+def setup_metrics_middleware(metrics_middleware: str):
+    """Get a trivial route, to isolate the overhead of the metrics middleware."""
+    app = fa.FastAPI()
+    app.get("/")(main.hello_world)
+    if metrics_middleware == "on":
+        app.add_middleware(main.MetricsMiddleware)
+    with testclient.TestClient(app) as client:
+        yield lambda: _check(client.get("/"))
@@ -0,0 +1,158 @@
+"""Benchmarks of the slot booking logic."""
+import datetime as dt
+import itertools
+
+import fastapi as fa
+
+from src import slot_booking as lb
+from src.mongodb.models.slot_booking import booking as lb_booking
+from src.mongodb.models.slot_booking import user as lb_user
+from src.slot_booking import models as lb_m
+from src.slot_booking.utils import datetime_utils as lb_dt_u
+from src.utils import responses
+
+from . import data
+from .harness import benchmark
+
+
+@benchmark("SlotBookingManager.week", params=data.RESIDENTS)
+def setup_manager_week(n_residents: int):
+    """Build a week from the bookings of that week (bookings collection)."""
+    building = data.make_building(n_residents)
+    now = dt.datetime.now()
+    week_dates = lb_dt_u.get_week_dates(now)
+    week_bookings = [
+        lb_booking.Booking(**doc)
+        for doc in building.bookings
+        if week_dates[0].isoformat() <= doc["date"] <= week_dates[-1].isoformat()
+    ]
+    occupancy = lb_booking.get_occupancy(week_bookings)
+    by_user, by_others = lb.split_occupancy(occupancy, building.usernames[0])
+
+    def run():
+        return lb.SlotBookingManager(
+            target_datetime=now,
+            slots_booked_by_others=by_others,
+            slots_booked_by_user=by_user,
+        ).week_slots
+
+    return run
+
+
+@benchmark("SlotBookingManager.history", params=data.RESIDENTS)
+def setup_manager_history(n_residents: int):
+    """Build a week from the whole booking history (embedded bookings)."""
+    building = data.make_building(n_residents)
+    now = dt.datetime.now()
+    users = [lb_user.User(**doc) for doc in building.users]
+    by_user = users[0].get_bookings()
+    by_others: dict = {}
+    for user in users[1:]:
+        for date, slot_ids in user.get_bookings().items():
+            by_others.setdefault(date, []).extend(slot_ids)
+
+    def run():
+        return lb.SlotBookingManager(
+            target_datetime=now,
+            slots_booked_by_others=by_others,
+            slots_booked_by_user=by_user,
+        ).week_slots
+
+    return run
+
+
+@benchmark("SlotChangesHub.publish", params=(10, 100, 1000))
+def setup_slot_changes_publish(n_subscriptions: int):
+    """Push a booking to the clients subscribed to its week, and drain their queues."""
+    hub = lb.SlotChangesHub(max_queue=16)
+    week_start = lb_dt_u.get_week_start_date(dt.date.today())
+    subscriptions = [hub.subscribe(f"resident{i:05d}") for i in range(n_subscriptions)]
+    for subscription in subscriptions:
+        hub.set_weeks(subscription, [week_start])
+    # Clients of other weeks must not slow the publishing down.
+    for i in range(n_subscriptions):
+        hub.set_weeks(hub.subscribe("other"), [week_start + dt.timedelta(weeks=1)])
+
+    def run():
+        hub.publish(week_start, slot_id=0, username="resident00000")
+        for subscription in subscriptions:
+            subscription.changes.get_nowait()
+
+    return run
+
+
+@benchmark("MultiResourceSlotBookingManager.week", params=((1, 5), (20, 48)))
+def setup_multi_resource_week(param: tuple[int, int]):
+    """Build the status grid of a week of several machines, every other slot booked.
+
+    The conversion of the grid to dicts for the API isn't included, it's linear in the
+    number of slots whatever the engine.
+    """
+    n_resources, n_slots = param
+    slot_table = lb_m.make_uniform_slot_table(
+        first_start=dt.timedelta(hours=0),
+        last_end=dt.timedelta(hours=24),
+        duration=dt.timedelta(hours=24) / n_slots,
+    )
+    now = dt.datetime.now()
+    week_dates = lb_dt_u.get_week_dates(now)
+    resources = [str(i) for i in range(n_resources)]
+    by_user = {resources[0]: {week_dates[-1]: [slot_table.slot_ids[-1]]}}
+    by_others = {
+        resource: {
+            date: list(slot_table.slot_ids[i % 2 :: 2]) for date in week_dates[1:]
+        }
+        for i, resource in enumerate(resources)
+    }
+
+    def run():
+        return lb.MultiResourceSlotBookingManager(
+            target_datetime=now,
+            resources=resources,
+            slot_table=slot_table,
+            slots_booked_by_others=by_others,
+            slots_booked_by_user=by_user,
+        ).week_grid.statuses
+
+    return run
+
+
+@benchmark(
+    "week_format.encode",
+    params=list(itertools.product(("default", "compact", "compact_gzip"), (1, 8))),
+)
+def setup_week_format_encode(param: tuple[str, int]):
+    """Encode built weeks to a response body, in the default or the compact format.
+
+    The default format goes through `jsonable_encoder` and `json.dumps`, like FastAPI
+    does for the dicts returned by `get_week` and `get_weeks`.
+    """
+    week_format, n_weeks = param
+    building = data.make_building(100)
+    now = dt.datetime.now()
+    occupancy = lb_booking.get_occupancy(
+        [lb_booking.Booking(**doc) for doc in building.bookings]
+    )
+    by_user, by_others = lb.split_occupancy(occupancy, building.usernames[0])
+    managers = [
+        lb.SlotBookingManager(
+            target_datetime=now,
+            offset=offset,
+            slots_booked_by_others=by_others,
+            slots_booked_by_user=by_user,
+        )
+        for offset in range(n_weeks)
+    ]
+
+    if week_format == "default":
+        return lambda: fa.responses.JSONResponse(
+            fa.encoders.jsonable_encoder(
+                [manager.get_week_slots() for manager in managers]
+            )
+        ).body
+    gzip_min_size = 1 if week_format == "compact_gzip" else 0
+    return lambda: responses.json_response(
+        [manager.get_compact_week_slots() for manager in managers],
+        accept_encoding="gzip",
+        gzip_min_size=gzip_min_size,
+    ).body
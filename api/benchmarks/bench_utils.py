@@ -0,0 +1,80 @@
+"""Benchmarks of the date, token, metrics and rate limiting utilities."""
+import datetime as dt
+import itertools
+
+from src.auth.utils import token as auth_token
+from src.slot_booking.utils import datetime_utils as lb_dt_u
+from src.utils import metrics
+from src.utils import rate_limit as rl
+
+from .harness import benchmark
+
+
+@benchmark("datetime_utils.parse_date_from_string")
+def setup_parse_date(_):
+    """Parse a single date."""
+    return lambda: lb_dt_u.parse_date_from_string("2022-12-06")
+
+
+@benchmark("datetime_utils.get_week_dates")
+def setup_get_week_dates(_):
+    """Get the dates of a week."""
+    now = dt.datetime.now()
+    return lambda: lb_dt_u.get_week_dates(now, 1)
+
+
+@benchmark("token.create_access_token")
+def setup_create_access_token(_):
+    """Create a token."""
+    return lambda: auth_token.create_access_token("resident00000")
+
+
+@benchmark("token.decode_token")
+def setup_decode_token(_):
+    """Decode the same token over and over, like a polling client."""
+    token = auth_token.create_access_token("resident00000").access_token
+    return lambda: auth_token.decode_token(token)
+
+
+@benchmark("datetime_utils.parse_booking_map", params=(10, 100, 1000))
+def setup_parse_booking_map(size):
+    """Parse an embedded bookings map, like the ones of the users in the DB."""
+    first = dt.date(2022, 1, 1)
+    bookings = {
+        lb_dt_u.format_date_to_string(first + dt.timedelta(days=i)): i % 5
+        for i in range(size)
+    }
+    return lambda: lb_dt_u.parse_booking_map(bookings)
+
+
+@benchmark("metrics.histogram_observe")
+def setup_histogram_observe(_):
+    """Record a request duration, like the metrics middleware does for each request."""
+    histogram = metrics.Histogram("bench_seconds", "Benchmark.", ("method", "route"))
+    return lambda: histogram.observe(0.012, "GET", "/booking/get_week")
+
+
+@benchmark("metrics.render", params=(10, 100))
+def setup_render(n_routes: int):
+    """Render a histogram with a series per route."""
+    registry = metrics.Registry()
+    histogram = registry.register(
+        metrics.Histogram("bench_seconds", "Benchmark.", ("method", "route"))
+    )
+    for i in range(n_routes):
+        histogram.observe(0.012, "GET", f"/route{i}")
+    return registry.render
+
+
+@benchmark("rate_limit.token_bucket_acquire", params=("same_key", "distinct_keys"))
+def setup_token_bucket_acquire(keys: str):
+    """Limit a login, by the same client or by a flood of distinct ones (full limiter)."""
+    limiter: rl.TokenBucketLimiter[str] = rl.TokenBucketLimiter(
+        rate=1, burst=10**9, maxsize=10000
+    )
+    if keys == "same_key":
+        return lambda: limiter.acquire("10.0.0.1")
+    counter = itertools.count()
+    for _ in range(limiter.maxsize):
+        limiter.acquire(str(next(counter)))
+    return lambda: limiter.acquire(str(next(counter)))
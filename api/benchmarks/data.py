@@ -0,0 +1,71 @@
+"""Synthetic buildings to benchmark with."""
+import dataclasses
+import datetime as dt
+import random
+import typing as t
+
+from src.slot_booking import models as lb_m
+
+# Sizes of the buildings that are benchmarked, in number of residents.
+RESIDENTS = (10, 100, 1000, 10000)
+
+# Weeks of booking history of the buildings.
+HISTORY_WEEKS = 104
+
+# Fraction of the slots that are booked.
+OCCUPANCY = 0.8
+
+
+@dataclasses.dataclass
+class Building:
+    """Residents and bookings of a building."""
+
+    usernames: list[str]
+    # Documents of the "slot_booking.users" collection (with the embedded bookings).
+    users: list[dict]
+    # Documents of the "slot_booking.bookings" collection.
+    bookings: list[dict]
+
+
+def make_building(
+    n_residents: int,
+    history_weeks: int = HISTORY_WEEKS,
+    today: t.Optional[dt.date] = None,
+    seed: int = 0,
+) -> Building:
+    """Make a building whose slots are booked from `history_weeks` ago to next week.
+
+    A resident books at most one slot per date, like in the API.
+    """
+    rnd = random.Random(seed)
+    today = today or dt.date.today()
+    usernames = [f"resident{i:05d}" for i in range(n_residents)]
+    embedded: dict[str, dict[str, int]] = {username: {} for username in usernames}
+    bookings: list[dict] = []
+
+    first_date = today - dt.timedelta(weeks=history_weeks)
+    n_days = (today + dt.timedelta(weeks=2) - first_date).days
+    for n_day in range(n_days):
+        date_str = (first_date + dt.timedelta(days=n_day)).strftime("%Y-%m-%d")
+        for slot_id in lb_m.slots_hours:
+            if rnd.random() >= OCCUPANCY:
+                continue
+            username = rnd.choice(usernames)
+            if date_str in embedded[username]:
+                continue
+            embedded[username][date_str] = slot_id
+            bookings.append(
+                {"date": date_str, "slot_id": slot_id, "username": username}
+            )
+
+    users = [
+        {
+            "_id": username,
+            "appartment": 100 + i,
+            "name": username.title(),
+            "bookings": embedded[username],
+        }
+        for i, username in enumerate(usernames)
+    ]
+
+    return Building(usernames=usernames, users=users, bookings=bookings)
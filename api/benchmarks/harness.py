@@ -0,0 +1,70 @@
+"""Minimal harness to register, time and compare benchmarks."""
+import contextlib
+import dataclasses
+import time
+import timeit
+import typing as t
+
+# Number of timings of each benchmark, the best one is kept.
+REPEAT = 5
+# Minimum duration of each timing, in seconds.
+MIN_TIME = 0.1
+
+
+@dataclasses.dataclass
+class Benchmark:
+    """A benchmark, run once per parameter.
+
+    `setup(param)` prepares everything that shouldn't be timed, and returns the function
+    to time (called without arguments). It can also be a context manager that yields the
+    function, to clean up after the timings.
+    """
+
+    name: str
+    setup: t.Callable[[t.Any], t.Any]
+    params: t.Sequence[t.Any]
+
+    def prepare(self, param: t.Any) -> t.ContextManager[t.Callable[[], t.Any]]:
+        """Set up the benchmark of a parameter, and clean it up on exit."""
+        prepared = self.setup(param)
+        if isinstance(prepared, contextlib.AbstractContextManager):
+            return prepared
+        return contextlib.nullcontext(prepared)
+
+    def keys(self) -> list[str]:
+        """Get the key of the result of each parameter."""
+        return [self.key(param) for param in self.params]
+
+    def key(self, param: t.Any) -> str:
+        """Get the key of the result of a parameter."""
+        if param is None:
+            return self.name
+        if isinstance(param, tuple):
+            param = ",".join(str(value) for value in param)
+        return f"{self.name}[{param}]"
+
+
+REGISTRY: list[Benchmark] = []
+
+
+def benchmark(name: str, params: t.Sequence[t.Any] = (None,)):
+    """Decorator to register the setup function of a benchmark."""
+
+    def decorator(setup):
+        REGISTRY.append(Benchmark(name=name, setup=setup, params=params))
+        return setup
+
+    return decorator
+
+
+def measure(func: t.Callable[[], t.Any], min_time: float = MIN_TIME) -> float:
+    """Get the best time of a call to `func`, in microseconds."""
+    timer = timeit.Timer(func, timer=time.perf_counter)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [elapsed] + timer.repeat(repeat=REPEAT - 1, number=number)
+    return 1e6 * min(timings) / number
@@ -0,0 +1,59 @@
+"""Run the benchmark suite and compare it with the baseline results.
+
+    python -m benchmarks.run                 # Run everything, compare with the baseline.
+    python -m benchmarks.run -k request      # Only the benchmarks matching "request".
+    python -m benchmarks.run --save          # Also store the results as the baseline.
+
+The baseline is committed in `benchmarks/baseline.json`, so a change in performance
+shows up as a diff of that file (when run on comparable hardware).
+"""
+import argparse
+import json
+import pathlib
+
+from . import bench_requests, bench_slot_booking, bench_utils, harness  # noqa: F401
+
+BASELINE_PATH = pathlib.Path(__file__).parent / "baseline.json"
+
+# Changes (in %) below this threshold are considered noise.
+NOISE = 10.0
+
+
+def main():
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("-k", default="", help="Only run benchmarks matching this.")
+    parser.add_argument("--save", action="store_true", help="Update the baseline.")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    baseline: dict[str, float] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+
+    results: dict[str, float] = {}
+    print(f"{'benchmark':<56} {'time (us)':>12} {'baseline':>12} {'change':>8}")
+    for bench in harness.REGISTRY:
+        for param, key in zip(bench.params, bench.keys()):
+            if args.k not in key:
+                continue
+            with bench.prepare(param) as func:
+                results[key] = round(harness.measure(func), 2)
+            change = ""
+            if key in baseline:
+                pct = 100 * (results[key] - baseline[key]) / baseline[key]
+                change = f"{pct:+.0f}%" + (" !" if pct > NOISE else "")
+            print(
+                f"{key:<56} {results[key]:>12.2f} "
+                f"{baseline.get(key, float('nan')):>12.2f} {change:>8}",
+                flush=True,
+            )
+
+    if args.save:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Saved the results to {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,26 @@ This subpackage is meant to provide all the authentication functionality
 for the API (user registration and login).
 To do this, it implements the username/password flow using OAuth2.
 """
+import typing as tp
+
 from . import models as m
 from .utils import password as p
 from .utils import token as t
 
 
-def parse_new_user(username: str, password: str) -> m.ParsedNewUser:
+async def parse_new_user(username: str, password: str) -> m.ParsedNewUser:
     """Parse username and password dict.
 
     Checks validity of username and password (to be implemented) and hashes the
     password so it can be stored safely. Otherwise an error is raised.
+    The hashing runs in the password pool, so it doesn't block the event loop.
     """
     # TODO (dancab - 2023-01-08): Validate username and password fields by checking:
     # - username: length and only valid characters.
     # - password: length, only valid characters, and secure enough.
 
     # Parse new user data.
-    hashed_password = p.get_password_hash(password)
+    hashed_password = await p.get_password_hash_async(password)
 
     # Assemble new user dictionary and convert to pydantic object.
     parsed_new_user = m.ParsedNewUser(
@@ -41,22 +44,38 @@ def decode_token(token: str) -> m.TokenData:
     return token_data
 
 
-def authenticate_user(username: str, password: str, hashed_password: str) -> m.Token:
+async def authenticate_user(
+    username: str,
+    password: str,
+    hashed_password: str,
+    on_rehash: tp.Optional[tp.Callable[[str], tp.Awaitable[tp.Any]]] = None,
+) -> m.Token:
     """Authenticate a user and return Authorization bearer token.
 
+    The password is verified in the password pool, so it doesn't block the event loop.
+    If its hash has an outdated scheme or cost, it's rehashed with the current ones.
+
     Args:
         username (str): The username of the user.
         password (str): The password given for authentication.
         hashed_password (str): The hash of the password (should come from the DB).
+        on_rehash (Callable): Called with the new hash when the password is rehashed,
+            to store it.
 
     Returns:
         The Authorization bearer token.
 
     Raises:
         ValueError if the password doens't match the hash.
+        HTTPException "503 Service Unavailable" if the password pool is full.
     """
-    if not p.verify_password(password, hashed_password):
+    is_valid, new_hashed_password = await p.verify_and_update_password_async(
+        password, hashed_password
+    )
+    if not is_valid:
         raise ValueError("Invalid password.")
+    if new_hashed_password is not None and on_rehash is not None:
+        await on_rehash(new_hashed_password)
 
     token = t.create_access_token(username)
 
@@ -0,0 +1,93 @@
+"""Tests for the password utility module."""
+import asyncio
+import time
+
+import fastapi as fa
+import pytest
+
+from .. import auth
+from ..utils import password as p
+
+
+def test_password_pool_rejects_when_full():
+    """Operations beyond the workers plus the queue are rejected with a 503."""
+    pool = p.PasswordPool(kind="thread", workers=1, max_queue=1)
+
+    async def run_three():
+        return await asyncio.gather(
+            *(pool.run(time.sleep, 0.05) for _ in range(3)), return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(run_three())
+    finally:
+        pool.shutdown()
+
+    assert results[:2] == [None, None]
+    assert isinstance(results[2], fa.HTTPException)
+    assert results[2].status_code == fa.status.HTTP_503_SERVICE_UNAVAILABLE
+    stats = pool.stats()
+    assert stats["in_flight"] == 0
+    assert stats["peak_in_flight"] == 2
+    assert stats["completed"] == 2
+    assert stats["failed"] == 0
+    assert stats["rejected"] == 1
+
+
+def test_password_pool_counts_failures():
+    """An operation that raises is counted as failed, not completed."""
+    pool = p.PasswordPool(kind="thread", workers=1, max_queue=0)
+
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(pool.run(int, "not a number"))
+        assert asyncio.run(pool.run(int, "1")) == 1
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert (stats["in_flight"], stats["completed"], stats["failed"]) == (0, 1, 1)
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_password_pool_hash_and_verify(kind):
+    """Hashes computed in the pool can be verified in the pool."""
+    pool = p.PasswordPool(kind=kind, workers=2, max_queue=0)
+
+    async def hash_and_verify():
+        hashed_password = await pool.run(p.get_password_hash, "secret")
+        return await asyncio.gather(
+            pool.run(p.verify_password, "secret", hashed_password),
+            pool.run(p.verify_password, "wrong", hashed_password),
+        )
+
+    try:
+        assert asyncio.run(hash_and_verify()) == [True, False]
+    finally:
+        pool.shutdown()
+
+
+def test_rehash_on_login(monkeypatch):
+    """Hashes of another scheme or cost are rehashed with the current ones on login."""
+    monkeypatch.setattr(p, "pwd_context", p.make_context("bcrypt", 5))
+    outdated_hashes = [
+        p.make_context("bcrypt", 4).hash("secret"),
+        p.make_context("pbkdf2_sha256", 1000).hash("secret"),
+    ]
+    for outdated_hash in outdated_hashes:
+        is_valid, new_hash = p.verify_and_update_password("secret", outdated_hash)
+        assert is_valid and new_hash.startswith("$2b$05$")
+        assert p.verify_and_update_password("secret", new_hash) == (True, None)
+        assert p.verify_and_update_password("wrong", outdated_hash) == (False, None)
+
+    stored_hashes = []
+
+    async def store_hash(hashed_password: str):
+        stored_hashes.append(hashed_password)
+
+    token = asyncio.run(
+        auth.authenticate_user("dan", "secret", outdated_hashes[0], store_hash)
+    )
+    assert token.access_token
+    assert len(stored_hashes) == 1
+    assert p.pwd_context.verify("secret", stored_hashes[0])
@@ -0,0 +1,32 @@
+"""Tests for the token utility module."""
+import datetime as dt
+
+import fastapi as fa
+import pytest
+
+from ..utils import token as t
+
+
+def test_decode_token_is_cached():
+    """Decoding the same token again is served from the cache."""
+    t.token_cache.clear()
+    token = t.create_access_token("dan").access_token
+
+    first = t.decode_token(token)
+    second = t.decode_token(token)
+
+    assert first.username == second.username == "dan"
+    stats = t.token_cache.stats()
+    assert (stats["hits"], stats["size"]) == (1, 1)
+
+
+def test_decode_token_expired_is_not_cached():
+    """An expired token is rejected and not cached."""
+    t.token_cache.clear()
+    token = t.create_access_token("dan", expires_delta=dt.timedelta(seconds=-1))
+
+    with pytest.raises(fa.HTTPException) as exc_info:
+        t.decode_token(token.access_token)
+
+    assert exc_info.value.status_code == fa.status.HTTP_401_UNAUTHORIZED
+    assert len(t.token_cache) == 0
@@ -0,0 +1,91 @@
+"""Admission control of the logins."""
+import contextlib
+import math
+import typing as t
+
+import fastapi as fa
+
+from src import config
+from src.utils import metrics
+from src.utils import rate_limit as rl
+
+rejected_logins = metrics.register(
+    metrics.Counter(
+        "login_rejected_total",
+        "Logins rejected before verifying the password, by reason.",
+        ("reason",),
+    )
+)
+
+
+def _make_bucket(
+    rate_per_minute: float, burst: int
+) -> t.Optional[rl.TokenBucketLimiter]:
+    if rate_per_minute <= 0:
+        return None
+    return rl.TokenBucketLimiter(
+        rate=rate_per_minute / 60, burst=burst, maxsize=config.LOGIN_LIMITER_SIZE
+    )
+
+
+ip_limiter = _make_bucket(config.LOGIN_IP_RATE_PER_MINUTE, config.LOGIN_IP_BURST)
+username_limiter = _make_bucket(
+    config.LOGIN_USERNAME_RATE_PER_MINUTE, config.LOGIN_USERNAME_BURST
+)
+verifications = (
+    rl.ConcurrencyLimiter(config.LOGIN_MAX_VERIFICATIONS)
+    if config.LOGIN_MAX_VERIFICATIONS > 0
+    else None
+)
+
+
+def _too_many_logins(reason: str, retry_after: float) -> fa.HTTPException:
+    rejected_logins.inc(reason)
+    return fa.HTTPException(
+        status_code=fa.status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts, please retry later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def check_rate(client_ip: t.Optional[str], username: str):
+    """Take a login attempt from the buckets of the client IP and of the username.
+
+    Raises:
+        HTTPException "429 Too Many Requests" if any of the buckets is empty.
+    """
+    if ip_limiter is not None and client_ip is not None:
+        retry_after = ip_limiter.acquire(client_ip)
+        if retry_after:
+            raise _too_many_logins("ip", retry_after)
+    if username_limiter is not None:
+        retry_after = username_limiter.acquire(username)
+        if retry_after:
+            raise _too_many_logins("username", retry_after)
+
+
+@contextlib.contextmanager
+def verification_slot() -> t.Iterator[None]:
+    """Hold one of the password verifications allowed at the same time.
+
+    Raises:
+        HTTPException "429 Too Many Requests" if they're all in progress.
+    """
+    if verifications is None:
+        yield
+        return
+    if not verifications.try_acquire():
+        raise _too_many_logins("verifications", 1)
+    try:
+        yield
+    finally:
+        verifications.release()
+
+
+def stats() -> dict:
+    """Get the statistics of the login limiters."""
+    return {
+        "ip": ip_limiter.stats() if ip_limiter is not None else None,
+        "username": username_limiter.stats() if username_limiter is not None else None,
+        "verifications": verifications.stats() if verifications is not None else None,
+    }
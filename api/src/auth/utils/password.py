@@ -1,8 +1,55 @@
 """Password utility module."""
 
+import asyncio
+import concurrent.futures as cf
+import time
+import typing as t
+
+import fastapi as fa
 import passlib.context as pc
+import passlib.registry as pr
+
+from src import config
+from src.utils import metrics
+
+
+def make_context(scheme: str, rounds: int = 0) -> pc.CryptContext:
+    """Make a context that hashes with a scheme and cost, and verifies any scheme.
+
+    The hashes of the other schemes or costs need an update.
+    """
+    other_schemes = [other for other in config.PASSWORD_HASH_SCHEMES if other != scheme]
+    settings = {f"{scheme}__rounds": rounds} if rounds else {}
+    return pc.CryptContext(
+        schemes=[scheme, *other_schemes],
+        default=scheme,
+        deprecated="auto",
+        **settings,
+    )
 
-pwd_context = pc.CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+pwd_context = make_context(config.PASSWORD_HASH_SCHEME, config.PASSWORD_HASH_ROUNDS)
+
+pool_full_exception = fa.HTTPException(
+    status_code=fa.status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many password operations in progress, please retry later.",
+    headers={"Retry-After": "1"},
+)
+
+hash_duration = metrics.register(
+    metrics.Histogram(
+        "password_hash_duration_seconds",
+        "Duration of the password hashing and verification in the pool workers.",
+        ("operation",),
+    )
+)
+pool_wait_duration = metrics.register(
+    metrics.Histogram(
+        "password_pool_wait_seconds",
+        "Time the password operations waited for a worker of the pool.",
+        ("operation",),
+    )
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -15,3 +62,173 @@ def get_password_hash(password: str) -> str:
     """Given a password, returns the corresponding hash."""
     result: str = pwd_context.hash(password)
     return result
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, t.Optional[str]]:
+    """Verifies a password, and rehashes it if its hash has an outdated scheme or cost.
+
+    Returns:
+        If the password matches, and its new hash if it needs an update (or None).
+    """
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+
+def calibrate_rounds(
+    scheme: str, target_seconds: float, samples: int = 3
+) -> tuple[int, float]:
+    """Find the cost of a scheme whose verification takes about the target time.
+
+    The cost of bcrypt is exponential (rounds is the log2 of the iterations), so the
+    rounds are increased one by one while a verification stays under the target. The
+    cost of pbkdf2 is linear in the rounds, so they're extrapolated from the time of the
+    default ones.
+
+    Returns:
+        The rounds, and the seconds a verification takes with them (the fastest of
+        `samples` verifications).
+    """
+    handler = pr.get_crypt_handler(scheme)
+
+    def measure(rounds: int) -> float:
+        context = make_context(scheme, rounds)
+        hashed_password = context.hash("calibration")
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            context.verify("calibration", hashed_password)
+            durations.append(time.perf_counter() - start)
+        return min(durations)
+
+    if handler.rounds_cost == "log2":
+        rounds = handler.min_rounds
+        while rounds < handler.max_rounds and measure(rounds + 1) <= target_seconds:
+            rounds += 1
+    else:
+        # Extrapolated from the default rounds, then corrected once.
+        rounds = handler.default_rounds
+        for _ in range(2):
+            rounds = int(rounds * target_seconds / measure(rounds))
+            rounds = max(handler.min_rounds, min(rounds, handler.max_rounds or rounds))
+    return rounds, measure(rounds)
+
+
+def _timed_call(func: t.Callable[..., t.Any], *args: t.Any) -> tuple[t.Any, float]:
+    # Runs in the worker, so the time waiting for the worker isn't counted.
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordPool:
+    """Bounded pool of workers to run the password hashing off the event loop.
+
+    Hashing a password with bcrypt takes a few hundred milliseconds of CPU, during
+    which the event loop would be frozen. The pool runs them in threads or processes,
+    and accepts at most `workers + max_queue` of them at the same time: any other one
+    is rejected right away with a "503 Service Unavailable".
+    """
+
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor: t.Optional[cf.Executor] = None
+        # Counters for the saturation metrics.
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def get_executor(self) -> cf.Executor:
+        """Get the executor, creating it on first use."""
+        if self.executor is None:
+            if self.kind == "process":
+                self.executor = cf.ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self.executor = cf.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password"
+                )
+        return self.executor
+
+    def shutdown(self):
+        """Shutdown the executor if it was created."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def run(self, func: t.Callable[..., t.Any], *args: t.Any) -> t.Any:
+        """Run `func(*args)` in the pool, or raise a 503 if the pool is full."""
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise pool_full_exception
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            result, duration = await loop.run_in_executor(
+                self.get_executor(), _timed_call, func, *args
+            )
+        except BaseException:
+            # Cancelled too, e.g. when the client disconnects.
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        hash_duration.observe(duration, func.__name__)
+        pool_wait_duration.observe(
+            time.perf_counter() - start - duration, func.__name__
+        )
+        return result
+
+    def stats(self) -> dict:
+        """Get the saturation metrics of the pool."""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.workers),
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+pool = PasswordPool(
+    kind=config.PASSWORD_POOL_KIND,
+    workers=config.PASSWORD_POOL_WORKERS,
+    max_queue=config.PASSWORD_POOL_MAX_QUEUE,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifies if a password matches the stored hash, in the password pool."""
+    result: bool = await pool.run(verify_password, plain_password, hashed_password)
+    return result
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, t.Optional[str]]:
+    """Verifies a password and rehashes it if outdated, in the password pool."""
+    result: tuple[bool, t.Optional[str]] = await pool.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+    return result
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Given a password, returns the corresponding hash, computed in the password pool."""
+    result: str = await pool.run(get_password_hash, password)
+    return result
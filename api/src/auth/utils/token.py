@@ -1,18 +1,37 @@
 """Token utility module."""
 
 import datetime as dt
+import time
 from typing import Optional
 
 import fastapi as fa
 import jose
 from jose import jwt
 
+from src import config
+from src.utils import cache, metrics
+
 from .. import models as m
 
 SECRET_KEY = "8331c1ea34b83cb53c33687503402982cf86a54e0efccfaf588fa9e3cb545eb2"
 ALGORITHM = "HS256"
 DEFAULT_EXPIRES_DELTA = dt.timedelta(minutes=30)
 
+# Tokens whose signature was already verified, so clients polling with the same token
+# skip the verification. Each token is only kept until it expires.
+token_cache: cache.TTLCache[str, m.TokenData] = cache.TTLCache(
+    maxsize=config.TOKEN_CACHE_SIZE, ttl=DEFAULT_EXPIRES_DELTA.total_seconds()
+)
+
+jwt_duration = metrics.register(
+    metrics.Histogram(
+        "jwt_duration_seconds",
+        "Duration of the signing and verification of the tokens.",
+        ("operation",),
+        buckets=metrics.FAST_BUCKETS,
+    )
+)
+
 credentials_exception = fa.HTTPException(
     status_code=fa.status.HTTP_401_UNAUTHORIZED,
     detail="Could not validate credentials",
@@ -28,7 +47,8 @@ def create_access_token(
 
     to_encode = m.TokenCreate(sub=username, exp=expire)
 
-    encoded_jwt: str = jwt.encode(to_encode.dict(), SECRET_KEY, algorithm=ALGORITHM)
+    with jwt_duration.time("encode"):
+        encoded_jwt: str = jwt.encode(to_encode.dict(), SECRET_KEY, algorithm=ALGORITHM)
 
     token = m.Token(token_type="Bearer", access_token=encoded_jwt, expiration=expire)
 
@@ -39,7 +59,8 @@ def decode_token(token: str) -> m.TokenData:
     """Decodes a bearer token to get the username.
 
     The bearer token is decoded using `jwt.decode` and the username
-    is extracted and returned in a TokenData object.
+    is extracted and returned in a TokenData object. The result is cached until the
+    token expires, so decoding the same token again skips the verification.
 
     Args:
         token (str): A bearer token.
@@ -53,8 +74,13 @@ def decode_token(token: str) -> m.TokenData:
             `jose.JWTError` occurs or if the username is not within the
             token under the key "sub".
     """
+    token_data = token_cache.get(token)
+    if token_data is not cache.MISSING:
+        return token_data
+
     try:
-        payload: dict = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with jwt_duration.time("decode"):
+            payload: dict = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
         sub = payload.get("sub")
         exp = payload.get("exp")
@@ -68,4 +94,5 @@ def decode_token(token: str) -> m.TokenData:
     except jose.JWTError as exc:
         raise credentials_exception from exc
     else:
+        token_cache.set(token, token_data, ttl=min(exp - time.time(), token_cache.ttl))
         return token_data
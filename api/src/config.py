@@ -0,0 +1,177 @@
+"""Configuration of the API, taken from environment variables."""
+import os
+import tempfile
+
+# Where the occupancy of a week is read from:
+# - "collection": the indexed "slot_booking.bookings" collection (one document per
+#   booked slot).
+# - "embedded": the legacy `bookings` map embedded in each "slot_booking.users" document.
+BOOKINGS_STORE = os.environ.get("BOOKINGS_STORE", "collection")
+BOOKINGS_STORES = ("collection", "embedded")
+
+if BOOKINGS_STORE not in BOOKINGS_STORES:
+    raise ValueError(
+        f"Invalid BOOKINGS_STORE '{BOOKINGS_STORE}', use one of {BOOKINGS_STORES}."
+    )
+
+# Connection pool of the MongoDB client, created on the startup of the app (see the
+# pymongo docs of `MongoClient` for each option):
+# - max/min pool size: connections kept per server, the min ones are opened right away.
+# - max idle time: milliseconds after which an idle connection is closed.
+# - timeouts in milliseconds: to connect, to wait for a reply, to find a suitable server
+#   (it bounds how long requests hang when MongoDB is down), and to wait for a free
+#   connection of the pool (0 to wait forever).
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "0"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+
+# Ping MongoDB on startup, so the first requests don't pay for the server selection and
+# the first connection, and an unreachable MongoDB fails the startup right away.
+MONGO_WARMUP = os.environ.get("MONGO_WARMUP", "1") == "1"
+
+# How the bookings of the other users are read with the "embedded" store:
+# - "find": the whole `bookings` map of every user is sent, and filtered in Python.
+# - "aggregate": an aggregation pipeline filters the maps in MongoDB, and only sends the
+#   (date, slot) pairs of the requested weeks.
+EMBEDDED_BOOKINGS_QUERY = os.environ.get("EMBEDDED_BOOKINGS_QUERY", "find")
+EMBEDDED_BOOKINGS_QUERIES = ("find", "aggregate")
+
+if EMBEDDED_BOOKINGS_QUERY not in EMBEDDED_BOOKINGS_QUERIES:
+    raise ValueError(
+        f"Invalid EMBEDDED_BOOKINGS_QUERY '{EMBEDDED_BOOKINGS_QUERY}', "
+        f"use one of {EMBEDDED_BOOKINGS_QUERIES}."
+    )
+
+# MongoDB driver used by the routers:
+# - "pymongo": synchronous driver, each DB round trip blocks the event loop.
+# - "motor": asynchronous driver, concurrent requests overlap their DB round trips.
+MONGO_DRIVER = os.environ.get("MONGO_DRIVER", "pymongo")
+MONGO_DRIVERS = ("pymongo", "motor")
+
+if MONGO_DRIVER not in MONGO_DRIVERS:
+    raise ValueError(
+        f"Invalid MONGO_DRIVER '{MONGO_DRIVER}', use one of {MONGO_DRIVERS}."
+    )
+
+# Pool that runs the bcrypt hashing and verification off the event loop:
+# - kind: "thread" (bcrypt releases the GIL) or "process".
+# - workers: number of hashes computed in parallel.
+# - max queue: number of hashes waiting for a worker, beyond that requests get a 503.
+PASSWORD_POOL_KIND = os.environ.get("PASSWORD_POOL_KIND", "thread")
+PASSWORD_POOL_KINDS = ("thread", "process")
+PASSWORD_POOL_WORKERS = int(
+    os.environ.get("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_POOL_MAX_QUEUE = int(os.environ.get("PASSWORD_POOL_MAX_QUEUE", "32"))
+
+if PASSWORD_POOL_KIND not in PASSWORD_POOL_KINDS:
+    raise ValueError(
+        f"Invalid PASSWORD_POOL_KIND '{PASSWORD_POOL_KIND}', "
+        f"use one of {PASSWORD_POOL_KINDS}."
+    )
+
+# Hashing of the passwords:
+# - scheme: the passlib scheme of the new hashes. The hashes of the other schemes can
+#   still be verified.
+# - rounds: the cost of the new hashes, in the unit of the scheme (the log2 of the
+#   iterations for bcrypt, the iterations for pbkdf2_sha256), 0 for the passlib default.
+#   `python -m src.scripts.calibrate_password_hash` picks it for a target login latency.
+# The stored hashes of another scheme or cost are rehashed when their users log in.
+PASSWORD_HASH_SCHEME = os.environ.get("PASSWORD_HASH_SCHEME", "bcrypt")
+PASSWORD_HASH_SCHEMES = ("bcrypt", "pbkdf2_sha256")
+PASSWORD_HASH_ROUNDS = int(os.environ.get("PASSWORD_HASH_ROUNDS", "0"))
+
+if PASSWORD_HASH_SCHEME not in PASSWORD_HASH_SCHEMES:
+    raise ValueError(
+        f"Invalid PASSWORD_HASH_SCHEME '{PASSWORD_HASH_SCHEME}', "
+        f"use one of {PASSWORD_HASH_SCHEMES}."
+    )
+
+# Admission control of the logins, checked before the user is fetched and its password
+# verified (the most expensive route, with bcrypt). Rejected logins get a "429 Too Many
+# Requests" with a Retry-After:
+# - token buckets per client IP and per username: sustained attempts per minute and
+#   burst of attempts at once, a rate of 0 disables the bucket. Each bucket keeps at most
+#   LOGIN_LIMITER_SIZE keys, the client IP is the one seen by uvicorn (see its
+#   `--proxy-headers` option behind a proxy).
+# - max verifications: password verifications in progress at the same time, so a burst
+#   of logins can't fill the password pool (0 to not limit them beyond the pool).
+LOGIN_IP_RATE_PER_MINUTE = float(os.environ.get("LOGIN_IP_RATE_PER_MINUTE", "30"))
+LOGIN_IP_BURST = int(os.environ.get("LOGIN_IP_BURST", "10"))
+LOGIN_USERNAME_RATE_PER_MINUTE = float(
+    os.environ.get("LOGIN_USERNAME_RATE_PER_MINUTE", "10")
+)
+LOGIN_USERNAME_BURST = int(os.environ.get("LOGIN_USERNAME_BURST", "5"))
+LOGIN_LIMITER_SIZE = int(os.environ.get("LOGIN_LIMITER_SIZE", "10000"))
+LOGIN_MAX_VERIFICATIONS = int(
+    os.environ.get("LOGIN_MAX_VERIFICATIONS", str(2 * PASSWORD_POOL_WORKERS))
+)
+
+# Compact responses of `get_week` and `get_weeks` (asked for with `?format=compact` or
+# the compact media type in "Accept"): bytes from which they're gzip-compressed, when
+# the client accepts it (0 to never compress them).
+COMPACT_GZIP_MIN_SIZE = int(os.environ.get("COMPACT_GZIP_MIN_SIZE", "1024"))
+
+# Cache of the occupancy of the weeks (only used with the "collection" bookings store):
+# number of weeks kept in memory and seconds they are kept for. The TTL bounds how stale
+# a week can be when it's changed by another worker and the invalidation is lost (or
+# the invalidation bus is "inprocess").
+WEEK_CACHE_SIZE = int(os.environ.get("WEEK_CACHE_SIZE", "16"))
+WEEK_CACHE_TTL = float(os.environ.get("WEEK_CACHE_TTL", "30"))
+
+# Cache of the user profiles (shared by the Auth and the Slot Booking users): maximum
+# number of profiles kept, and seconds they are kept for. The TTL bounds how stale a
+# profile can be when it's changed and the invalidation is lost.
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+
+# Cache of already verified bearer tokens: maximum number of tokens kept. Each one is
+# kept until it expires.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "1024"))
+
+# Live slot changes pushed over a websocket: number of changes queued for each client,
+# a client that falls further behind gets a full snapshot of its weeks instead.
+SLOT_CHANGES_QUEUE_SIZE = int(os.environ.get("SLOT_CHANGES_QUEUE_SIZE", "256"))
+
+# Bus that tells every worker to invalidate its in-memory caches after a write:
+# - "inprocess": a single worker, the caches are only invalidated in place.
+# - "ipc": workers on the same host, through unix datagram sockets in INVALIDATION_BUS_DIR.
+# - "change_stream": workers on any host, through a MongoDB change stream (it needs a
+#   replica set).
+INVALIDATION_BUS = os.environ.get("INVALIDATION_BUS", "inprocess")
+INVALIDATION_BUSES = ("inprocess", "ipc", "change_stream")
+INVALIDATION_BUS_DIR = os.environ.get(
+    "INVALIDATION_BUS_DIR", os.path.join(tempfile.gettempdir(), "dc_slot_booking_bus")
+)
+
+if INVALIDATION_BUS not in INVALIDATION_BUSES:
+    raise ValueError(
+        f"Invalid INVALIDATION_BUS '{INVALIDATION_BUS}', use one of {INVALIDATION_BUSES}."
+    )
+
+# Metrics exposed on /metrics in the Prometheus text format: latency of the requests by
+# route, duration of the MongoDB commands, and of the password and token operations.
+# When disabled, the requests and the MongoDB commands aren't timed at all.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+# Profiling of the requests with cProfile, written to PROFILING_DIR (only the latest
+# PROFILING_MAX_PROFILES are kept) and summarized on /stats/profiles:
+# - sample rate: fraction of the requests profiled, 0 to only profile on demand.
+# - header token: a request with the header "X-Profile-Token: <token>" is profiled
+#   whatever the sample rate, empty to disable it. /stats/profiles also requires it.
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_HEADER_TOKEN = os.environ.get("PROFILING_HEADER_TOKEN", "")
+PROFILING_DIR = os.environ.get(
+    "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "dc_slot_booking_profiles")
+)
+PROFILING_MAX_PROFILES = int(os.environ.get("PROFILING_MAX_PROFILES", "100"))
+
+# Days the past bookings are kept in the booking history after their rollover out of
+# the user documents (see `src.scripts.rollover_history`), 0 to keep them forever.
+BOOKING_HISTORY_TTL_DAYS = int(os.environ.get("BOOKING_HISTORY_TTL_DAYS", "0"))
@@ -0,0 +1,31 @@
+"""Fixtures shared by the tests of all the packages."""
+import uuid
+
+import pymongo as pym
+import pymongo.errors as pym_err
+import pytest
+
+from src.mongodb import mongodb
+
+
+@pytest.fixture(name="db_name")
+def fixture_db_name():
+    """Name of a throwaway database in the real MongoDB, dropped after the test.
+
+    The test is skipped unless MONGO_HOST (and MONGO_USER/MONGO_PASS) point to a
+    reachable MongoDB.
+    """
+    if mongodb.HOST is None:
+        pytest.skip("MONGO_HOST is not set.")
+    client: pym.MongoClient = pym.MongoClient(
+        mongodb.URI, serverSelectionTimeoutMS=1000
+    )
+    try:
+        client.admin.command("ping")
+    except pym_err.PyMongoError:
+        pytest.skip("MongoDB is not reachable.")
+
+    db_name = f"dc_slot_booking_test_{uuid.uuid4().hex[:8]}"
+    yield db_name
+    client.drop_database(db_name)
+    client.close()
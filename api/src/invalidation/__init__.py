@@ -0,0 +1,34 @@
+"""Package for the invalidation of the in-memory caches of all the workers."""
+from src import config, mongodb
+
+from .change_stream import ChangeStreamBackend
+from .ipc import UnixSocketBackend
+from .pubsub import Backend, InvalidationBus
+
+# Topics of the messages, with their payloads:
+# - The bookings of the week of a date changed: {"date": "YYYY-MM-DD"}.
+WEEK = "week"
+# - A slot was booked by a user, or unbooked if the username is None:
+#   {"date": "YYYY-MM-DD", "slot_id": int, "username": str | None}.
+SLOT = "slot"
+# - The Slot Booking data of a user changed: {"username": str}.
+LB_USER = "lb_user"
+# - The Auth data of a user changed: {"username": str}.
+AUTH_USER = "auth_user"
+
+
+def get_backend(name: str) -> Backend:
+    """Get the backend of the invalidation bus by its name."""
+    if name == "ipc":
+        return UnixSocketBackend(directory=config.INVALIDATION_BUS_DIR)
+    if name == "change_stream":
+        return ChangeStreamBackend(
+            get_coll=lambda: mongodb.mongo_db_conn.get_coll(
+                db_name="dc_slot_booking", coll_name="invalidations"
+            ),
+            is_async=mongodb.IS_ASYNC,
+        )
+    return Backend()
+
+
+bus = InvalidationBus(backend=get_backend(config.INVALIDATION_BUS))
@@ -0,0 +1,146 @@
+"""Backend of the invalidation bus for workers on any host, through MongoDB.
+
+Each message is inserted in a collection, and every worker watches the inserts with a
+change stream (so MongoDB must run as a replica set). The messages expire after a while
+thanks to a TTL index, they're only needed while being delivered.
+
+If the change stream fails, the messages inserted until it's opened again are missed, so
+the bus is reset and the stream is opened again after a delay.
+"""
+import asyncio
+import datetime as dt
+import threading
+import typing as t
+
+import pymongo as pym
+import pymongo.collection as pym_coll
+import pymongo.errors as pym_err
+from motor import motor_asyncio as mot
+
+from . import pubsub
+
+# Seconds after which the messages are removed from the collection.
+MESSAGE_TTL = 300
+
+# Seconds to wait before opening the change stream again after a failure.
+RETRY_DELAY = 1.0
+
+# Milliseconds the sync driver waits for changes before checking if it must stop.
+MAX_AWAIT_TIME_MS = 1000
+
+PIPELINE = [{"$match": {"operationType": "insert"}}]
+
+Collection = t.Union[pym_coll.Collection, mot.AsyncIOMotorCollection]
+
+
+class ChangeStreamBackend(pubsub.Backend):
+    """Send the messages through a collection watched by every worker."""
+
+    name = "change_stream"
+
+    def __init__(
+        self,
+        get_coll: t.Callable[[], Collection],
+        is_async: bool,
+    ):
+        # The collection is only got when the bus starts, once MongoDB is connected.
+        self.get_coll = get_coll
+        self.coll: t.Optional[Collection] = None
+        self.is_async = is_async
+        self._task: t.Optional[asyncio.Task] = None
+        self._thread: t.Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # Counters for the statistics.
+        self.failures = 0
+
+    def _indexes(self) -> list[pym.IndexModel]:
+        return [
+            pym.IndexModel(
+                [("created_at", pym.ASCENDING)], expireAfterSeconds=MESSAGE_TTL
+            )
+        ]
+
+    async def start(
+        self, receive: t.Callable[[dict], None], reset: pubsub.ResetHandler
+    ):
+        """Open the change stream, and keep reading from it in the background.
+
+        The first stream is opened right away, so a MongoDB that doesn't support change
+        streams fails the startup instead of resetting the bus over and over.
+        """
+        self._stopped.clear()
+        self.coll = self.get_coll()
+        if self.is_async:
+            await self.coll.create_indexes(self._indexes())
+            stream = self.coll.watch(PIPELINE)
+            # Motor opens the stream on the first read.
+            change = await stream.try_next()
+            if change is not None:
+                receive(change["fullDocument"])
+            self._task = asyncio.create_task(self._watch_async(stream, receive, reset))
+        else:
+            self.coll.create_indexes(self._indexes())
+            stream = self.coll.watch(PIPELINE, max_await_time_ms=MAX_AWAIT_TIME_MS)
+            loop = asyncio.get_running_loop()
+            self._thread = threading.Thread(
+                target=self._watch,
+                args=(stream, loop, receive, reset),
+                name="invalidation-bus",
+                daemon=True,
+            )
+            self._thread.start()
+
+    async def stop(self):
+        """Stop reading from the change stream."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+            self._thread = None
+
+    async def _watch_async(self, stream, receive, reset):
+        while True:
+            try:
+                async with stream:
+                    async for change in stream:
+                        receive(change["fullDocument"])
+            except pym_err.PyMongoError:
+                self.failures += 1
+                reset()
+                await asyncio.sleep(RETRY_DELAY)
+                stream = self.coll.watch(PIPELINE)
+
+    def _watch(self, stream, loop: asyncio.AbstractEventLoop, receive, reset):
+        # Runs in a thread, the messages are handled in the event loop.
+        while not self._stopped.is_set():
+            try:
+                if stream is None:
+                    stream = self.coll.watch(
+                        PIPELINE, max_await_time_ms=MAX_AWAIT_TIME_MS
+                    )
+                with stream:
+                    while not self._stopped.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            loop.call_soon_threadsafe(receive, change["fullDocument"])
+            except pym_err.PyMongoError:
+                self.failures += 1
+                loop.call_soon_threadsafe(reset)
+                self._stopped.wait(RETRY_DELAY)
+            stream = None
+
+    async def send(self, message: dict):
+        """Insert a message in the watched collection."""
+        doc = {**message, "created_at": dt.datetime.utcnow()}
+        if self.coll is None:
+            self.coll = self.get_coll()
+        if self.is_async:
+            await self.coll.insert_one(doc)
+        else:
+            self.coll.insert_one(doc)
+
+    def stats(self) -> dict:
+        """Get the statistics of the backend."""
+        return {"failures": self.failures}
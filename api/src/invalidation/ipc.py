@@ -0,0 +1,93 @@
+"""Backend of the invalidation bus for workers on the same host.
+
+Each worker binds a unix datagram socket in a shared directory, and sends each message
+to the sockets of all the other workers found there. A datagram is delivered right away
+or not at all, so there's no broker to run: sockets of workers that are gone are removed
+when sending to them fails, and a message to a worker that doesn't keep up is dropped
+(its caches are then only refreshed when their entries expire).
+"""
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import typing as t
+import uuid
+
+from . import pubsub
+
+# Size of the receive buffer, way larger than any message.
+MAX_MESSAGE_SIZE = 65536
+
+SOCKET_SUFFIX = ".sock"
+
+
+class UnixSocketBackend(pubsub.Backend):
+    """Send the messages through unix datagram sockets in a directory."""
+
+    name = "ipc"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path: t.Optional[str] = None
+        self.sock: t.Optional[socket.socket] = None
+        # Counters for the statistics.
+        self.sent = 0
+        self.dropped = 0
+
+    async def start(
+        self, receive: t.Callable[[dict], None], reset: pubsub.ResetHandler
+    ):
+        """Bind the socket of this worker and start reading from it."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(
+            self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}{SOCKET_SUFFIX}"
+        )
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(self.path)
+        asyncio.get_running_loop().add_reader(
+            self.sock.fileno(), self._read_messages, receive
+        )
+
+    async def stop(self):
+        """Stop reading, and remove the socket of this worker."""
+        if self.sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(t.cast(str, self.path))
+
+    def _read_messages(self, receive: t.Callable[[dict], None]):
+        while self.sock is not None:
+            try:
+                data = self.sock.recv(MAX_MESSAGE_SIZE)
+            except BlockingIOError:
+                return
+            receive(json.loads(data))
+
+    async def send(self, message: dict):
+        """Send a message to the socket of every other worker."""
+        if self.sock is None:
+            return
+        data = json.dumps(message).encode()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(SOCKET_SUFFIX) or entry.path == self.path:
+                continue
+            try:
+                self.sock.sendto(data, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Nobody reads from that socket anymore, the worker is gone.
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(entry.path)
+            except BlockingIOError:
+                # The buffer of the socket of that worker is full.
+                self.dropped += 1
+            else:
+                self.sent += 1
+
+    def stats(self) -> dict:
+        """Get the statistics of the backend."""
+        return {"sent": self.sent, "dropped": self.dropped}
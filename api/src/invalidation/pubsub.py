@@ -0,0 +1,112 @@
+"""Bus that spreads the invalidations of the in-memory caches to all the workers.
+
+The writes publish a message with a topic (e.g. "week") and a JSON payload (e.g. the
+date that changed). The message is handled right away by the handlers subscribed in
+the same worker, and sent through the backend to the other workers, that handle it when
+they receive it.
+
+When a backend can't tell if messages were lost (e.g. the connection to the DB was
+lost), it resets the bus, which runs the reset handlers (that clear the caches).
+"""
+import logging
+import typing as t
+import uuid
+
+logger = logging.getLogger(__name__)
+
+Handler = t.Callable[[dict], None]
+ResetHandler = t.Callable[[], None]
+
+
+class Backend:
+    """In-process backend: there are no other workers to send the messages to.
+
+    Other backends override `start`, `stop` and `send`.
+    """
+
+    name = "inprocess"
+
+    async def start(
+        self, receive: t.Callable[[dict], None], reset: ResetHandler
+    ):  # pylint: disable=unused-argument
+        """Start receiving the messages of the other workers."""
+
+    async def stop(self):
+        """Stop receiving messages."""
+
+    async def send(self, message: dict):  # pylint: disable=unused-argument
+        """Send a message to the other workers."""
+
+    def stats(self) -> dict:
+        """Get the statistics of the backend."""
+        return {}
+
+
+class InvalidationBus:
+    """Publish and subscribe to invalidations of the caches of all the workers."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        # Messages published by this worker come back from some backends.
+        self.worker_id = uuid.uuid4().hex
+        self._handlers: dict[str, list[Handler]] = {}
+        self._reset_handlers: list[ResetHandler] = []
+        # Counters for the statistics.
+        self.published = 0
+        self.received = 0
+        self.resets = 0
+
+    def subscribe(self, topic: str, handler: Handler):
+        """Call `handler(payload)` on every message of a topic, from any worker."""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def subscribe_reset(self, handler: ResetHandler):
+        """Call `handler()` when messages from other workers may have been lost."""
+        self._reset_handlers.append(handler)
+
+    async def start(self):
+        """Start receiving the messages of the other workers."""
+        await self.backend.start(receive=self.receive, reset=self.reset)
+
+    async def stop(self):
+        """Stop receiving the messages of the other workers."""
+        await self.backend.stop()
+
+    async def publish(self, topic: str, payload: dict):
+        """Handle a message in this worker, and send it to the other workers."""
+        self.published += 1
+        self._dispatch(topic, payload)
+        await self.backend.send(
+            {"origin": self.worker_id, "topic": topic, "payload": payload}
+        )
+
+    def receive(self, message: dict):
+        """Handle a message sent by another worker."""
+        if message.get("origin") == self.worker_id:
+            return
+        self.received += 1
+        try:
+            self._dispatch(message["topic"], message["payload"])
+        except Exception:  # pylint: disable=broad-except
+            # A bad message must not stop the backend from receiving the next ones.
+            logger.exception("Failed to handle the invalidation %r.", message)
+
+    def reset(self):
+        """Run the reset handlers."""
+        self.resets += 1
+        for handler in self._reset_handlers:
+            handler()
+
+    def _dispatch(self, topic: str, payload: dict):
+        for handler in self._handlers.get(topic, []):
+            handler(payload)
+
+    def stats(self) -> dict:
+        """Get the statistics of the bus."""
+        return {
+            "backend": self.backend.name,
+            "published": self.published,
+            "received": self.received,
+            "resets": self.resets,
+            **self.backend.stats(),
+        }
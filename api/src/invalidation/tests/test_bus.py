@@ -0,0 +1,94 @@
+"""Tests for the invalidation bus."""
+import asyncio
+import multiprocessing as mp
+import os
+import socket
+import time
+
+from src.utils import cache
+
+from .. import ipc, pubsub
+
+N_WORKERS = 4
+
+# Seconds within which the caches of all the workers must be invalidated.
+CONVERGENCE_TIMEOUT = 5.0
+
+WEEK_START = "2022-12-05"
+
+
+def _run_worker(directory: str, ready: mp.Queue, results: mp.Queue):
+    """Worker with a cached week, that waits for its invalidation."""
+
+    async def run():
+        week_cache: cache.TTLCache[str, dict] = cache.TTLCache(maxsize=4, ttl=60)
+        week_cache.set(WEEK_START, {"2022-12-06": {0: "dan"}})
+        invalidated = asyncio.Event()
+
+        def on_week_invalidated(payload: dict):
+            week_cache.invalidate(payload["date"])
+            invalidated.set()
+
+        bus = pubsub.InvalidationBus(ipc.UnixSocketBackend(directory))
+        bus.subscribe("week", on_week_invalidated)
+        await bus.start()
+        ready.put(os.getpid())
+        try:
+            await asyncio.wait_for(invalidated.wait(), timeout=CONVERGENCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        results.put(week_cache.get(WEEK_START) is cache.MISSING)
+        await bus.stop()
+
+    asyncio.run(run())
+
+
+def test_ipc_workers_converge(tmp_path):
+    """A write in one worker invalidates the cache of every other local worker."""
+    ctx = mp.get_context("spawn")
+    ready, results = ctx.Queue(), ctx.Queue()
+    workers = [
+        ctx.Process(target=_run_worker, args=(str(tmp_path), ready, results))
+        for _ in range(N_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    async def publish():
+        bus = pubsub.InvalidationBus(ipc.UnixSocketBackend(str(tmp_path)))
+        await bus.start()
+        await bus.publish("week", {"date": WEEK_START})
+        await bus.stop()
+
+    try:
+        for _ in workers:
+            ready.get(timeout=30)
+        start = time.monotonic()
+        asyncio.run(publish())
+        assert [results.get(timeout=30) for _ in workers] == [True] * N_WORKERS
+        assert time.monotonic() - start < CONVERGENCE_TIMEOUT
+    finally:
+        for worker in workers:
+            worker.join(timeout=10)
+    # The workers removed their sockets on shutdown.
+    assert not list(tmp_path.iterdir())
+
+
+def test_bus_handles_own_messages_once(tmp_path):
+    """Own messages are handled in place, and sockets of gone workers are removed."""
+    gone = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    gone.bind(str(tmp_path / f"1-gone{ipc.SOCKET_SUFFIX}"))
+    gone.close()
+
+    async def run():
+        received: list[dict] = []
+        bus = pubsub.InvalidationBus(ipc.UnixSocketBackend(str(tmp_path)))
+        bus.subscribe("week", received.append)
+        await bus.start()
+        await bus.publish("week", {"date": WEEK_START})
+        bus.receive({"origin": bus.worker_id, "topic": "week", "payload": {}})
+        await bus.stop()
+        return received
+
+    assert asyncio.run(run()) == [{"date": WEEK_START}]
+    assert not list(tmp_path.iterdir())
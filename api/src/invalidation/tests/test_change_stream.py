@@ -0,0 +1,60 @@
+"""Tests for the change stream backend, against a real MongoDB replica set.
+
+They are skipped unless MONGO_HOST (and MONGO_USER/MONGO_PASS) point to a reachable
+MongoDB that supports change streams.
+"""
+import asyncio
+
+import pymongo as pym
+import pymongo.errors as pym_err
+import pytest
+from motor import motor_asyncio as mot
+
+from src.mongodb import mongodb
+
+from .. import change_stream, pubsub
+
+
+@pytest.fixture(name="db_name")
+def fixture_db_name(db_name):
+    """Throwaway database of the shared fixture, in a MongoDB with change streams."""
+    client: pym.MongoClient = pym.MongoClient(mongodb.URI)
+    try:
+        client[db_name]["invalidations"].watch().close()
+    except pym_err.OperationFailure:
+        pytest.skip("MongoDB doesn't support change streams (not a replica set).")
+    finally:
+        client.close()
+    return db_name
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_change_stream_workers_converge(db_name, is_async):
+    """Messages published by a worker are received by the others."""
+
+    async def run():
+        if is_async:
+            coll = mot.AsyncIOMotorClient(mongodb.URI)[db_name]["invalidations"]
+        else:
+            coll = pym.MongoClient(mongodb.URI)[db_name]["invalidations"]
+        received: list[dict] = []
+        buses = [
+            pubsub.InvalidationBus(
+                change_stream.ChangeStreamBackend(lambda: coll, is_async)
+            )
+            for _ in range(3)
+        ]
+        for bus in buses:
+            bus.subscribe("week", received.append)
+            await bus.start()
+
+        await buses[0].publish("week", {"date": "2022-12-05"})
+        for _ in range(50):
+            if len(received) == len(buses):
+                break
+            await asyncio.sleep(0.1)
+        for bus in buses:
+            await bus.stop()
+        return received
+
+    assert asyncio.run(run()) == [{"date": "2022-12-05"}] * 3
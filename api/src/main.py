@@ -1,10 +1,84 @@
 """Main module for the API."""
+import time
+import typing as t
+
 import fastapi as fa
 from fastapi.middleware import cors as fa_cors
 
 
+from src import config, invalidation
+from src.auth.utils import password as auth_pwd
 from src.mongodb import mongodb
-from src.routers import auth_router, slot_booking_router
+from src.routers import auth_router, slot_booking_router, stats_router
+from src.utils import metrics, profiling
+
+# Route label of the requests that match no route, so unknown paths don't add series.
+UNMATCHED_ROUTE = "<unmatched>"
+
+request_duration = metrics.register(
+    metrics.Histogram(
+        "http_request_duration_seconds",
+        "Latency of the HTTP requests, by route.",
+        ("method", "route", "status"),
+    )
+)
+requests_in_flight = metrics.register(
+    metrics.Gauge("http_requests_in_flight", "Number of HTTP requests in progress.")
+)
+
+
+class MetricsMiddleware:
+    """Record the latency of the HTTP requests by route, and the ones in progress.
+
+    It's a plain ASGI middleware rather than a `BaseHTTPMiddleware`, which would run the
+    rest of the app in another task for each request.
+    """
+
+    def __init__(self, app: t.Any):
+        self.app = app
+        self._endpoint_paths: t.Optional[dict] = None
+
+    async def __call__(self, scope: dict, receive: t.Callable, send: t.Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: dict):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                self._get_route_path(scope),
+                str(status),
+            )
+
+    def _get_route_path(self, scope: dict) -> str:
+        # The router sets the matched route (or only its endpoint, before starlette
+        # 0.33) in the scope.
+        route = scope.get("route")
+        if route is not None:
+            return str(route.path)
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._endpoint_paths is None:
+            self._endpoint_paths = {
+                getattr(r, "endpoint", None): r.path for r in scope["app"].routes
+            }
+        return str(self._endpoint_paths.get(endpoint, UNMATCHED_ROUTE))
+
 
 app = fa.FastAPI()
 
@@ -25,17 +99,33 @@ app.add_middleware(
     max_age=3600,
 )
 
+if config.PROFILING_SAMPLE_RATE > 0 or config.PROFILING_HEADER_TOKEN:
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        directory=config.PROFILING_DIR,
+        sample_rate=config.PROFILING_SAMPLE_RATE,
+        header_token=config.PROFILING_HEADER_TOKEN,
+        max_profiles=config.PROFILING_MAX_PROFILES,
+    )
+
+# Added last, so the latency includes the other middlewares (the profiling too).
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 @app.on_event("startup")
 async def startup():
     """Open MongoDB Client on app startup."""
-    mongodb.mongo_db_conn.open_client()
+    await mongodb.mongo_db_conn.connect(warmup=config.MONGO_WARMUP)
+    await invalidation.bus.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """Open MongoDB Client on app shutdown."""
+    await invalidation.bus.stop()
     mongodb.mongo_db_conn.close_client()
+    auth_pwd.pool.shutdown()
 
 
 @app.get("/")
@@ -44,6 +134,16 @@ async def hello_world():
     return {"Hello": "World"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Get the metrics in the Prometheus text format."""
+    return fa.responses.PlainTextResponse(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 app.include_router(auth_router.router)
 
 app.include_router(slot_booking_router.router)
+
+app.include_router(stats_router.router)
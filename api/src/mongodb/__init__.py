@@ -1,2 +1,2 @@
 """Package to interact with MongoDB."""
-from .mongodb import mongo_db_conn
+from .mongodb import IS_ASYNC, AsyncMongoDBConnection, MongoDBConnection, mongo_db_conn
@@ -7,11 +7,17 @@ used.
 
 from __future__ import annotations
 
+import typing as t
+
 import fastapi as fa
 import pydantic as pyd
 import pymongo.collection as pym_coll
 import pymongo.errors as pym_err
 import pymongo.results as pym_res
+from motor import motor_asyncio as mot
+
+from src.mongodb import user_cache as m_user_cache
+from src.utils import cache
 
 
 class UserBase(pyd.BaseModel):
@@ -35,8 +41,32 @@ class UserDB(UserBase):
 
     @classmethod
     def get(cls, user_coll: pym_coll.Collection, username: str) -> UserDB:
-        """Fetch a user from the DB."""
-        user_dict = user_coll.find_one({"_id": username})
+        """Fetch a user from the user cache, or from the DB."""
+        user_db = m_user_cache.get(user_coll.full_name, username)
+        if user_db is cache.MISSING:
+            generation = m_user_cache.get_generation()
+            user_dict = user_coll.find_one({"_id": username})
+            user_db = m_user_cache.set(
+                user_coll.full_name, username, cls._from_db(user_dict), generation
+            )
+        return user_db
+
+    @classmethod
+    async def get_async(
+        cls, user_coll: mot.AsyncIOMotorCollection, username: str
+    ) -> UserDB:
+        """Fetch a user from the user cache, or from the DB without blocking the loop."""
+        user_db = m_user_cache.get(user_coll.full_name, username)
+        if user_db is cache.MISSING:
+            generation = m_user_cache.get_generation()
+            user_dict = await user_coll.find_one({"_id": username})
+            user_db = m_user_cache.set(
+                user_coll.full_name, username, cls._from_db(user_dict), generation
+            )
+        return user_db
+
+    @classmethod
+    def _from_db(cls, user_dict: t.Optional[dict]) -> UserDB:
         if not user_dict:
             raise fa.HTTPException(
                 status_code=fa.status.HTTP_404_NOT_FOUND,
@@ -48,11 +78,57 @@ class UserDB(UserBase):
     def add(self, user_coll: pym_coll.Collection) -> pym_res.InsertOneResult:
         """Add a new user to the DB."""
         try:
-            result = user_coll.insert_one({**self.dict(), **{"_id": self.username}})
+            result = user_coll.insert_one(self._to_db())
         except pym_err.DuplicateKeyError as exc:
-            raise fa.HTTPException(
-                status_code=fa.status.HTTP_409_CONFLICT,
-                detail="Can't create user, it already exists in the DB.",
-            ) from exc
+            raise self._already_exists_exception() from exc
         else:
+            m_user_cache.invalidate(self.username)
             return result
+
+    async def add_async(
+        self, user_coll: mot.AsyncIOMotorCollection
+    ) -> pym_res.InsertOneResult:
+        """Add a new user to the DB without blocking the event loop."""
+        try:
+            result = await user_coll.insert_one(self._to_db())
+        except pym_err.DuplicateKeyError as exc:
+            raise self._already_exists_exception() from exc
+        else:
+            m_user_cache.invalidate(self.username)
+            return result
+
+    def update_hashed_password(
+        self, user_coll: pym_coll.Collection, hashed_password: str
+    ) -> pym_res.UpdateResult:
+        """Replace the hashed password, unless it changed since the user was fetched."""
+        result = user_coll.update_one(
+            *self._update_hashed_password_query(hashed_password)
+        )
+        m_user_cache.invalidate(self.username)
+        return result
+
+    async def update_hashed_password_async(
+        self, user_coll: mot.AsyncIOMotorCollection, hashed_password: str
+    ) -> pym_res.UpdateResult:
+        """Replace the hashed password without blocking the event loop."""
+        result = await user_coll.update_one(
+            *self._update_hashed_password_query(hashed_password)
+        )
+        m_user_cache.invalidate(self.username)
+        return result
+
+    def _update_hashed_password_query(self, hashed_password: str) -> tuple[dict, dict]:
+        return (
+            {"_id": self.username, "hashed_password": self.hashed_password},
+            {"$set": {"hashed_password": hashed_password}},
+        )
+
+    def _to_db(self) -> dict:
+        return {**self.dict(), **{"_id": self.username}}
+
+    @staticmethod
+    def _already_exists_exception() -> fa.HTTPException:
+        return fa.HTTPException(
+            status_code=fa.status.HTTP_409_CONFLICT,
+            detail="Can't create user, it already exists in the DB.",
+        )
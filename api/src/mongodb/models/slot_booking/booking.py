@@ -0,0 +1,366 @@
+"""Module to interact with the "slot_booking.bookings" collection.
+
+Each document is the ownership record of a single booked slot. There can only be one
+document per (date, slot_id) and one per (username, date), which is enforced by unique
+compound indexes. Booking a slot is then a single insert that MongoDB accepts for
+exactly one of any number of concurrent requests, and the rest get a duplicate key
+error.
+
+Dates are stored as "YYYY-MM-DD" strings (that sort chronologically), so loading the
+bookings of a week is a single bounded range query on the date.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import typing as t
+
+import fastapi as fa
+import pydantic as pyd
+import pymongo as pym
+import pymongo.collection as pym_coll
+import pymongo.errors as pym_err
+import pymongo.results as pym_res
+from motor import motor_asyncio as mot
+
+from src.slot_booking import models as lb_m
+from src.slot_booking.utils import datetime_utils as lb_dp
+
+# Code of the errors of the writes that break a unique index.
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+# Number of upserts sent to the DB in each bulk write during the migration.
+MIGRATION_BATCH_SIZE = 1000
+
+
+class Booking(pyd.BaseModel):
+    """Model of a booked slot as stored in the DB."""
+
+    date: str
+    slot_id: lb_m.SlotIdInt
+    username: str
+
+    @staticmethod
+    def create_indexes(booking_coll: pym_coll.Collection) -> list[str]:
+        """Create the indexes needed by the bookings collection (if not there yet)."""
+        result: list[str] = booking_coll.create_indexes(Booking._indexes())
+        return result
+
+    @staticmethod
+    async def create_indexes_async(
+        booking_coll: mot.AsyncIOMotorCollection,
+    ) -> list[str]:
+        """Create the indexes needed by the bookings collection (if not there yet)."""
+        result: list[str] = await booking_coll.create_indexes(Booking._indexes())
+        return result
+
+    @staticmethod
+    def _indexes() -> list[pym.IndexModel]:
+        indexes = [
+            # A slot can only be booked once.
+            pym.IndexModel(
+                [("date", pym.ASCENDING), ("slot_id", pym.ASCENDING)],
+                name="date_slot_id_unique",
+                unique=True,
+            ),
+            # A user can only book one slot per date.
+            pym.IndexModel(
+                [("username", pym.ASCENDING), ("date", pym.ASCENDING)],
+                name="username_date_unique",
+                unique=True,
+            ),
+            # Range queries over the dates of a week.
+            pym.IndexModel([("date", pym.ASCENDING)], name="date"),
+        ]
+        return indexes
+
+    def add(self, booking_coll: pym_coll.Collection) -> pym_res.InsertOneResult:
+        """Add the booking to the DB, if the slot and the date of the user are free.
+
+        Raises:
+            fa.HTTPException: "409 Conflict" if the slot is already booked, or if the
+                user already has a booking for the same date.
+        """
+        try:
+            result = booking_coll.insert_one(self.dict())
+        except pym_err.DuplicateKeyError as exc:
+            raise self._already_booked_exception(exc.details) from exc
+        else:
+            return result
+
+    async def add_async(
+        self, booking_coll: mot.AsyncIOMotorCollection
+    ) -> pym_res.InsertOneResult:
+        """Add the booking to the DB without blocking the event loop."""
+        try:
+            result = await booking_coll.insert_one(self.dict())
+        except pym_err.DuplicateKeyError as exc:
+            raise self._already_booked_exception(exc.details) from exc
+        else:
+            return result
+
+    @staticmethod
+    def add_many(
+        booking_coll: pym_coll.Collection, bookings: list[Booking]
+    ) -> list[t.Optional[fa.HTTPException]]:
+        """Add several bookings with a single bulk write.
+
+        Each booking is added or not independently of the others (like in `add`).
+
+        Returns:
+            For each booking, None if it was added, or the "409 Conflict" exception.
+        """
+        try:
+            booking_coll.bulk_write(Booking._insert_operations(bookings), ordered=False)
+        except pym_err.BulkWriteError as exc:
+            return Booking._bulk_write_exceptions(len(bookings), exc)
+        return [None] * len(bookings)
+
+    @staticmethod
+    async def add_many_async(
+        booking_coll: mot.AsyncIOMotorCollection, bookings: list[Booking]
+    ) -> list[t.Optional[fa.HTTPException]]:
+        """Add several bookings with a single bulk write without blocking the loop."""
+        try:
+            await booking_coll.bulk_write(
+                Booking._insert_operations(bookings), ordered=False
+            )
+        except pym_err.BulkWriteError as exc:
+            return Booking._bulk_write_exceptions(len(bookings), exc)
+        return [None] * len(bookings)
+
+    @staticmethod
+    def _insert_operations(bookings: list[Booking]) -> list[pym.InsertOne]:
+        return [pym.InsertOne(booking.dict()) for booking in bookings]
+
+    @staticmethod
+    def _bulk_write_exceptions(
+        n_bookings: int, exc: pym_err.BulkWriteError
+    ) -> list[t.Optional[fa.HTTPException]]:
+        exceptions: list[t.Optional[fa.HTTPException]] = [None] * n_bookings
+        for write_error in exc.details["writeErrors"]:
+            if write_error["code"] != DUPLICATE_KEY_ERROR_CODE:
+                raise exc
+            exceptions[write_error["index"]] = Booking._already_booked_exception(
+                write_error
+            )
+        return exceptions
+
+    @staticmethod
+    def _already_booked_exception(error_details: t.Optional[dict]) -> fa.HTTPException:
+        key_pattern = (error_details or {}).get("keyPattern", {})
+        if "username" in key_pattern:
+            detail = "The user already has a booking for the same date."
+        else:
+            detail = "Selected slot is already booked by another user."
+        return fa.HTTPException(status_code=fa.status.HTTP_409_CONFLICT, detail=detail)
+
+    @staticmethod
+    def delete(
+        booking_coll: pym_coll.Collection,
+        username: str,
+        date_str: str,
+        slot_id: lb_m.SlotIdInt,
+    ) -> pym_res.DeleteResult:
+        """Delete a booking of the user from the DB."""
+        result = booking_coll.delete_one(
+            {"date": date_str, "slot_id": slot_id, "username": username}
+        )
+        return result
+
+    @staticmethod
+    async def delete_async(
+        booking_coll: mot.AsyncIOMotorCollection,
+        username: str,
+        date_str: str,
+        slot_id: lb_m.SlotIdInt,
+    ) -> pym_res.DeleteResult:
+        """Delete a booking of the user from the DB without blocking the event loop."""
+        result = await booking_coll.delete_one(
+            {"date": date_str, "slot_id": slot_id, "username": username}
+        )
+        return result
+
+    @staticmethod
+    def delete_many(
+        booking_coll: pym_coll.Collection,
+        username: str,
+        slots: list[tuple[str, lb_m.SlotIdInt]],
+    ) -> list[tuple[str, lb_m.SlotIdInt]]:
+        """Delete several bookings of the user, given as (date_str, slot_id).
+
+        Returns:
+            The slots that were booked by the user, and so deleted.
+        """
+        docs = list(booking_coll.find(*Booking._delete_many_query(username, slots)))
+        if docs:
+            booking_coll.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        return [(doc["date"], doc["slot_id"]) for doc in docs]
+
+    @staticmethod
+    async def delete_many_async(
+        booking_coll: mot.AsyncIOMotorCollection,
+        username: str,
+        slots: list[tuple[str, lb_m.SlotIdInt]],
+    ) -> list[tuple[str, lb_m.SlotIdInt]]:
+        """Delete several bookings of the user without blocking the event loop."""
+        docs = await booking_coll.find(
+            *Booking._delete_many_query(username, slots)
+        ).to_list(length=None)
+        if docs:
+            await booking_coll.delete_many(
+                {"_id": {"$in": [doc["_id"] for doc in docs]}}
+            )
+        return [(doc["date"], doc["slot_id"]) for doc in docs]
+
+    @staticmethod
+    def _delete_many_query(
+        username: str, slots: list[tuple[str, lb_m.SlotIdInt]]
+    ) -> tuple[dict, dict]:
+        # The ids of the documents, to delete exactly the ones found.
+        return (
+            {
+                "username": username,
+                "$or": [
+                    {"date": date_str, "slot_id": slot_id}
+                    for date_str, slot_id in slots
+                ],
+            },
+            {"_id": 1, "date": 1, "slot_id": 1},
+        )
+
+    @classmethod
+    def get_range(
+        cls,
+        booking_coll: pym_coll.Collection,
+        date_from: dt.date,
+        date_to: dt.date,
+    ) -> list[Booking]:
+        """Get the bookings between two dates (both included)."""
+        docs = booking_coll.find(*cls._range_query(date_from, date_to))
+        bookings = [cls(**doc) for doc in docs]
+        return bookings
+
+    @classmethod
+    async def get_range_async(
+        cls,
+        booking_coll: mot.AsyncIOMotorCollection,
+        date_from: dt.date,
+        date_to: dt.date,
+    ) -> list[Booking]:
+        """Get the bookings between two dates without blocking the event loop."""
+        docs = booking_coll.find(*cls._range_query(date_from, date_to))
+        bookings = [cls(**doc) async for doc in docs]
+        return bookings
+
+    @staticmethod
+    def _range_query(date_from: dt.date, date_to: dt.date) -> tuple[dict, dict]:
+        return (
+            {
+                "date": {
+                    "$gte": lb_dp.format_date_to_string(date_from),
+                    "$lte": lb_dp.format_date_to_string(date_to),
+                }
+            },
+            {"_id": 0, "date": 1, "slot_id": 1, "username": 1},
+        )
+
+
+def get_occupancy(bookings: t.Iterable[Booking]) -> lb_m.WeekOccupancyDict:
+    """Get the username that booked each slot."""
+    occupancy: lb_m.WeekOccupancyDict = {}
+    for booking in bookings:
+        date = lb_dp.parse_date_from_string(booking.date)
+        if date not in occupancy:
+            occupancy[date] = {}
+        occupancy[date][booking.slot_id] = booking.username
+
+    return occupancy
+
+
+def migrate_from_embedded(
+    user_coll: pym_coll.Collection,
+    booking_coll: pym_coll.Collection,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+) -> int:
+    """Copy the bookings embedded in the user documents into the bookings collection.
+
+    The copy is idempotent (it can be run again, e.g. after deploying a release that
+    still writes the embedded map) because every booking is upserted on (date, slot_id).
+    If two users have the same slot embedded, the first one found keeps the slot, and a
+    user that already has another slot of the date in the collection keeps that one.
+
+    Returns:
+        The number of bookings that were inserted in the bookings collection.
+    """
+    Booking.create_indexes(booking_coll)
+
+    inserted_count = 0
+    operations: list[pym.UpdateOne] = []
+
+    def flush() -> int:
+        if not operations:
+            return 0
+        upserted_count = upsert_many(booking_coll, operations)
+        operations.clear()
+        return upserted_count
+
+    docs = user_coll.find({}, {"bookings": 1})
+    for doc in docs:
+        for date_str, slot_id in doc.get("bookings", {}).items():
+            operations.append(
+                pym.UpdateOne(
+                    {"date": date_str, "slot_id": slot_id},
+                    {"$setOnInsert": {"username": doc["_id"]}},
+                    upsert=True,
+                )
+            )
+            if len(operations) >= batch_size:
+                inserted_count += flush()
+    inserted_count += flush()
+
+    return inserted_count
+
+
+def upsert_many(
+    booking_coll: pym_coll.Collection, operations: list[pym.UpdateOne]
+) -> int:
+    """Upsert bookings with a single unordered bulk write.
+
+    The upserts that break a unique index are skipped, like the slot of a user that
+    already has another slot of the same date.
+
+    Returns:
+        The number of bookings that were inserted.
+    """
+    try:
+        result = booking_coll.bulk_write(operations, ordered=False)
+    except pym_err.BulkWriteError as exc:
+        for write_error in exc.details["writeErrors"]:
+            if write_error["code"] != DUPLICATE_KEY_ERROR_CODE:
+                raise
+        upserted_count: int = exc.details["nUpserted"]
+        return upserted_count
+    return result.upserted_count
+
+
+def is_migration_needed(
+    user_coll: pym_coll.Collection, booking_coll: pym_coll.Collection
+) -> bool:
+    """Check if users have embedded bookings while the bookings collection is empty."""
+    if booking_coll.find_one({}, {"_id": 1}) is not None:
+        return False
+    return user_coll.find_one(*_embedded_bookings_query()) is not None
+
+
+async def is_migration_needed_async(
+    user_coll: mot.AsyncIOMotorCollection, booking_coll: mot.AsyncIOMotorCollection
+) -> bool:
+    """Check if the migration is needed without blocking the event loop."""
+    if await booking_coll.find_one({}, {"_id": 1}) is not None:
+        return False
+    return await user_coll.find_one(*_embedded_bookings_query()) is not None
+
+
+def _embedded_bookings_query() -> tuple[dict, dict]:
+    return {"bookings": {"$exists": True, "$ne": {}}}, {"_id": 1}
@@ -0,0 +1,132 @@
+"""Module to interact with the "slot_booking.booking_history" collection.
+
+The embedded `bookings` map of the user documents only needs the present and future
+bookings: past slots are unavailable whatever their bookings. The rollover moves the
+past bookings out of the maps into this collection, compacted in one document per user
+and month, so the user documents (loaded and parsed on every request with the embedded
+store) stop growing with the age of the deployment.
+
+Each document is keyed by "<username>:<YYYY-MM>", with the bookings of that month as a
+map of "YYYY-MM-DD" strings to slot ids, like the embedded map. The documents can expire
+some time after their last rollover thanks to a TTL index on `archived_at`.
+"""
+import datetime as dt
+import typing as t
+
+import pymongo as pym
+import pymongo.collection as pym_coll
+
+from src.slot_booking import models as lb_m
+from src.slot_booking.utils import datetime_utils as lb_dp
+
+# Number of users whose bookings are moved in each pair of bulk writes.
+ROLLOVER_BATCH_SIZE = 500
+
+
+def create_indexes(history_coll: pym_coll.Collection, ttl_days: int = 0):
+    """Create the index to find the history of a user, and the TTL one if any."""
+    indexes = [pym.IndexModel([("username", pym.ASCENDING), ("month", pym.ASCENDING)])]
+    if ttl_days > 0:
+        indexes.append(
+            pym.IndexModel(
+                [("archived_at", pym.ASCENDING)],
+                expireAfterSeconds=int(dt.timedelta(days=ttl_days).total_seconds()),
+            )
+        )
+    history_coll.create_indexes(indexes)
+
+
+def rollover(
+    user_coll: pym_coll.Collection,
+    history_coll: pym_coll.Collection,
+    before: dt.date,
+    batch_size: int = ROLLOVER_BATCH_SIZE,
+) -> int:
+    """Move the bookings of the dates before `before` from the users to the history.
+
+    The bookings are written to the history before they're removed from the users, so
+    an interrupted rollover loses nothing and can simply be run again (the history
+    upserts are idempotent).
+
+    Returns:
+        The number of bookings that were moved.
+    """
+    before_str = lb_dp.format_date_to_string(before)
+    now = dt.datetime.utcnow()
+    moved_count = 0
+    history_operations: list[pym.UpdateOne] = []
+    user_operations: list[pym.UpdateOne] = []
+
+    def flush():
+        if user_operations:
+            history_coll.bulk_write(history_operations, ordered=False)
+            user_coll.bulk_write(user_operations, ordered=False)
+        history_operations.clear()
+        user_operations.clear()
+
+    for doc in user_coll.find({}, {"bookings": 1}):
+        username = doc["_id"]
+        past_bookings = {
+            date_str: slot_id
+            for date_str, slot_id in doc.get("bookings", {}).items()
+            # The "YYYY-MM-DD" strings sort chronologically.
+            if date_str < before_str
+        }
+        if not past_bookings:
+            continue
+
+        for month, month_bookings in _split_months(past_bookings).items():
+            history_operations.append(
+                pym.UpdateOne(
+                    {"_id": f"{username}:{month}"},
+                    {
+                        "$set": {
+                            "username": username,
+                            "month": month,
+                            "archived_at": now,
+                            **{
+                                f"bookings.{date_str}": slot_id
+                                for date_str, slot_id in month_bookings.items()
+                            },
+                        }
+                    },
+                    upsert=True,
+                )
+            )
+        user_operations.append(
+            pym.UpdateOne(
+                {"_id": username},
+                {"$unset": {f"bookings.{date_str}": "" for date_str in past_bookings}},
+            )
+        )
+        moved_count += len(past_bookings)
+        if len(user_operations) >= batch_size:
+            flush()
+    flush()
+
+    return moved_count
+
+
+def _split_months(
+    bookings: dict[str, lb_m.SlotIdInt]
+) -> dict[str, dict[str, lb_m.SlotIdInt]]:
+    months: dict[str, dict[str, lb_m.SlotIdInt]] = {}
+    for date_str, slot_id in bookings.items():
+        # "YYYY-MM" of the "YYYY-MM-DD" string.
+        months.setdefault(date_str[:7], {})[date_str] = slot_id
+    return months
+
+
+def get_bookings(
+    history_coll: pym_coll.Collection,
+    username: str,
+    month_from: t.Optional[str] = None,
+) -> dict[str, lb_m.SlotIdInt]:
+    """Get the past bookings of a user, optionally from a "YYYY-MM" month onwards."""
+    query: dict = {"username": username}
+    if month_from is not None:
+        query["month"] = {"$gte": month_from}
+    bookings: dict[str, lb_m.SlotIdInt] = {}
+    for doc in history_coll.find(query, {"bookings": 1}).sort("month", pym.ASCENDING):
+        bookings.update(doc["bookings"])
+    return bookings
@@ -7,15 +7,19 @@ and collection can be used.
 
 from __future__ import annotations
 
+import datetime as dt
 import typing as t
 
 import fastapi as fa
 import pydantic as pyd
 import pymongo.collection as pym_coll
 import pymongo.results as pym_res
+from motor import motor_asyncio as mot
 
+from src.mongodb import user_cache as m_user_cache
 from src.slot_booking import models as lb_m
 from src.slot_booking.utils import datetime_utils as lb_dp
+from src.utils import cache
 
 
 class UserAdd(pyd.BaseModel):
@@ -31,6 +35,16 @@ class UserAdd(pyd.BaseModel):
         """Add a new user to the DB."""
         obj = {**self.dict(), **{"_id": username}}
         result = user_coll.replace_one({"_id": obj["_id"]}, obj, upsert=True)
+        m_user_cache.invalidate(username)
+        return result
+
+    async def upsert_async(
+        self, user_coll: mot.AsyncIOMotorCollection, username: str
+    ) -> pym_res.UpdateResult:
+        """Add a new user to the DB without blocking the event loop."""
+        obj = {**self.dict(), **{"_id": username}}
+        result = await user_coll.replace_one({"_id": obj["_id"]}, obj, upsert=True)
+        m_user_cache.invalidate(username)
         return result
 
     @pyd.root_validator(pre=True)
@@ -50,10 +64,40 @@ class User(UserAdd):
             "Not allowed to directly add or modify Slot Booking users."
         )
 
+    async def upsert_async(self, *args, **kwargs):
+        """Override parent class 'upsert_async' method to make it invalid too."""
+        raise NotImplementedError(
+            "Not allowed to directly add or modify Slot Booking users."
+        )
+
     @classmethod
     def get(cls, user_coll: pym_coll.Collection, username: str) -> User:
-        """Fetch a user from the DB."""
-        user_dict: t.Optional[dict] = user_coll.find_one({"_id": username})
+        """Fetch a user from the user cache, or from the DB."""
+        user_db = m_user_cache.get(user_coll.full_name, username)
+        if user_db is cache.MISSING:
+            generation = m_user_cache.get_generation()
+            user_dict: t.Optional[dict] = user_coll.find_one({"_id": username})
+            user_db = m_user_cache.set(
+                user_coll.full_name, username, cls._from_db(user_dict), generation
+            )
+        return user_db
+
+    @classmethod
+    async def get_async(
+        cls, user_coll: mot.AsyncIOMotorCollection, username: str
+    ) -> User:
+        """Fetch a user from the user cache, or from the DB without blocking the loop."""
+        user_db = m_user_cache.get(user_coll.full_name, username)
+        if user_db is cache.MISSING:
+            generation = m_user_cache.get_generation()
+            user_dict: t.Optional[dict] = await user_coll.find_one({"_id": username})
+            user_db = m_user_cache.set(
+                user_coll.full_name, username, cls._from_db(user_dict), generation
+            )
+        return user_db
+
+    @classmethod
+    def _from_db(cls, user_dict: t.Optional[dict]) -> User:
         if not user_dict:
             raise fa.HTTPException(
                 status_code=fa.status.HTTP_404_NOT_FOUND,
@@ -71,13 +115,36 @@ class User(UserAdd):
     ) -> pym_res.UpdateResult:
         """Add a booking to a user in the DB."""
         update_one_result = user_coll.update_one(
+            *self._add_booking_query(username, date_str, slot_id)
+        )
+        m_user_cache.invalidate(username)
+        return update_one_result
+
+    async def add_booking_async(
+        self,
+        user_coll: mot.AsyncIOMotorCollection,
+        username: str,
+        date_str: str,
+        slot_id: lb_m.SlotIdInt,
+    ) -> pym_res.UpdateResult:
+        """Add a booking to a user in the DB without blocking the event loop."""
+        update_one_result = await user_coll.update_one(
+            *self._add_booking_query(username, date_str, slot_id)
+        )
+        m_user_cache.invalidate(username)
+        return update_one_result
+
+    @staticmethod
+    def _add_booking_query(
+        username: str, date_str: str, slot_id: lb_m.SlotIdInt
+    ) -> tuple[dict, dict]:
+        return (
             {
                 "_id": username,
                 f"bookings.{date_str}": {"$exists": False},
             },
             {"$set": {f"bookings.{date_str}": slot_id}},
         )
-        return update_one_result
 
     def delete_booking(
         self,
@@ -87,7 +154,27 @@ class User(UserAdd):
         slot_id: lb_m.SlotIdInt,
     ) -> pym_res.UpdateResult:
         """Delete a booking of the user in the DB."""
-        result = user_coll.update_one(
+        result = user_coll.update_one(*self._delete_booking_query(username, date_str))
+        m_user_cache.invalidate(username)
+        return result
+
+    async def delete_booking_async(
+        self,
+        user_coll: mot.AsyncIOMotorCollection,
+        username: str,
+        date_str: str,
+        slot_id: lb_m.SlotIdInt,
+    ) -> pym_res.UpdateResult:
+        """Delete a booking of the user in the DB without blocking the event loop."""
+        result = await user_coll.update_one(
+            *self._delete_booking_query(username, date_str)
+        )
+        m_user_cache.invalidate(username)
+        return result
+
+    @staticmethod
+    def _delete_booking_query(username: str, date_str: str) -> tuple[dict, dict]:
+        return (
             {
                 "_id": username,
                 f"bookings.{date_str}": {"$exists": True},
@@ -96,14 +183,81 @@ class User(UserAdd):
                 "$unset": {f"bookings.{date_str}": ""},
             },
         )
+
+    def add_bookings(
+        self,
+        user_coll: pym_coll.Collection,
+        username: str,
+        bookings: dict[str, lb_m.SlotIdInt],
+    ) -> pym_res.UpdateResult:
+        """Add several bookings (by date string) to a user in the DB at once."""
+        result = user_coll.update_one(*self._add_bookings_query(username, bookings))
+        m_user_cache.invalidate(username)
         return result
 
+    async def add_bookings_async(
+        self,
+        user_coll: mot.AsyncIOMotorCollection,
+        username: str,
+        bookings: dict[str, lb_m.SlotIdInt],
+    ) -> pym_res.UpdateResult:
+        """Add several bookings to a user in the DB without blocking the event loop."""
+        result = await user_coll.update_one(
+            *self._add_bookings_query(username, bookings)
+        )
+        m_user_cache.invalidate(username)
+        return result
+
+    @staticmethod
+    def _add_bookings_query(
+        username: str, bookings: dict[str, lb_m.SlotIdInt]
+    ) -> tuple[dict, dict]:
+        return (
+            {"_id": username},
+            {
+                "$set": {
+                    f"bookings.{date_str}": slot_id
+                    for date_str, slot_id in bookings.items()
+                }
+            },
+        )
+
+    def delete_bookings(
+        self,
+        user_coll: pym_coll.Collection,
+        username: str,
+        date_strs: list[str],
+    ) -> pym_res.UpdateResult:
+        """Delete several bookings (by date string) of the user in the DB at once."""
+        result = user_coll.update_one(*self._delete_bookings_query(username, date_strs))
+        m_user_cache.invalidate(username)
+        return result
+
+    async def delete_bookings_async(
+        self,
+        user_coll: mot.AsyncIOMotorCollection,
+        username: str,
+        date_strs: list[str],
+    ) -> pym_res.UpdateResult:
+        """Delete several bookings of the user without blocking the event loop."""
+        result = await user_coll.update_one(
+            *self._delete_bookings_query(username, date_strs)
+        )
+        m_user_cache.invalidate(username)
+        return result
+
+    @staticmethod
+    def _delete_bookings_query(
+        username: str, date_strs: list[str]
+    ) -> tuple[dict, dict]:
+        return (
+            {"_id": username},
+            {"$unset": {f"bookings.{date_str}": "" for date_str in date_strs}},
+        )
+
     def get_bookings(self) -> lb_m.SlotsTakenDict:
         """Get the bookings made by the user."""
-        bookings_by_user: lb_m.SlotsTakenDict = {}
-        for date_str, slot_id in self.bookings.items():
-            date = lb_dp.parse_date_from_string(date_str)
-            bookings_by_user[date] = [slot_id]
+        bookings_by_user = lb_dp.parse_booking_map(self.bookings)
         return bookings_by_user
 
     def get_bookings_by_others(
@@ -115,10 +269,97 @@ class User(UserAdd):
         docs = user_coll.find({"_id": {"$ne": username}}, {"bookings": 1, "_id": 0})
         bookings_by_others: lb_m.SlotsTakenDict = {}
         for doc in docs:
-            for date_str, slot_id in doc["bookings"].items():
-                date = lb_dp.parse_date_from_string(date_str)
-                if date not in bookings_by_others:
-                    bookings_by_others[date] = []
-                bookings_by_others[date].append(slot_id)
+            self._add_taken_slots(bookings_by_others, doc["bookings"])
 
         return bookings_by_others
+
+    async def get_bookings_by_others_async(
+        self,
+        user_coll: mot.AsyncIOMotorCollection,
+        username: str,
+    ) -> lb_m.SlotsTakenDict:
+        """Get the bookings of other users without blocking the event loop."""
+        docs = user_coll.find({"_id": {"$ne": username}}, {"bookings": 1, "_id": 0})
+        bookings_by_others: lb_m.SlotsTakenDict = {}
+        async for doc in docs:
+            self._add_taken_slots(bookings_by_others, doc["bookings"])
+
+        return bookings_by_others
+
+    def get_bookings_by_others_in_range(
+        self,
+        user_coll: pym_coll.Collection,
+        username: str,
+        date_from: dt.date,
+        date_to: dt.date,
+    ) -> lb_m.SlotsTakenDict:
+        """Get the bookings of other users between two dates (included).
+
+        The bookings are filtered in MongoDB, so only the ones in the range are sent.
+        """
+        docs = user_coll.aggregate(
+            self._bookings_by_others_pipeline(username, date_from, date_to)
+        )
+        return self._taken_slots_from_docs(docs)
+
+    async def get_bookings_by_others_in_range_async(
+        self,
+        user_coll: mot.AsyncIOMotorCollection,
+        username: str,
+        date_from: dt.date,
+        date_to: dt.date,
+    ) -> lb_m.SlotsTakenDict:
+        """Get the bookings of other users between two dates without blocking the loop."""
+        docs = user_coll.aggregate(
+            self._bookings_by_others_pipeline(username, date_from, date_to)
+        )
+        return self._taken_slots_from_docs([doc async for doc in docs])
+
+    @staticmethod
+    def _bookings_by_others_pipeline(
+        username: str, date_from: dt.date, date_to: dt.date
+    ) -> list[dict]:
+        # The "YYYY-MM-DD" keys of the maps sort chronologically.
+        in_range = {
+            "$and": [
+                {"$gte": ["$$booking.k", lb_dp.format_date_to_string(date_from)]},
+                {"$lte": ["$$booking.k", lb_dp.format_date_to_string(date_to)]},
+            ]
+        }
+        return [
+            {"$match": {"_id": {"$ne": username}}},
+            {
+                "$project": {
+                    "_id": 0,
+                    "bookings": {
+                        "$filter": {
+                            "input": {"$objectToArray": {"$ifNull": ["$bookings", {}]}},
+                            "as": "booking",
+                            "cond": in_range,
+                        }
+                    },
+                }
+            },
+            {"$unwind": "$bookings"},
+            {"$project": {"date": "$bookings.k", "slot_id": "$bookings.v"}},
+        ]
+
+    @staticmethod
+    def _taken_slots_from_docs(docs: t.Iterable[dict]) -> lb_m.SlotsTakenDict:
+        taken_slots: lb_m.SlotsTakenDict = {}
+        for doc in docs:
+            date = lb_dp.parse_date_from_string(doc["date"])
+            if date not in taken_slots:
+                taken_slots[date] = []
+            taken_slots[date].append(doc["slot_id"])
+        return taken_slots
+
+    @staticmethod
+    def _add_taken_slots(
+        taken_slots: lb_m.SlotsTakenDict, bookings: dict[str, lb_m.SlotIdInt]
+    ):
+        for date_str, slot_id in bookings.items():
+            date = lb_dp.parse_date_from_string(date_str)
+            if date not in taken_slots:
+                taken_slots[date] = []
+            taken_slots[date].append(slot_id)
@@ -0,0 +1,64 @@
+"""Module to interact with the "slot_booking.week_versions" collection.
+
+Each document holds a counter of the changes of the bookings of a week, keyed by the
+date of its monday as a "YYYY-MM-DD" string. It's bumped after every booking and
+unbooking of a slot of the week, so a client that already has the slots of a week at
+some version can be told they didn't change without loading the bookings.
+
+The counters live in the DB (and not in memory) so they're shared by all the workers.
+A week without document is at version 0.
+"""
+
+import datetime as dt
+
+import pymongo.collection as pym_coll
+from motor import motor_asyncio as mot
+
+from src.slot_booking.utils import datetime_utils as lb_dp
+
+
+def bump(week_version_coll: pym_coll.Collection, week_start: dt.date):
+    """Increment the version of a week."""
+    week_version_coll.update_one(*_bump_query(week_start), upsert=True)
+
+
+async def bump_async(
+    week_version_coll: mot.AsyncIOMotorCollection, week_start: dt.date
+):
+    """Increment the version of a week without blocking the event loop."""
+    await week_version_coll.update_one(*_bump_query(week_start), upsert=True)
+
+
+def _bump_query(week_start: dt.date) -> tuple[dict, dict]:
+    return (
+        {"_id": lb_dp.format_date_to_string(week_start)},
+        {"$inc": {"version": 1}},
+    )
+
+
+def get_many(
+    week_version_coll: pym_coll.Collection, week_starts: list[dt.date]
+) -> dict[dt.date, int]:
+    """Get the versions of some weeks."""
+    docs = week_version_coll.find(_get_many_query(week_starts))
+    return _versions_from_db(week_starts, docs)
+
+
+async def get_many_async(
+    week_version_coll: mot.AsyncIOMotorCollection, week_starts: list[dt.date]
+) -> dict[dt.date, int]:
+    """Get the versions of some weeks without blocking the event loop."""
+    docs = [doc async for doc in week_version_coll.find(_get_many_query(week_starts))]
+    return _versions_from_db(week_starts, docs)
+
+
+def _get_many_query(week_starts: list[dt.date]) -> dict:
+    return {"_id": {"$in": [lb_dp.format_date_to_string(d) for d in week_starts]}}
+
+
+def _versions_from_db(week_starts: list[dt.date], docs) -> dict[dt.date, int]:
+    versions_by_id = {doc["_id"]: doc["version"] for doc in docs}
+    return {
+        week_start: versions_by_id.get(lb_dp.format_date_to_string(week_start), 0)
+        for week_start in week_starts
+    }
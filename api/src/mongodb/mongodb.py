@@ -1,9 +1,14 @@
 """Module for interacting with MongoDB."""
+import asyncio
 import os
+import typing as t
 
 import pymongo as pym
-from pymongo import collection as pym_coll
-from pymongo import database as pym_db
+from motor import motor_asyncio as mot
+from pymongo import monitoring as pym_mon
+
+from src import config
+from src.utils import metrics
 
 URI_FORMAT = "mongodb"
 HOST = os.environ.get("MONGO_HOST")
@@ -12,13 +17,117 @@ PASS = os.environ.get("MONGO_PASS")
 
 URI = f"{URI_FORMAT}://{USER}:{PASS}@{HOST}"
 
+command_duration = metrics.register(
+    metrics.Histogram(
+        "mongodb_command_duration_seconds",
+        "Duration of the MongoDB commands.",
+        ("collection", "command", "outcome"),
+        buckets=metrics.FAST_BUCKETS,
+    )
+)
+
+
+class CommandMetrics(pym_mon.CommandListener):
+    """Record the duration of the MongoDB commands, by collection and command.
+
+    Only the started event has the command, so its collection is kept until the command
+    succeeds or fails, by request id (the ids are unique within the client).
+    """
+
+    def __init__(self):
+        self.collections: dict[int, str] = {}
+
+    def started(self, event: pym_mon.CommandStartedEvent):
+        """Keep the collection of the command."""
+        coll_name = event.command.get(event.command_name)
+        if not isinstance(coll_name, str):
+            # e.g. the cursor id of a getMore, whose collection is under "collection".
+            coll_name = event.command.get("collection")
+        self.collections[event.request_id] = (
+            f"{event.database_name}.{coll_name}" if coll_name else event.database_name
+        )
+
+    def succeeded(self, event: pym_mon.CommandSucceededEvent):
+        """Record the duration of a command that succeeded."""
+        self._observe(event, "success")
+
+    def failed(self, event: pym_mon.CommandFailedEvent):
+        """Record the duration of a command that failed."""
+        self._observe(event, "failure")
+
+    def _observe(self, event, outcome: str):
+        coll_name = self.collections.pop(event.request_id, "")
+        command_duration.observe(
+            event.duration_micros / 1e6, coll_name, event.command_name, outcome
+        )
+
+
+def get_event_listeners() -> list[pym_mon.CommandListener]:
+    """Get the listeners of the events of the MongoDB clients."""
+    return [CommandMetrics()] if config.METRICS_ENABLED else []
+
+
+def get_client_options() -> dict:
+    """Get the options of the MongoDB clients, with the pool settings of the config."""
+    options = {
+        "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        # For these ones, 0 stands for the default of the driver (no limit).
+        "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS or None,
+        "socketTimeoutMS": config.MONGO_SOCKET_TIMEOUT_MS or None,
+        "waitQueueTimeoutMS": config.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+    }
+    return {
+        "event_listeners": get_event_listeners(),
+        **{name: value for name, value in options.items() if value is not None},
+    }
+
+
+class CollectionHandle:
+    """Collection of the current client of a connection, resolved when it's used.
+
+    Handles can be created before the client is opened (e.g. at import), and they follow
+    the client when it's closed and opened again. Any attribute of the collection can
+    be used on the handle, e.g. `handle.find_one(...)`.
+    """
+
+    def __init__(self, conn: "MongoDBConnection", db_name: str, coll_name: str):
+        self._conn = conn
+        self._db_name = db_name
+        self._coll_name = coll_name
+        self._client: t.Any = None
+        self._coll: t.Any = None
+
+    def resolve(self) -> t.Any:
+        """Get the collection of the current client."""
+        client = self._conn.client
+        if client is None:
+            raise RuntimeError(
+                f"MongoDB client not open to use '{self._db_name}.{self._coll_name}'."
+            )
+        if client is not self._client:
+            self._coll = client[self._db_name][self._coll_name]
+            self._client = client
+        return self._coll
+
+    def __getattr__(self, name: str) -> t.Any:
+        if name.startswith("__"):
+            # e.g. when copied, before `__init__` set the attributes of the handle.
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
 
 class MongoDBConnection:
-    """MongoDB connection using pymongo directly."""
+    """MongoDB connection using pymongo directly.
+
+    The client is only created when opened, on the startup of the app (`connect`), so
+    importing the API doesn't create any.
+    """
 
     def __init__(self):
         self.client = None
-        self.client = self.get_client()
 
     def __del__(self):
         self.close_client()
@@ -26,9 +135,17 @@ class MongoDBConnection:
     def open_client(self) -> pym.MongoClient:
         """Opens a MongoClient if not already open."""
         if self.client is None:
-            self.client = pym.MongoClient(URI)
+            self.client = pym.MongoClient(URI, **get_client_options())
         return self.client
 
+    async def connect(self, warmup: bool = True):
+        """Open the client, and ping the server to warm up the connection pool."""
+        client = self.open_client()
+        if warmup:
+            await asyncio.get_running_loop().run_in_executor(
+                None, client.admin.command, "ping"
+            )
+
     def close_client(self):
         """Closes the current MongoClient if currently open."""
         if self.client is not None:
@@ -41,12 +158,31 @@ class MongoDBConnection:
             self.open_client()
         return self.client
 
-    def get_coll(self, db_name: str, coll_name: str):
-        """Get a collection."""
-        client: pym.MongoClient = self.client
-        database: pym_db.Database = client[db_name]
-        collection: pym_coll.Collection = database[coll_name]
-        return collection
+    def get_coll(self, db_name: str, coll_name: str) -> t.Any:
+        """Get a handle of a collection, resolved to the client open when used."""
+        return CollectionHandle(self, db_name, coll_name)
+
+
+class AsyncMongoDBConnection(MongoDBConnection):
+    """MongoDB connection using motor, so DB round trips don't block the event loop."""
+
+    def open_client(self) -> mot.AsyncIOMotorClient:
+        """Opens an AsyncIOMotorClient if not already open."""
+        if self.client is None:
+            self.client = mot.AsyncIOMotorClient(URI, **get_client_options())
+        return self.client
+
+    async def connect(self, warmup: bool = True):
+        """Open the client, and ping the server to warm up the connection pool."""
+        client = self.open_client()
+        if warmup:
+            await client.admin.command("ping")
+
 
+IS_ASYNC = config.MONGO_DRIVER == "motor"
 
-mongo_db_conn = MongoDBConnection()
+mongo_db_conn: MongoDBConnection
+if IS_ASYNC:
+    mongo_db_conn = AsyncMongoDBConnection()
+else:
+    mongo_db_conn = MongoDBConnection()
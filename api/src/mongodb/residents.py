@@ -0,0 +1,360 @@
+"""Bulk import and export of the residents of a building, with their bookings.
+
+A resident is a user of both the Auth and the Slot Booking DBs. The records are streamed
+as NDJSON (one JSON object per line) or CSV, with the fields:
+- username, email, disabled: the Auth user. An imported record has either a plain
+  `password`, hashed by the import, or a `hashed_password`. Exported records have the
+  hashed one.
+- appartment, name: the Slot Booking user, both empty for a resident that only has an
+  Auth user.
+- bookings: the booked slots, a map of "YYYY-MM-DD" dates to slot ids (in CSV, as
+  "YYYY-MM-DD:slot_id" pairs separated by ";").
+
+The import is idempotent: nothing that already exists is overwritten, so an interrupted
+import is resumed by running it again. The Auth user of each resident is written last,
+after its Slot Booking user and bookings, and the residents that already have one are
+skipped before their password is hashed.
+
+The import can run while the API is running: the caches of its workers are invalidated
+after each batch, like after the writes of the API.
+"""
+import concurrent.futures as cf
+import csv
+import dataclasses
+import json
+import typing as t
+
+import pymongo as pym
+import pymongo.collection as pym_coll
+
+from src import invalidation
+from src.auth.utils import password as auth_pwd
+from src.mongodb.models.auth import user as auth_user
+from src.mongodb.models.slot_booking import booking as lb_booking
+from src.mongodb.models.slot_booking import user as lb_user
+from src.mongodb.models.slot_booking import week_version as lb_week_version
+from src.slot_booking import models as lb_m
+from src.slot_booking.utils import datetime_utils as lb_dt_u
+
+FORMATS = ("ndjson", "csv")
+
+FIELDS = (
+    "username",
+    "email",
+    "disabled",
+    "password",
+    "hashed_password",
+    "appartment",
+    "name",
+    "bookings",
+)
+
+# Number of residents hashed and written at once.
+IMPORT_BATCH_SIZE = 500
+
+
+@dataclasses.dataclass
+class ImportResult:
+    """Counts of an import."""
+
+    imported: int = 0
+    skipped: int = 0
+    bookings: int = 0
+
+
+def read_records(file: t.TextIO, fmt: str) -> t.Iterator[dict]:
+    """Read the resident records of a file, one at a time."""
+    if fmt == "ndjson":
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        for row in csv.DictReader(file):
+            yield _from_csv_row(row)
+
+
+def write_records(file: t.TextIO, fmt: str, records: t.Iterable[dict]) -> int:
+    """Write resident records to a file, one at a time.
+
+    Returns:
+        The number of records written.
+    """
+    count = 0
+    if fmt == "ndjson":
+        for count, record in enumerate(records, start=1):
+            file.write(json.dumps(record) + "\n")
+    else:
+        writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for count, record in enumerate(records, start=1):
+            writer.writerow(_to_csv_row(record))
+    return count
+
+
+def _from_csv_row(row: dict[str, str]) -> dict:
+    record: dict[str, t.Any] = {
+        field: value for field, value in row.items() if value not in ("", None)
+    }
+    if "disabled" in record:
+        record["disabled"] = record["disabled"].lower() in ("1", "true")
+    if "appartment" in record:
+        record["appartment"] = int(record["appartment"])
+    bookings: dict[str, int] = {}
+    for pair in record.get("bookings", "").split(";"):
+        if pair:
+            date_str, _, slot_id = pair.partition(":")
+            bookings[date_str] = int(slot_id)
+    record["bookings"] = bookings
+    return record
+
+
+def _to_csv_row(record: dict) -> dict:
+    return {
+        **record,
+        "disabled": int(record.get("disabled", False)),
+        "bookings": ";".join(
+            f"{date_str}:{slot_id}"
+            for date_str, slot_id in record.get("bookings", {}).items()
+        ),
+    }
+
+
+def _batches(records: t.Iterable[dict], batch_size: int) -> t.Iterator[list[dict]]:
+    batch: list[dict] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_residents(
+    records: t.Iterable[dict],
+    auth_coll: pym_coll.Collection,
+    user_coll: pym_coll.Collection,
+    booking_coll: pym_coll.Collection,
+    week_version_coll: pym_coll.Collection,
+    executor: cf.Executor,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    invalidate: t.Optional[t.Callable[[str, dict], None]] = None,
+) -> ImportResult:
+    """Import resident records in batches, hashing their passwords with an executor.
+
+    Like in the bookings migration, a slot that is already booked keeps its booking, and
+    only the slots a resident owns are added to its embedded `bookings` map. After each
+    batch, the versions of the weeks with new bookings are bumped, and
+    `invalidate(topic, payload)` is called with the invalidations of the caches of the
+    API workers (the weeks and the users), to publish them on the invalidation bus.
+
+    Raises:
+        ValueError if a record is invalid, e.g. it has no password or a booking of an
+        invalid date: the residents of the previous batches are imported.
+    """
+    lb_booking.Booking.create_indexes(booking_coll)
+
+    result = ImportResult()
+    for batch in _batches(records, batch_size):
+        # Only the first record of a username is imported.
+        records_by_username: dict[str, dict] = {}
+        for record in batch:
+            record = _check_record(record)
+            records_by_username.setdefault(record["username"], record)
+        existing = {
+            doc["_id"]
+            for doc in auth_coll.find(
+                {"_id": {"$in": list(records_by_username)}}, {"_id": 1}
+            )
+        }
+        new_records = [
+            record
+            for username, record in records_by_username.items()
+            if username not in existing
+        ]
+        result.skipped += len(batch) - len(new_records)
+        if not new_records:
+            continue
+
+        hashed_passwords = _hash_passwords(new_records, executor)
+        users_add = {
+            record["username"]: lb_user.UserAdd(
+                appartment=record["appartment"],
+                name=record["name"],
+                bookings=record.get("bookings", {}),
+            )
+            for record in new_records
+            if record.get("appartment") is not None
+        }
+
+        # The bookings first, to know which slots each resident got.
+        booked_slots = [
+            (username, date_str, slot_id)
+            for username, user_add in users_add.items()
+            for date_str, slot_id in user_add.bookings.items()
+        ]
+        booking_operations = [
+            pym.UpdateOne(
+                {"date": date_str, "slot_id": slot_id},
+                {"$setOnInsert": {"username": username}},
+                upsert=True,
+            )
+            for username, date_str, slot_id in booked_slots
+        ]
+        if booking_operations:
+            # The slots already booked, or of a date the resident already has another
+            # slot of (e.g. with an edited file), aren't theirs.
+            result.bookings += lb_booking.upsert_many(booking_coll, booking_operations)
+        owned_slots = _get_owned_slots(booking_coll, users_add)
+        week_starts = {
+            lb_dt_u.get_week_start_date(lb_dt_u.parse_date_from_string(date_str))
+            for _, date_str, _ in owned_slots
+        }
+
+        if users_add:
+            user_coll.bulk_write(
+                [
+                    pym.UpdateOne(
+                        {"_id": username},
+                        {
+                            "$setOnInsert": {
+                                **user_add.dict(),
+                                "bookings": {
+                                    date_str: slot_id
+                                    for date_str, slot_id in user_add.bookings.items()
+                                    if (username, date_str, slot_id) in owned_slots
+                                },
+                            }
+                        },
+                        upsert=True,
+                    )
+                    for username, user_add in users_add.items()
+                ],
+                ordered=False,
+            )
+
+        # Last, as the Auth users mark the residents as imported.
+        auth_coll.bulk_write(
+            [
+                pym.UpdateOne(
+                    {"_id": record["username"]},
+                    {
+                        "$setOnInsert": auth_user.UserDB(
+                            username=record["username"],
+                            email=record["email"],
+                            disabled=record.get("disabled", False),
+                            hashed_password=hashed_password,
+                        ).dict()
+                    },
+                    upsert=True,
+                )
+                for record, hashed_password in zip(new_records, hashed_passwords)
+            ],
+            ordered=False,
+        )
+        result.imported += len(new_records)
+
+        for week_start in sorted(week_starts):
+            lb_week_version.bump(week_version_coll, week_start)
+        if invalidate is not None:
+            for week_start in sorted(week_starts):
+                invalidate(
+                    invalidation.WEEK,
+                    {"date": lb_dt_u.format_date_to_string(week_start)},
+                )
+            for record in new_records:
+                invalidate(invalidation.LB_USER, {"username": record["username"]})
+
+    return result
+
+
+def _get_owned_slots(
+    booking_coll: pym_coll.Collection, users_add: dict[str, lb_user.UserAdd]
+) -> set[tuple[str, str, int]]:
+    """Get the (username, date, slot id) of the asked slots booked by their resident.
+
+    It includes the slots they got in a previous run of an interrupted import.
+    """
+    dates = {
+        date_str for user_add in users_add.values() for date_str in user_add.bookings
+    }
+    if not dates:
+        return set()
+    docs = booking_coll.find(
+        {"username": {"$in": list(users_add)}, "date": {"$in": sorted(dates)}},
+        {"_id": 0, "username": 1, "date": 1, "slot_id": 1},
+    )
+    return {(doc["username"], doc["date"], doc["slot_id"]) for doc in docs}
+
+
+def _check_record(record: dict) -> dict:
+    """Check the fields of a record, and get it with its dates as stored in the DB.
+
+    Raises:
+        ValueError if the record is invalid.
+    """
+    username = record.get("username")
+    if not username:
+        raise ValueError("A resident has no username.")
+    if not record.get("email"):
+        raise ValueError(f"Resident '{username}' has no email.")
+    if not record.get("hashed_password") and not record.get("password"):
+        raise ValueError(f"Resident '{username}' has no password.")
+    if record.get("appartment") is not None and not record.get("name"):
+        raise ValueError(f"Resident '{username}' has an appartment but no name.")
+
+    bookings: dict[str, int] = {}
+    for date_str, slot_id in record.get("bookings", {}).items():
+        try:
+            date = lb_dt_u.parse_date_from_string(date_str)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(
+                f"Resident '{username}' has a booking of an invalid date '{date_str}'."
+            ) from exc
+        if slot_id not in lb_m.slots_hours:
+            raise ValueError(
+                f"Resident '{username}' has a booking of an invalid slot '{slot_id}'."
+            )
+        bookings[lb_dt_u.format_date_to_string(date)] = slot_id
+    return {**record, "bookings": bookings}
+
+
+def _hash_passwords(records: list[dict], executor: cf.Executor) -> list[str]:
+    """Get the hashed password of each record, hashing the plain ones in parallel."""
+    plain_passwords = [
+        record["password"] for record in records if not record.get("hashed_password")
+    ]
+    hashed = iter(executor.map(auth_pwd.get_password_hash, plain_passwords))
+    return [record.get("hashed_password") or next(hashed) for record in records]
+
+
+def export_residents(
+    auth_coll: pym_coll.Collection,
+    user_coll: pym_coll.Collection,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> t.Iterator[dict]:
+    """Get the resident records of all the Auth users, one at a time.
+
+    Both collections are read in order of username and merged as they're read, so only
+    a batch of each is held in memory.
+    """
+    users = user_coll.find({}).sort("_id", pym.ASCENDING).batch_size(batch_size)
+    user = next(users, None)
+    for auth_doc in (
+        auth_coll.find({}).sort("_id", pym.ASCENDING).batch_size(batch_size)
+    ):
+        username = auth_doc["_id"]
+        record = {
+            "username": username,
+            "email": auth_doc["email"],
+            "disabled": auth_doc.get("disabled", False),
+            "hashed_password": auth_doc["hashed_password"],
+        }
+        # Slot Booking users without an Auth user can't log in, they're left out.
+        while user is not None and user["_id"] < username:
+            user = next(users, None)
+        if user is not None and user["_id"] == username:
+            record["appartment"] = user["appartment"]
+            record["name"] = user["name"]
+            record["bookings"] = user.get("bookings", {})
+        yield record
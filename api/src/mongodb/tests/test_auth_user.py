@@ -0,0 +1,39 @@
+"""Tests for the Auth users module."""
+import asyncio
+
+import fastapi as fa
+import mongomock_motor
+import pytest
+
+from .. import user_cache as m_user_cache
+from ..models.auth import user as auth_user
+
+
+def test_async_methods():
+    """The async methods behave like the sync ones, with the motor driver."""
+    m_user_cache.user_cache.clear()
+    users = mongomock_motor.AsyncMongoMockClient()["dc_slot_booking"]["auth"]
+    user = auth_user.UserDB(
+        username="dan", email="dan@dc.com", disabled=False, hashed_password="old"
+    )
+
+    async def run():
+        await user.add_async(users)
+        with pytest.raises(fa.HTTPException) as exc_info:
+            await user.add_async(users)
+        assert exc_info.value.status_code == fa.status.HTTP_409_CONFLICT
+
+        user_db = await auth_user.UserDB.get_async(users, "dan")
+        assert user_db.hashed_password == "old"
+        result = await user_db.update_hashed_password_async(users, "new")
+        assert result.modified_count == 1
+        # Not replaced again from the outdated user.
+        result = await user_db.update_hashed_password_async(users, "newer")
+        assert result.modified_count == 0
+        return await auth_user.UserDB.get_async(users, "dan")
+
+    assert asyncio.run(run()).hashed_password == "new"
+    with pytest.raises(fa.HTTPException) as exc_info:
+        asyncio.run(auth_user.UserDB.get_async(users, "eve"))
+    assert exc_info.value.status_code == fa.status.HTTP_404_NOT_FOUND
+    m_user_cache.user_cache.clear()
@@ -0,0 +1,166 @@
+"""Tests for the bookings collection module."""
+import asyncio
+import datetime as dt
+
+import fastapi as fa
+import mongomock
+import mongomock_motor
+import pytest
+
+from ..models.slot_booking import booking as lb_booking
+
+
+@pytest.fixture(name="colls")
+def fixture_colls():
+    """Users and bookings collections in an in-memory MongoDB."""
+    database = mongomock.MongoClient()["dc_slot_booking"]
+    users = database["users"]
+    users.insert_many(
+        [
+            {"_id": "dan", "bookings": {"2022-12-07": 1}},
+            {"_id": "cosful123", "bookings": {"2022-12-06": 3, "2022-12-11": 2}},
+            {"_id": "other", "bookings": {"2022-12-07": 1, "2022-12-20": 0}},
+        ]
+    )
+    return users, database["bookings"]
+
+
+def test_migrate_from_embedded(colls):
+    """The migration copies every booking once and can be run again."""
+    users, bookings = colls
+    assert lb_booking.migrate_from_embedded(users, bookings, batch_size=2) == 4
+    assert lb_booking.migrate_from_embedded(users, bookings) == 0
+    # The slot embedded twice is kept by the first user found.
+    assert bookings.find_one({"date": "2022-12-07", "slot_id": 1})["username"] == "dan"
+
+
+def test_migrate_from_embedded_again_after_a_divergence(colls):
+    """A slot embedded for a date the user has another slot of is left out of a rerun."""
+    users, bookings = colls
+    assert lb_booking.migrate_from_embedded(users, bookings) == 4
+    # Moved to another slot in the collection, while the embedded one stayed.
+    bookings.update_one({"date": "2022-12-06"}, {"$set": {"slot_id": 4}})
+    users.update_one({"_id": "dan"}, {"$set": {"bookings.2022-12-08": 0}})
+
+    assert lb_booking.migrate_from_embedded(users, bookings, batch_size=2) == 1
+    assert bookings.find_one({"date": "2022-12-06"})["slot_id"] == 4
+    assert bookings.count_documents({}) == 5
+
+
+def test_is_migration_needed(colls):
+    """The migration is needed until the embedded bookings are in the collection."""
+    users, bookings = colls
+    assert lb_booking.is_migration_needed(users, bookings)
+    lb_booking.migrate_from_embedded(users, bookings)
+    assert not lb_booking.is_migration_needed(users, bookings)
+
+    # Nor is it without any embedded booking.
+    bookings.delete_many({})
+    users.update_many({}, {"$set": {"bookings": {}}})
+    assert not lb_booking.is_migration_needed(users, bookings)
+
+
+def test_get_range_and_occupancy(colls):
+    """Only the bookings of the requested dates are loaded."""
+    users, bookings = colls
+    lb_booking.migrate_from_embedded(users, bookings)
+
+    week = lb_booking.Booking.get_range(
+        bookings, date_from=dt.date(2022, 12, 5), date_to=dt.date(2022, 12, 11)
+    )
+    assert lb_booking.get_occupancy(week) == {
+        dt.date(2022, 12, 6): {3: "cosful123"},
+        dt.date(2022, 12, 7): {1: "dan"},
+        dt.date(2022, 12, 11): {2: "cosful123"},
+    }
+
+
+@pytest.mark.parametrize(
+    "slot_id, username",
+    [(2, "other"), (3, "dan")],
+    ids=["same slot", "same user and date"],
+)
+def test_add_duplicate(colls, slot_id, username):
+    """A slot cannot be booked twice, nor a user book twice the same date."""
+    _, bookings = colls
+    lb_booking.Booking.create_indexes(bookings)
+    lb_booking.Booking(date="2022-12-08", slot_id=2, username="dan").add(bookings)
+    with pytest.raises(fa.HTTPException) as exc_info:
+        lb_booking.Booking(date="2022-12-08", slot_id=slot_id, username=username).add(
+            bookings
+        )
+    assert exc_info.value.status_code == fa.status.HTTP_409_CONFLICT
+    assert bookings.count_documents({}) == 1
+
+
+def test_add_many_and_delete_many(colls):
+    """Each booking of a bulk write is added or rejected on its own."""
+    _, bookings = colls
+    lb_booking.Booking.create_indexes(bookings)
+    lb_booking.Booking(date="2022-12-08", slot_id=2, username="other").add(bookings)
+
+    exceptions = lb_booking.Booking.add_many(
+        bookings,
+        [
+            lb_booking.Booking(date=date_str, slot_id=2, username="dan")
+            for date_str in ("2022-12-01", "2022-12-08", "2022-12-15")
+        ],
+    )
+    assert [exc and exc.status_code for exc in exceptions] == [
+        None,
+        fa.status.HTTP_409_CONFLICT,
+        None,
+    ]
+    assert bookings.count_documents({"username": "dan"}) == 2
+
+    deleted = lb_booking.Booking.delete_many(
+        bookings, "dan", [("2022-12-01", 2), ("2022-12-08", 2), ("2022-12-15", 2)]
+    )
+    assert sorted(deleted) == [("2022-12-01", 2), ("2022-12-15", 2)]
+    assert bookings.count_documents({}) == 1
+
+
+def test_async_methods():
+    """The async methods behave like the sync ones, with the motor driver."""
+    bookings = mongomock_motor.AsyncMongoMockClient()["dc_slot_booking"]["bookings"]
+
+    async def run():
+        await lb_booking.Booking.create_indexes_async(bookings)
+        await lb_booking.Booking(
+            date="2022-12-08", slot_id=2, username="other"
+        ).add_async(bookings)
+        with pytest.raises(fa.HTTPException) as exc_info:
+            await lb_booking.Booking(
+                date="2022-12-08", slot_id=2, username="dan"
+            ).add_async(bookings)
+        assert exc_info.value.status_code == fa.status.HTTP_409_CONFLICT
+
+        exceptions = await lb_booking.Booking.add_many_async(
+            bookings,
+            [
+                lb_booking.Booking(date=date_str, slot_id=2, username="dan")
+                for date_str in ("2022-12-06", "2022-12-08", "2022-12-13")
+            ],
+        )
+        assert [exc and exc.status_code for exc in exceptions] == [
+            None,
+            fa.status.HTTP_409_CONFLICT,
+            None,
+        ]
+        week = await lb_booking.Booking.get_range_async(
+            bookings, date_from=dt.date(2022, 12, 5), date_to=dt.date(2022, 12, 11)
+        )
+        assert lb_booking.get_occupancy(week) == {
+            dt.date(2022, 12, 6): {2: "dan"},
+            dt.date(2022, 12, 8): {2: "other"},
+        }
+
+        deleted = await lb_booking.Booking.delete_many_async(
+            bookings, "dan", [("2022-12-06", 2), ("2022-12-08", 2)]
+        )
+        assert deleted == [("2022-12-06", 2)]
+        result = await lb_booking.Booking.delete_async(bookings, "dan", "2022-12-13", 2)
+        assert result.deleted_count == 1
+        assert await bookings.count_documents({}) == 1
+
+    asyncio.run(run())
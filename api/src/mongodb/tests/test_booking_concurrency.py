@@ -0,0 +1,110 @@
+"""Concurrency stress tests for booking slots.
+
+The ones against a real MongoDB are skipped unless MONGO_HOST (and MONGO_USER/MONGO_PASS)
+point to a reachable MongoDB, e.g. the one in the docker compose file. The in-memory ones
+always run.
+"""
+import asyncio
+import concurrent.futures as cf
+import threading
+
+import fastapi as fa
+import mongomock
+import pymongo as pym
+import pymongo.results as pym_res
+import pytest
+from motor import motor_asyncio as mot
+
+from .. import mongodb
+from ..models.slot_booking import booking as lb_booking
+
+N_REQUESTS = 300
+
+# Threads of the in-memory tests, all running on the same mongomock.
+N_THREADS = 50
+
+
+def _count_winners(results: list) -> int:
+    for result in results:
+        if not isinstance(result, pym_res.InsertOneResult):
+            assert isinstance(result, fa.HTTPException)
+            assert result.status_code == fa.status.HTTP_409_CONFLICT
+    return sum(isinstance(result, pym_res.InsertOneResult) for result in results)
+
+
+@pytest.mark.parametrize("contended", ["slot", "user"])
+def test_concurrent_bookings_in_memory(contended):
+    """Threads booking at once against the unique indexes: exactly one booking wins.
+
+    Either many users book the same slot, or a user books every slot of a date.
+    """
+    booking_coll = mongomock.MongoClient()["db"]["bookings"]
+    lb_booking.Booking.create_indexes(booking_coll)
+    barrier = threading.Barrier(N_THREADS)
+
+    def book(i: int):
+        if contended == "slot":
+            booking = lb_booking.Booking(date="2030-01-07", slot_id=2, username=f"u{i}")
+        else:
+            booking = lb_booking.Booking(
+                date="2030-01-07", slot_id=i % 5, username="dan"
+            )
+        barrier.wait()
+        try:
+            return booking.add(booking_coll)
+        except fa.HTTPException as exc:
+            return exc
+
+    with cf.ThreadPoolExecutor(max_workers=N_THREADS) as executor:
+        results = list(executor.map(book, range(N_THREADS)))
+
+    assert _count_winners(results) == 1
+    assert booking_coll.count_documents({}) == 1
+
+
+def test_concurrent_bookings_of_one_slot(db_name):
+    """Hundreds of users booking the same slot at once: exactly one gets it."""
+    client: pym.MongoClient = pym.MongoClient(mongodb.URI, maxPoolSize=N_REQUESTS)
+    booking_coll = client[db_name]["bookings"]
+    lb_booking.Booking.create_indexes(booking_coll)
+    barrier = threading.Barrier(N_REQUESTS)
+
+    def book(i: int):
+        booking = lb_booking.Booking(date="2030-01-07", slot_id=2, username=f"u{i}")
+        barrier.wait()
+        try:
+            return booking.add(booking_coll)
+        except fa.HTTPException as exc:
+            return exc
+
+    with cf.ThreadPoolExecutor(max_workers=N_REQUESTS) as executor:
+        results = list(executor.map(book, range(N_REQUESTS)))
+    client.close()
+
+    assert _count_winners(results) == 1
+    assert booking_coll.count_documents({}) == 1
+
+
+def test_concurrent_bookings_of_one_user(db_name):
+    """A user booking every slot of a date at once: exactly one booking is made."""
+    client: mot.AsyncIOMotorClient = mot.AsyncIOMotorClient(mongodb.URI)
+    booking_coll = client[db_name]["bookings"]
+
+    async def book_all():
+        await lb_booking.Booking.create_indexes_async(booking_coll)
+        bookings = [
+            lb_booking.Booking(date="2030-01-07", slot_id=i % 5, username="dan")
+            for i in range(N_REQUESTS)
+        ]
+        results = await asyncio.gather(
+            *(booking.add_async(booking_coll) for booking in bookings),
+            return_exceptions=True,
+        )
+        count = await booking_coll.count_documents({})
+        return results, count
+
+    results, count = asyncio.run(book_all())
+    client.close()
+
+    assert _count_winners(results) == 1
+    assert count == 1
@@ -0,0 +1,39 @@
+"""Tests for the booking history module."""
+import datetime as dt
+
+import mongomock
+
+from ..models.slot_booking import history as lb_history
+
+
+def test_rollover():
+    """Past bookings are moved to monthly history documents, and only once."""
+    database = mongomock.MongoClient()["dc_slot_booking"]
+    users, history = database["users"], database["booking_history"]
+    users.insert_many(
+        [
+            {
+                "_id": "dan",
+                "bookings": {"2022-11-30": 0, "2022-12-01": 1, "2022-12-07": 2},
+            },
+            {"_id": "other", "bookings": {"2022-12-06": 3, "2022-12-08": 4}},
+            {"_id": "new", "bookings": {}},
+        ]
+    )
+    lb_history.create_indexes(history, ttl_days=365)
+
+    before = dt.date(2022, 12, 7)
+    assert lb_history.rollover(users, history, before=before, batch_size=1) == 3
+    assert lb_history.rollover(users, history, before=before) == 0
+
+    assert users.find_one({"_id": "dan"})["bookings"] == {"2022-12-07": 2}
+    assert users.find_one({"_id": "other"})["bookings"] == {"2022-12-08": 4}
+    assert history.find_one({"_id": "dan:2022-11"})["bookings"] == {"2022-11-30": 0}
+    assert lb_history.get_bookings(history, "dan") == {
+        "2022-11-30": 0,
+        "2022-12-01": 1,
+    }
+    assert lb_history.get_bookings(history, "dan", month_from="2022-12") == {
+        "2022-12-01": 1
+    }
+    assert lb_history.get_bookings(history, "other") == {"2022-12-06": 3}
@@ -0,0 +1,32 @@
+"""Tests for the MongoDB connection module."""
+import mongomock
+import pytest
+
+from .. import mongodb
+
+
+class MongomockConnection(mongodb.MongoDBConnection):
+    """Connection with an in-memory client."""
+
+    def open_client(self):
+        if self.client is None:
+            self.client = mongomock.MongoClient()
+        return self.client
+
+
+def test_collection_handles_follow_the_client():
+    """Handles can be created before the client is open, and survive a reopening."""
+    conn = MongomockConnection()
+    users = conn.get_coll(db_name="dc_slot_booking", coll_name="users")
+    with pytest.raises(RuntimeError):
+        users.find_one({})
+
+    conn.open_client()
+    users.insert_one({"_id": "dan"})
+    assert users.full_name == "dc_slot_booking.users"
+    assert users.find_one({"_id": "dan"}) == {"_id": "dan"}
+
+    conn.close_client()
+    conn.open_client()
+    # A new in-memory client, so the handle uses its empty collection.
+    assert users.find_one({"_id": "dan"}) is None
@@ -0,0 +1,147 @@
+"""Tests for the residents import and export module."""
+import concurrent.futures as cf
+import io
+
+import mongomock
+import pytest
+
+from src import invalidation
+from src.auth.utils import password as auth_pwd
+
+from .. import residents
+
+CSV = """username,email,password,hashed_password,appartment,name,bookings
+dan,dan@x,secret,,1,Dan,2022-12-05:0;2022-12-13:4
+eve,eve@x,,$2b$12$notarealhash,2,Eve,2022-12-05:0
+admin,admin@x,,$2b$12$notarealhash,,,
+"""
+
+
+def _get_collections(database) -> dict:
+    return {
+        "auth_coll": database["auth"],
+        "user_coll": database["users"],
+        "booking_coll": database["bookings"],
+        "week_version_coll": database["week_versions"],
+    }
+
+
+def test_import_export_round_trip():
+    """Imported residents are exported as they were, and are only imported once."""
+    database = mongomock.MongoClient()["dc_slot_booking"]
+    collections = _get_collections(database)
+
+    invalidations: list[tuple[str, dict]] = []
+
+    with cf.ThreadPoolExecutor(max_workers=2) as executor:
+        result = residents.import_residents(
+            residents.read_records(io.StringIO(CSV), "csv"),
+            executor=executor,
+            batch_size=2,
+            invalidate=lambda topic, payload: invalidations.append((topic, payload)),
+            **collections,
+        )
+        assert result == residents.ImportResult(imported=3, skipped=0, bookings=2)
+        assert invalidations == [
+            (invalidation.WEEK, {"date": "2022-12-05"}),
+            (invalidation.WEEK, {"date": "2022-12-12"}),
+            (invalidation.LB_USER, {"username": "dan"}),
+            (invalidation.LB_USER, {"username": "eve"}),
+            (invalidation.LB_USER, {"username": "admin"}),
+        ]
+        result = residents.import_residents(
+            residents.read_records(io.StringIO(CSV), "csv"),
+            executor=executor,
+            **collections,
+        )
+        assert result == residents.ImportResult(imported=0, skipped=3, bookings=0)
+
+    dan = database["auth"].find_one({"_id": "dan"})
+    assert auth_pwd.verify_password("secret", dan["hashed_password"])
+    # The slot booked by both was kept by the first one, and only in its bookings.
+    assert database["bookings"].find_one({"date": "2022-12-05"})["username"] == "dan"
+    assert database["users"].find_one({"_id": "dan"})["bookings"] == {
+        "2022-12-05": 0,
+        "2022-12-13": 4,
+    }
+    assert database["users"].find_one({"_id": "eve"})["bookings"] == {}
+    assert database["users"].find_one({"_id": "admin"}) is None
+    assert database["week_versions"].count_documents({}) == 2
+
+    output = io.StringIO()
+    records = residents.export_residents(database["auth"], database["users"])
+    assert residents.write_records(output, "ndjson", records) == 3
+    exported = list(residents.read_records(io.StringIO(output.getvalue()), "ndjson"))
+    assert [record["username"] for record in exported] == ["admin", "dan", "eve"]
+    assert "appartment" not in exported[0]
+    assert exported[1]["hashed_password"] == dan["hashed_password"]
+    assert exported[1]["bookings"] == {"2022-12-05": 0, "2022-12-13": 4}
+    assert exported[2] == {
+        "username": "eve",
+        "email": "eve@x",
+        "disabled": False,
+        "hashed_password": "$2b$12$notarealhash",
+        "appartment": 2,
+        "name": "Eve",
+        "bookings": {},
+    }
+
+
+@pytest.mark.parametrize(
+    "field, value, message",
+    [
+        ("bookings", {"2023-13-40": 0}, "invalid date '2023-13-40'"),
+        ("bookings", {"05/01/2023": 0}, "invalid date '05/01/2023'"),
+        ("bookings", {"2023-01-05": 7}, "invalid slot '7'"),
+        ("name", None, "no name"),
+    ],
+)
+def test_import_invalid_record(field, value, message):
+    """An invalid record stops the import before its batch is written."""
+    database = mongomock.MongoClient()["dc_slot_booking"]
+    record = {
+        "username": "dan",
+        "email": "dan@x",
+        "hashed_password": "hash",
+        "appartment": 1,
+        "name": "Dan",
+        field: value,
+    }
+    if value is None:
+        del record[field]
+
+    with cf.ThreadPoolExecutor(max_workers=1) as executor, pytest.raises(
+        ValueError, match=message
+    ):
+        residents.import_residents(
+            [record], executor=executor, **_get_collections(database)
+        )
+    assert database["auth"].count_documents({}) == 0
+    assert database["bookings"].count_documents({}) == 0
+
+
+def test_import_resumed_with_an_edited_file():
+    """A resident doesn't get another slot of a date they have, nor is counted twice."""
+    database = mongomock.MongoClient()["dc_slot_booking"]
+    collections = _get_collections(database)
+    # Interrupted after booking 2022-12-05:0, then the file was edited.
+    database["bookings"].insert_one(
+        {"date": "2022-12-05", "slot_id": 0, "username": "dan"}
+    )
+    record = {
+        "username": "dan",
+        "email": "dan@x",
+        "hashed_password": "hash",
+        "appartment": 1,
+        "name": "Dan",
+        "bookings": {"2022-12-05": 1, "2022-12-06": 2},
+    }
+
+    with cf.ThreadPoolExecutor(max_workers=1) as executor:
+        result = residents.import_residents(
+            [record, {**record, "email": "other@x"}], executor=executor, **collections
+        )
+    assert result == residents.ImportResult(imported=1, skipped=1, bookings=1)
+    assert database["auth"].find_one({"_id": "dan"})["email"] == "dan@x"
+    assert database["users"].find_one({"_id": "dan"})["bookings"] == {"2022-12-06": 2}
+    assert database["bookings"].count_documents({"username": "dan"}) == 2
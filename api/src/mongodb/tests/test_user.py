@@ -0,0 +1,65 @@
+"""Tests for the Slot Booking users module."""
+import asyncio
+import datetime as dt
+
+import mongomock
+import mongomock_motor
+
+from .. import user_cache as m_user_cache
+from ..models.slot_booking import user as lb_user
+
+
+def test_bookings_by_others_in_range():
+    """The pipeline gets the same bookings as the full scan, only within the range."""
+    users = mongomock.MongoClient()["dc_slot_booking"]["users"]
+    users.insert_many(
+        [
+            {"_id": "dan", "bookings": {"2022-12-07": 1}},
+            {"_id": "other", "bookings": {"2022-12-05": 3, "2022-12-20": 0}},
+            {"_id": "third", "bookings": {"2022-12-07": 2, "2022-12-11": 4}},
+            {"_id": "newcomer", "bookings": {}},
+        ]
+    )
+    user_db = lb_user.User(appartment=1, name="Dan", bookings={"2022-12-07": 1})
+    monday, sunday = dt.date(2022, 12, 5), dt.date(2022, 12, 11)
+
+    in_range = user_db.get_bookings_by_others_in_range(users, "dan", monday, sunday)
+    assert in_range == {monday: [3], dt.date(2022, 12, 7): [2], sunday: [4]}
+    all_dates = user_db.get_bookings_by_others(users, "dan")
+    assert {date: all_dates[date] for date in in_range} == in_range
+
+
+def test_async_methods():
+    """The async methods behave like the sync ones, with the motor driver."""
+    m_user_cache.user_cache.clear()
+    users = mongomock_motor.AsyncMongoMockClient()["dc_slot_booking"]["users"]
+    monday, sunday = dt.date(2022, 12, 5), dt.date(2022, 12, 11)
+
+    async def run():
+        await lb_user.UserAdd(appartment=1, name="Dan").upsert_async(users, "dan")
+        await lb_user.UserAdd(
+            appartment=2, name="Eve", bookings={"2022-12-05": 3, "2022-12-20": 0}
+        ).upsert_async(users, "eve")
+        user_db = await lb_user.User.get_async(users, "dan")
+        assert user_db.name == "Dan"
+
+        await user_db.add_booking_async(users, "dan", "2022-12-07", 1)
+        await user_db.add_bookings_async(
+            users, "dan", {"2022-12-08": 2, "2022-12-09": 4}
+        )
+        await user_db.delete_booking_async(users, "dan", "2022-12-08", 2)
+        await user_db.delete_bookings_async(users, "dan", ["2022-12-09"])
+        # The writes invalidate the cached user.
+        user_db = await lb_user.User.get_async(users, "dan")
+        assert user_db.bookings == {"2022-12-07": 1}
+
+        by_others = await user_db.get_bookings_by_others_async(users, "dan")
+        in_range = await user_db.get_bookings_by_others_in_range_async(
+            users, "dan", monday, sunday
+        )
+        return by_others, in_range
+
+    by_others, in_range = asyncio.run(run())
+    assert by_others == {monday: [3], dt.date(2022, 12, 20): [0]}
+    assert in_range == {monday: [3]}
+    m_user_cache.user_cache.clear()
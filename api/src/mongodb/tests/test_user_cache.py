@@ -0,0 +1,65 @@
+"""Tests for the cache of the user profiles."""
+import mongomock
+import pytest
+
+from src.utils import cache
+
+from .. import user_cache as m_user_cache
+from ..models.auth import user as auth_user
+from ..models.slot_booking import user as lb_user
+
+
+@pytest.fixture(name="colls")
+def fixture_colls():
+    """Auth and Slot Booking users collections in an in-memory MongoDB."""
+    m_user_cache.user_cache.clear()
+    database = mongomock.MongoClient()["dc_slot_booking"]
+    auth_user.UserDB(
+        username="dan", email="dan@dc.com", disabled=False, hashed_password="hash"
+    ).add(database["auth"])
+    lb_user.UserAdd(appartment=1, name="Dan").upsert(database["users"], "dan")
+    return database["auth"], database["users"]
+
+
+def test_users_are_cached_per_collection(colls):
+    """Each model is fetched once from its own collection."""
+    auth_coll, lb_coll = colls
+    hits = m_user_cache.user_cache.hits
+    assert auth_user.UserDB.get(auth_coll, "dan").email == "dan@dc.com"
+    assert lb_user.User.get(lb_coll, "dan").name == "Dan"
+
+    auth_coll.delete_many({})
+    lb_coll.delete_many({})
+    assert auth_user.UserDB.get(auth_coll, "dan").email == "dan@dc.com"
+    assert lb_user.User.get(lb_coll, "dan").name == "Dan"
+    assert m_user_cache.user_cache.hits == hits + 2
+
+
+def test_writes_invalidate_all_the_profiles_of_the_user(colls):
+    """A booking invalidates both models of the user."""
+    auth_coll, lb_coll = colls
+    auth_user.UserDB.get(auth_coll, "dan")
+    user_db = lb_user.User.get(lb_coll, "dan")
+    hits = m_user_cache.user_cache.hits
+
+    user_db.add_booking(lb_coll, "dan", date_str="2022-12-06", slot_id=1)
+
+    assert lb_user.User.get(lb_coll, "dan").bookings == {"2022-12-06": 1}
+    auth_user.UserDB.get(auth_coll, "dan")
+    assert m_user_cache.user_cache.hits == hits
+
+
+def test_write_during_the_first_load_of_a_collection(monkeypatch):
+    """A user written while loaded from a collection for the first time isn't cached."""
+    monkeypatch.setattr(m_user_cache, "_coll_names", set())
+    m_user_cache.user_cache.clear()
+    coll_name = "dc_slot_booking.users"
+
+    assert m_user_cache.get(coll_name, "dan") is cache.MISSING
+    generation = m_user_cache.get_generation()
+    # Written (by this or another worker) while the old profile is being loaded.
+    m_user_cache.invalidate("dan")
+    stale = lb_user.UserAdd(appartment=1, name="Dan")
+    m_user_cache.set(coll_name, "dan", stale, generation)
+
+    assert m_user_cache.get(coll_name, "dan") is cache.MISSING
@@ -0,0 +1,22 @@
+"""Tests for the week versions collection module."""
+import datetime as dt
+
+import mongomock
+
+from ..models.slot_booking import week_version as lb_week_version
+
+MONDAY = dt.date(2022, 12, 5)
+
+
+def test_bump_and_get_many():
+    """Weeks start at version 0 and each bump increments only their version."""
+    week_versions = mongomock.MongoClient()["dc_slot_booking"]["week_versions"]
+    next_monday = MONDAY + dt.timedelta(weeks=1)
+
+    lb_week_version.bump(week_versions, MONDAY)
+    lb_week_version.bump(week_versions, MONDAY)
+    lb_week_version.bump(week_versions, next_monday)
+
+    assert lb_week_version.get_many(
+        week_versions, [MONDAY, next_monday, MONDAY - dt.timedelta(weeks=1)]
+    ) == {MONDAY: 2, next_monday: 1, MONDAY - dt.timedelta(weeks=1): 0}
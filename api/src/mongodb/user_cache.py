@@ -0,0 +1,51 @@
+"""Cache of the user profiles, shared by the Auth and the Slot Booking user models.
+
+The models are cached by the full name of the collection they were fetched from and the
+username. The models that write a user invalidate all its entries themselves, the writes
+done by other workers get here through the invalidation bus, and the TTL bounds how
+stale a profile can be if an invalidation is lost.
+
+The cached models are shared by all the requests, so they must not be modified.
+"""
+import typing as t
+
+import pydantic as pyd
+
+from src import config
+from src.utils import cache
+
+user_cache: cache.TTLCache[tuple[str, str], pyd.BaseModel] = cache.TTLCache(
+    maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL
+)
+
+# Full names of the collections users were looked up in, so a user is invalidated in
+# each of them, even while its first load from one is in progress.
+_coll_names: set[str] = set()
+
+M = t.TypeVar("M", bound=pyd.BaseModel)
+
+
+def get_generation() -> int:
+    """Get the generation of the cache, to take before loading a user from the DB."""
+    return user_cache.generation
+
+
+def get(coll_name: str, username: str) -> t.Any:
+    """Get the cached model of a user from a collection, or `cache.MISSING`."""
+    # Before the generation is taken to load the user, see `invalidate`.
+    _coll_names.add(coll_name)
+    return user_cache.get((coll_name, username))
+
+
+def set(  # pylint: disable=redefined-builtin
+    coll_name: str, username: str, user: M, generation: int
+) -> M:
+    """Cache the model of a user from a collection, unless it's stale already."""
+    user_cache.set((coll_name, username), user, generation=generation)
+    return user
+
+
+def invalidate(username: str):
+    """Remove the cached models of a user, from all the collections."""
+    for coll_name in list(_coll_names):
+        user_cache.invalidate((coll_name, username))
@@ -1,9 +1,13 @@
 """Routes for authentication."""
+import functools
+
 import fastapi as fa
 import pymongo.results as pym_res
 from fastapi import security as fas
 
-from src import auth, mongodb
+from src import auth, invalidation, mongodb
+from src.auth.utils import login_limit
+from src.mongodb import user_cache as m_user_cache
 from src.mongodb.models.auth import user as auth_user
 
 user_coll = mongodb.mongo_db_conn.get_coll(db_name="dc_slot_booking", coll_name="auth")
@@ -16,11 +20,51 @@ router = fa.APIRouter(
 oauth2_scheme = fas.OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
+def _on_user_changed(payload: dict):
+    """Invalidate the cached profiles of a user."""
+    m_user_cache.invalidate(payload["username"])
+
+
+# The profile cache is shared by the Auth and the Slot Booking users.
+invalidation.bus.subscribe(invalidation.AUTH_USER, _on_user_changed)
+invalidation.bus.subscribe(invalidation.LB_USER, _on_user_changed)
+invalidation.bus.subscribe_reset(m_user_cache.user_cache.clear)
+
+
+async def _get_user_db(username: str) -> auth_user.UserDB:
+    """Fetch a user with the configured MongoDB driver."""
+    if mongodb.IS_ASYNC:
+        return await auth_user.UserDB.get_async(user_coll=user_coll, username=username)
+    return auth_user.UserDB.get(user_coll=user_coll, username=username)
+
+
+async def _add_user_db(user_db: auth_user.UserDB) -> pym_res.InsertOneResult:
+    """Add a user with the configured MongoDB driver."""
+    if mongodb.IS_ASYNC:
+        return await user_db.add_async(user_coll=user_coll)
+    return user_db.add(user_coll=user_coll)
+
+
+async def _update_hashed_password(user_db: auth_user.UserDB, hashed_password: str):
+    """Store the new hash of a user's password with the configured MongoDB driver."""
+    if mongodb.IS_ASYNC:
+        await user_db.update_hashed_password_async(
+            user_coll=user_coll, hashed_password=hashed_password
+        )
+    else:
+        user_db.update_hashed_password(
+            user_coll=user_coll, hashed_password=hashed_password
+        )
+    await invalidation.bus.publish(
+        invalidation.AUTH_USER, {"username": user_db.username}
+    )
+
+
 @router.post("/register")
 async def register(new_user: auth_user.UserRegister):
     """Registers a new user."""
     # Parse new user to validate username and password and get the hashed password.
-    parsed_new_user = auth.parse_new_user(
+    parsed_new_user = await auth.parse_new_user(
         username=new_user.username, password=new_user.password
     )
 
@@ -31,25 +75,38 @@ async def register(new_user: auth_user.UserRegister):
         hashed_password=parsed_new_user.hashed_password,
     )
 
-    insert_one_result: pym_res.InsertOneResult = new_user_db.add(user_coll=user_coll)
+    insert_one_result = await _add_user_db(new_user_db)
     new_user_id = str(insert_one_result.inserted_id)
+    await invalidation.bus.publish(
+        invalidation.AUTH_USER, {"username": new_user.username}
+    )
 
     return {"id_": new_user_id}
 
 
 @router.post("/login")
-async def login(form_data: fas.OAuth2PasswordRequestForm = fa.Depends()):
-    """Logins a user (using username and password) and returns a token."""
-    user_from_db = auth_user.UserDB.get(
-        user_coll=user_coll, username=form_data.username
-    )
+async def login(
+    request: fa.Request, form_data: fas.OAuth2PasswordRequestForm = fa.Depends()
+):
+    """Logins a user (using username and password) and returns a token.
+
+    The attempts are rate limited per client IP and per username, and the number of
+    password verifications in progress is capped, before anything is fetched or
+    verified: the rejected ones get a "429 Too Many Requests" right away. A password
+    whose hash has an outdated scheme or cost is rehashed, and the new hash stored.
+    """
+    client_ip = request.client.host if request.client is not None else None
+    login_limit.check_rate(client_ip, form_data.username)
 
     try:
-        token = auth.authenticate_user(
-            username=form_data.username,
-            password=form_data.password,
-            hashed_password=user_from_db.hashed_password,
-        )
+        with login_limit.verification_slot():
+            user_from_db = await _get_user_db(form_data.username)
+            token = await auth.authenticate_user(
+                username=form_data.username,
+                password=form_data.password,
+                hashed_password=user_from_db.hashed_password,
+                on_rehash=functools.partial(_update_hashed_password, user_from_db),
+            )
     except ValueError as exc:
         raise fa.HTTPException(
             status_code=fa.status.HTTP_401_UNAUTHORIZED,
@@ -64,7 +121,7 @@ async def login(form_data: fas.OAuth2PasswordRequestForm = fa.Depends()):
 async def get_users_me(token: str = fa.Depends(oauth2_scheme)):
     """Get the user making the request taken from the bearer token."""
     token_data = auth.decode_token(token)
-    user_db = auth_user.UserDB.get(user_coll=user_coll, username=token_data.username)
+    user_db = await _get_user_db(token_data.username)
     if user_db.disabled:
         raise fa.HTTPException(
             status_code=fa.status.HTTP_401_UNAUTHORIZED, detail="Inactive user"
@@ -1,21 +1,48 @@
 """Routes for slot booking."""
+import asyncio
 import datetime as dt
+import hashlib
 import typing as t
 
 import fastapi as fa
 import pydantic as pyd
+import pymongo.results as pym_res
 
-from src import auth
+from src import auth, config, invalidation
 from src import slot_booking as lb
 from src import mongodb
 from src.slot_booking import models as lb_m
+from src.slot_booking import week_grid as lb_wg
 from src.slot_booking.utils import datetime_utils as lb_dt_u
+from src.mongodb.models.slot_booking import booking as lb_booking
 from src.mongodb.models.slot_booking import user as lb_user
+from src.mongodb.models.slot_booking import week_version as lb_week_version
 from src.routers import auth_router
+from src.utils import cache, responses
 
 lb_user_coll = mongodb.mongo_db_conn.get_coll(
     db_name="dc_slot_booking", coll_name="users"
 )
+lb_booking_coll = mongodb.mongo_db_conn.get_coll(
+    db_name="dc_slot_booking", coll_name="bookings"
+)
+lb_week_version_coll = mongodb.mongo_db_conn.get_coll(
+    db_name="dc_slot_booking", coll_name="week_versions"
+)
+
+# Maximum number of weeks that can be requested at once in `get_weeks`.
+MAX_WEEKS_PER_REQUEST = 8
+
+# Maximum number of slots that can be booked (or unbooked) at once in a batch.
+MAX_SLOTS_PER_BATCH = 64
+
+# Format of the weeks returned by `get_week` and `get_weeks`:
+# - "default": a `WeekSlotsDict`, a map of dates to maps of slot ids to statuses.
+# - "compact": a `CompactWeekSlotsDict`, with a list of statuses per date.
+WeekFormat = t.Literal["default", "compact"]
+
+# Media type that asks for the compact format in the "Accept" header.
+COMPACT_MEDIA_TYPE = "application/vnd.dc-slot-booking.compact+json"
 
 router = fa.APIRouter(
     prefix="/booking",
@@ -23,10 +50,457 @@ router = fa.APIRouter(
 )
 
 
+@router.on_event("startup")
+async def create_indexes():
+    """Create the indexes of the bookings collection on app startup."""
+    if mongodb.IS_ASYNC:
+        await lb_booking.Booking.create_indexes_async(lb_booking_coll)
+    else:
+        lb_booking.Booking.create_indexes(lb_booking_coll)
+
+
+@router.on_event("startup")
+async def check_bookings_store():
+    """Refuse to start from an empty bookings collection when it's not migrated yet.
+
+    The weeks would look free while the users still have embedded bookings, see
+    `src.scripts.migrate_bookings`.
+    """
+    if config.BOOKINGS_STORE != "collection":
+        return
+    if mongodb.IS_ASYNC:
+        is_migration_needed = await lb_booking.is_migration_needed_async(
+            user_coll=lb_user_coll, booking_coll=lb_booking_coll
+        )
+    else:
+        is_migration_needed = lb_booking.is_migration_needed(
+            user_coll=lb_user_coll, booking_coll=lb_booking_coll
+        )
+    if is_migration_needed:
+        raise RuntimeError(
+            "The users have embedded bookings but the bookings collection is empty: "
+            "start with BOOKINGS_STORE=embedded and run the bookings migration first."
+        )
+
+
 def _parse_slot_id_from_string(slot_id: lb_m.SlotIdStr) -> lb_m.SlotIdInt:
     return t.cast(lb_m.SlotIdInt, int(slot_id))
 
 
+# The following helpers run the DB operations with the configured MongoDB driver.
+
+
+async def _get_user(username: str) -> lb_user.User:
+    if mongodb.IS_ASYNC:
+        return await lb_user.User.get_async(user_coll=lb_user_coll, username=username)
+    return lb_user.User.get(user_coll=lb_user_coll, username=username)
+
+
+async def _upsert_user(user_add: lb_user.UserAdd, username: str):
+    if mongodb.IS_ASYNC:
+        await user_add.upsert_async(user_coll=lb_user_coll, username=username)
+    else:
+        user_add.upsert(user_coll=lb_user_coll, username=username)
+
+
+async def _get_weeks_versions(week_starts: list[dt.date]) -> dict[dt.date, int]:
+    if mongodb.IS_ASYNC:
+        return await lb_week_version.get_many_async(lb_week_version_coll, week_starts)
+    return lb_week_version.get_many(lb_week_version_coll, week_starts)
+
+
+async def _get_weeks_occupancy(
+    week_starts: list[dt.date],
+    versions: t.Optional[dict[dt.date, int]] = None,
+) -> dict[dt.date, lb_m.WeekOccupancyDict]:
+    """Get the occupancy of weeks from the cache, or from the bookings collection.
+
+    Each week is cached with the version it had before it was loaded, and a cached week
+    of another version than the given one (e.g. the version of the ETag of the response,
+    when the invalidation of a change hasn't reached this worker yet) is loaded again.
+    The versions are read first if not given. All the weeks that aren't cached are loaded
+    with a single range query.
+    """
+    if versions is None:
+        versions = await _get_weeks_versions(week_starts)
+    weeks_occupancy: dict[dt.date, lb_m.WeekOccupancyDict] = {}
+    missing_week_starts: list[dt.date] = []
+    for week_start in week_starts:
+        entry = lb.week_occupancy_cache.get(week_start)
+        if entry is cache.MISSING or entry[0] != versions[week_start]:
+            missing_week_starts.append(week_start)
+        else:
+            weeks_occupancy[week_start] = entry[1]
+    if not missing_week_starts:
+        return weeks_occupancy
+
+    generation = lb.week_occupancy_cache.generation
+    date_from = min(missing_week_starts)
+    date_to = max(missing_week_starts) + dt.timedelta(days=6)
+    if mongodb.IS_ASYNC:
+        bookings = await lb_booking.Booking.get_range_async(
+            booking_coll=lb_booking_coll, date_from=date_from, date_to=date_to
+        )
+    else:
+        bookings = lb_booking.Booking.get_range(
+            booking_coll=lb_booking_coll, date_from=date_from, date_to=date_to
+        )
+    loaded_weeks_occupancy = lb.split_weeks(
+        lb_booking.get_occupancy(bookings), week_starts=missing_week_starts
+    )
+    for week_start, occupancy in loaded_weeks_occupancy.items():
+        lb.week_occupancy_cache.set(
+            week_start, (versions[week_start], occupancy), generation=generation
+        )
+    weeks_occupancy.update(loaded_weeks_occupancy)
+
+    return weeks_occupancy
+
+
+async def _get_bookings_by_others_in_range(
+    username: str, user_db: lb_user.User, date_from: dt.date, date_to: dt.date
+) -> lb_m.SlotsTakenDict:
+    if mongodb.IS_ASYNC:
+        return await user_db.get_bookings_by_others_in_range_async(
+            user_coll=lb_user_coll,
+            username=username,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    return user_db.get_bookings_by_others_in_range(
+        user_coll=lb_user_coll, username=username, date_from=date_from, date_to=date_to
+    )
+
+
+async def _get_bookings(
+    username: str,
+    user_db: lb_user.User,
+    week_starts: list[dt.date],
+    versions: t.Optional[dict[dt.date, int]] = None,
+) -> list[tuple[lb_m.SlotsTakenDict, lb_m.SlotsTakenDict]]:
+    """Get the bookings by the user and by others of each week, from the configured store.
+
+    The bookings of all the weeks are loaded from the DB at once.
+    """
+    if config.BOOKINGS_STORE == "embedded":
+        bookings_by_user = user_db.get_bookings()
+        if config.EMBEDDED_BOOKINGS_QUERY == "aggregate":
+            bookings_by_others = await _get_bookings_by_others_in_range(
+                username=username,
+                user_db=user_db,
+                date_from=min(week_starts),
+                date_to=max(week_starts) + dt.timedelta(days=6),
+            )
+        elif mongodb.IS_ASYNC:
+            bookings_by_others = await user_db.get_bookings_by_others_async(
+                user_coll=lb_user_coll, username=username
+            )
+        else:
+            bookings_by_others = user_db.get_bookings_by_others(
+                user_coll=lb_user_coll, username=username
+            )
+        # These are the bookings of all the dates (or of all the weeks), so they're
+        # valid for every week.
+        return [(bookings_by_user, bookings_by_others)] * len(week_starts)
+
+    weeks_occupancy = await _get_weeks_occupancy(week_starts, versions)
+    return [
+        lb.split_occupancy(weeks_occupancy[week_start], username=username)
+        for week_start in week_starts
+    ]
+
+
+def _on_week_invalidated(payload: dict):
+    """Invalidate the cached occupancy of the week of a date."""
+    date = lb_dt_u.parse_date_from_string(payload["date"])
+    lb.week_occupancy_cache.invalidate(lb_dt_u.get_week_start_date(date))
+
+
+def _on_slot_changed(payload: dict):
+    """Push a booking (or an unbooking) to the clients subscribed in this worker."""
+    date = lb_dt_u.parse_date_from_string(payload["date"])
+    lb.slot_changes_hub.publish(
+        date, slot_id=payload["slot_id"], username=payload["username"]
+    )
+
+
+invalidation.bus.subscribe(invalidation.WEEK, _on_week_invalidated)
+invalidation.bus.subscribe(invalidation.SLOT, _on_slot_changed)
+invalidation.bus.subscribe_reset(lb.week_occupancy_cache.clear)
+
+
+async def _invalidate_user(username: str):
+    """Invalidate the cached profiles of a user, in every worker."""
+    await invalidation.bus.publish(invalidation.LB_USER, {"username": username})
+
+
+async def _invalidate_week(date_str: str):
+    """Invalidate the cached occupancy of the week of a date, in every worker."""
+    await invalidation.bus.publish(invalidation.WEEK, {"date": date_str})
+
+
+async def _bump_week_version(date_str: str):
+    """Bump the version of the week of a date, after a change of its bookings."""
+    week_start = lb_dt_u.get_week_start_date(lb_dt_u.parse_date_from_string(date_str))
+    if mongodb.IS_ASYNC:
+        await lb_week_version.bump_async(lb_week_version_coll, week_start)
+    else:
+        lb_week_version.bump(lb_week_version_coll, week_start)
+
+
+def _get_weeks_etag(
+    username: str,
+    target_datetime: dt.datetime,
+    offsets: list[int],
+    versions: dict[dt.date, int],
+    compact: bool,
+) -> str:
+    """Get the ETag of the slots of some weeks as seen by a user at a datetime.
+
+    The slots only change when the bookings of the weeks do (which bumps their
+    versions), or when some slot starts and becomes unavailable. The weeks must then be
+    loaded for the same versions.
+    """
+    weeks_dates = [
+        lb_dt_u.get_week_dates(target_datetime, offset) for offset in offsets
+    ]
+
+    key = ";".join(
+        [config.BOOKINGS_STORE, username, "compact" if compact else "default"]
+        + [
+            f"{week_dates[0]}:{versions[week_dates[0]]}:"
+            f"{lb_wg.count_past_slots(week_dates, target_datetime)}"
+            for week_dates in weeks_dates
+        ]
+    )
+    return f'"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: t.Optional[str], etag: str) -> bool:
+    """Check if an "If-None-Match" header matches an ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for "If-None-Match".
+    return "*" in tags or etag in [tag.removeprefix("W/") for tag in tags]
+
+
+def _etag_headers(etag: str) -> dict[str, str]:
+    # Clients may store the response, but must check it's still fresh before use. The
+    # format and the compression of the weeks depend on the request headers.
+    return {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept, Accept-Encoding",
+    }
+
+
+def _is_compact(week_format: WeekFormat, accept: t.Optional[str]) -> bool:
+    """Check if the compact format of the weeks is asked for."""
+    return week_format == "compact" or (
+        accept is not None and COMPACT_MEDIA_TYPE in accept
+    )
+
+
+def _compact_response(
+    content: t.Any, accept_encoding: t.Optional[str], etag: str
+) -> fa.Response:
+    """Response with weeks in the compact format, serialized without FastAPI."""
+    return responses.json_response(
+        content,
+        media_type=COMPACT_MEDIA_TYPE,
+        accept_encoding=accept_encoding,
+        gzip_min_size=config.COMPACT_GZIP_MIN_SIZE,
+        headers=_etag_headers(etag),
+    )
+
+
+async def _publish_slot_change(
+    date_str: str, slot_id: lb_m.SlotIdInt, username: t.Optional[str]
+):
+    """Push a booking (or an unbooking if `username` is None) to every worker."""
+    await invalidation.bus.publish(
+        invalidation.SLOT, {"date": date_str, "slot_id": slot_id, "username": username}
+    )
+
+
+async def _add_booking(
+    user_db: lb_user.User,
+    username: str,
+    date_str: str,
+    slot_id: lb_m.SlotIdInt,
+) -> pym_res.UpdateResult:
+    """Add a booking to both stores.
+
+    The bookings collection holds the ownership record of the slot: its insert is the
+    single atomic write that decides who gets the slot under contention (the checks of
+    the week slots done before are only there to give a precise error). Only the winner
+    then updates its embedded map, which is kept in sync so both stores can be read from.
+    """
+    booking = lb_booking.Booking(date=date_str, slot_id=slot_id, username=username)
+    try:
+        if mongodb.IS_ASYNC:
+            await booking.add_async(booking_coll=lb_booking_coll)
+            result = await user_db.add_booking_async(
+                user_coll=lb_user_coll,
+                username=username,
+                date_str=date_str,
+                slot_id=slot_id,
+            )
+        else:
+            booking.add(booking_coll=lb_booking_coll)
+            result = user_db.add_booking(
+                user_coll=lb_user_coll,
+                username=username,
+                date_str=date_str,
+                slot_id=slot_id,
+            )
+    finally:
+        # Also when the slot was already booked: the cached week was stale then.
+        await _invalidate_week(date_str)
+        await _bump_week_version(date_str)
+        await _invalidate_user(username)
+
+    await _publish_slot_change(date_str, slot_id=slot_id, username=username)
+    return result
+
+
+async def _delete_booking(
+    user_db: lb_user.User,
+    username: str,
+    date_str: str,
+    slot_id: lb_m.SlotIdInt,
+) -> pym_res.UpdateResult:
+    """Delete a booking from both stores."""
+    try:
+        if mongodb.IS_ASYNC:
+            delete_result = await lb_booking.Booking.delete_async(
+                booking_coll=lb_booking_coll,
+                username=username,
+                date_str=date_str,
+                slot_id=slot_id,
+            )
+            result = await user_db.delete_booking_async(
+                user_coll=lb_user_coll,
+                username=username,
+                date_str=date_str,
+                slot_id=slot_id,
+            )
+        else:
+            delete_result = lb_booking.Booking.delete(
+                booking_coll=lb_booking_coll,
+                username=username,
+                date_str=date_str,
+                slot_id=slot_id,
+            )
+            result = user_db.delete_booking(
+                user_coll=lb_user_coll,
+                username=username,
+                date_str=date_str,
+                slot_id=slot_id,
+            )
+    finally:
+        await _invalidate_week(date_str)
+        await _bump_week_version(date_str)
+        await _invalidate_user(username)
+
+    if delete_result.deleted_count:
+        await _publish_slot_change(date_str, slot_id=slot_id, username=None)
+    return result
+
+
+async def _invalidate_weeks(date_strs: list[str]):
+    """Invalidate and bump the version of each week of some dates, once per week."""
+    date_str_by_week = {
+        lb_dt_u.get_week_start_date(lb_dt_u.parse_date_from_string(date_str)): date_str
+        for date_str in date_strs
+    }
+    for date_str in date_str_by_week.values():
+        await _invalidate_week(date_str)
+        await _bump_week_version(date_str)
+
+
+async def _add_bookings(
+    user_db: lb_user.User,
+    username: str,
+    slots: list[tuple[str, lb_m.SlotIdInt]],
+) -> tuple[list[t.Optional[fa.HTTPException]], t.Optional[pym_res.UpdateResult]]:
+    """Add several bookings, given as (date_str, slot_id), to both stores at once.
+
+    Like in `_add_booking`, each insert in the bookings collection decides who gets the
+    slot, and then the slots the user got are added to its embedded map.
+    """
+    bookings = [
+        lb_booking.Booking(date=date_str, slot_id=slot_id, username=username)
+        for date_str, slot_id in slots
+    ]
+    result = None
+    try:
+        if mongodb.IS_ASYNC:
+            exceptions = await lb_booking.Booking.add_many_async(
+                booking_coll=lb_booking_coll, bookings=bookings
+            )
+        else:
+            exceptions = lb_booking.Booking.add_many(
+                booking_coll=lb_booking_coll, bookings=bookings
+            )
+        added = {
+            date_str: slot_id
+            for (date_str, slot_id), exc in zip(slots, exceptions)
+            if exc is None
+        }
+        if added and mongodb.IS_ASYNC:
+            result = await user_db.add_bookings_async(
+                user_coll=lb_user_coll, username=username, bookings=added
+            )
+        elif added:
+            result = user_db.add_bookings(
+                user_coll=lb_user_coll, username=username, bookings=added
+            )
+    finally:
+        await _invalidate_weeks([date_str for date_str, _ in slots])
+        await _invalidate_user(username)
+
+    for date_str, slot_id in added.items():
+        await _publish_slot_change(date_str, slot_id=slot_id, username=username)
+    return exceptions, result
+
+
+async def _delete_bookings(
+    user_db: lb_user.User,
+    username: str,
+    slots: list[tuple[str, lb_m.SlotIdInt]],
+) -> pym_res.UpdateResult:
+    """Delete several bookings, given as (date_str, slot_id), from both stores at once.
+
+    Only the slots that were deleted from the bookings collection are published as
+    available.
+    """
+    date_strs = [date_str for date_str, _ in slots]
+    try:
+        if mongodb.IS_ASYNC:
+            deleted = await lb_booking.Booking.delete_many_async(
+                booking_coll=lb_booking_coll, username=username, slots=slots
+            )
+            result = await user_db.delete_bookings_async(
+                user_coll=lb_user_coll, username=username, date_strs=date_strs
+            )
+        else:
+            deleted = lb_booking.Booking.delete_many(
+                booking_coll=lb_booking_coll, username=username, slots=slots
+            )
+            result = user_db.delete_bookings(
+                user_coll=lb_user_coll, username=username, date_strs=date_strs
+            )
+    finally:
+        await _invalidate_weeks(date_strs)
+        await _invalidate_user(username)
+
+    for date_str, slot_id in deleted:
+        await _publish_slot_change(date_str, slot_id=slot_id, username=None)
+    return result
+
+
 @router.post("/add_user")
 async def add_user(
     user_add: lb_user.UserAdd,
@@ -38,58 +512,288 @@ async def add_user(
     Slot Booking DB.
     """
     token_data = auth.decode_token(token)
-    user_add.upsert(user_coll=lb_user_coll, username=token_data.username)
+    date_strs = list(user_add.bookings)
+    try:
+        for date_str in date_strs:
+            lb_dt_u.parse_date_from_string(date_str)
+    except ValueError as exc:
+        raise fa.HTTPException(
+            status_code=fa.status.HTTP_400_BAD_REQUEST,
+            detail="Bad date format, please use YYYY-MM-DD.",
+        ) from exc
+
+    if config.BOOKINGS_STORE == "embedded":
+        # The embedded bookings of the user, the new and the replaced ones, are part
+        # of the occupancy of their weeks.
+        try:
+            date_strs += list((await _get_user(token_data.username)).bookings)
+        except fa.HTTPException:
+            pass
+    await _upsert_user(user_add, username=token_data.username)
+    await _invalidate_user(token_data.username)
+    if config.BOOKINGS_STORE == "embedded":
+        await _invalidate_weeks(date_strs)
     return user_add
 
 
-def _init_lb_manager(
+def _get_week_starts(target_datetime: dt.datetime, offsets: list[int]) -> list[dt.date]:
+    return [lb_dt_u.get_week_dates(target_datetime, offset)[0] for offset in offsets]
+
+
+async def _init_lb_managers(
     username: str,
     user_db: lb_user.User,
     target_datetime: dt.datetime,
-    offset: int,
-) -> lb.SlotBookingManager:
-    bookings_by_user = user_db.get_bookings()
+    offsets: list[int],
+    versions: t.Optional[dict[dt.date, int]] = None,
+) -> list[lb.SlotBookingManager]:
+    week_starts = _get_week_starts(target_datetime, offsets)
 
-    bookings_by_others = user_db.get_bookings_by_others(
-        user_coll=lb_user_coll,
+    weeks_bookings = await _get_bookings(
         username=username,
+        user_db=user_db,
+        week_starts=week_starts,
+        versions=versions,
     )
 
-    lb_manager = lb.SlotBookingManager(
-        offset=offset,
+    lb_managers = [
+        lb.SlotBookingManager(
+            offset=offset,
+            target_datetime=target_datetime,
+            slots_booked_by_others=bookings_by_others,
+            slots_booked_by_user=bookings_by_user,
+        )
+        for offset, (bookings_by_user, bookings_by_others) in zip(
+            offsets, weeks_bookings
+        )
+    ]
+
+    return lb_managers
+
+
+async def _init_lb_manager(
+    username: str,
+    user_db: lb_user.User,
+    target_datetime: dt.datetime,
+    offset: int,
+    versions: t.Optional[dict[dt.date, int]] = None,
+) -> lb.SlotBookingManager:
+    lb_managers = await _init_lb_managers(
+        username=username,
+        user_db=user_db,
         target_datetime=target_datetime,
-        slots_booked_by_others=bookings_by_others,
-        slots_booked_by_user=bookings_by_user,
+        offsets=[offset],
+        versions=versions,
     )
-
-    return lb_manager
+    return lb_managers[0]
 
 
 @router.get("/get_week")
 async def get_week(
+    response: fa.Response,
     token: str = fa.Depends(auth_router.oauth2_scheme),
     offset: int = 0,
+    week_format: WeekFormat = fa.Query(default="default", alias="format"),
+    accept: t.Optional[str] = fa.Header(default=None),
+    accept_encoding: t.Optional[str] = fa.Header(default=None),
+    if_none_match: t.Optional[str] = fa.Header(default=None),
 ) -> lb_m.WeekSlotsDict:
-    """Get the slots data for the requested week."""
+    """Get the slots data for the requested week.
+
+    The response has an ETag, and a request with a matching "If-None-Match" gets a
+    "304 Not Modified" without loading the user nor the bookings.
+
+    The week is returned in the compact format with `?format=compact` or the compact
+    media type in "Accept", gzip-compressed when large enough and accepted.
+    """
     token_data = auth.decode_token(token)
 
     now = dt.datetime.now()
+    compact = _is_compact(week_format, accept)
 
-    user_db = lb_user.User.get(
-        user_coll=lb_user_coll,
-        username=token_data.username,
+    versions = await _get_weeks_versions(_get_week_starts(now, [offset]))
+    etag = _get_weeks_etag(
+        token_data.username, now, offsets=[offset], versions=versions, compact=compact
     )
+    if _etag_matches(if_none_match, etag):
+        return fa.Response(
+            status_code=fa.status.HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag)
+        )
+    response.headers.update(_etag_headers(etag))
 
-    lb_manager = _init_lb_manager(
+    user_db = await _get_user(token_data.username)
+
+    lb_manager = await _init_lb_manager(
         username=token_data.username,
         user_db=user_db,
         target_datetime=now,
         offset=offset,
+        versions=versions,
     )
 
+    if compact:
+        return _compact_response(
+            lb_manager.get_compact_week_slots(), accept_encoding, etag
+        )
     return lb_manager.week_slots
 
 
+@router.get("/get_weeks")
+async def get_weeks(
+    response: fa.Response,
+    token: str = fa.Depends(auth_router.oauth2_scheme),
+    offset_from: int = 0,
+    count: int = fa.Query(default=4, ge=1, le=MAX_WEEKS_PER_REQUEST),
+    week_format: WeekFormat = fa.Query(default="default", alias="format"),
+    accept: t.Optional[str] = fa.Header(default=None),
+    accept_encoding: t.Optional[str] = fa.Header(default=None),
+    if_none_match: t.Optional[str] = fa.Header(default=None),
+) -> list[lb_m.WeekSlotsDict]:
+    """Get the slots data for `count` consecutive weeks, starting at `offset_from`.
+
+    The bookings of all the weeks are loaded with a single DB query, so e.g. a month
+    view costs a single request. The response has an ETag, and the weeks can be in the
+    compact format, like in `get_week`.
+    """
+    token_data = auth.decode_token(token)
+
+    now = dt.datetime.now()
+    offsets = list(range(offset_from, offset_from + count))
+    compact = _is_compact(week_format, accept)
+
+    versions = await _get_weeks_versions(_get_week_starts(now, offsets))
+    etag = _get_weeks_etag(
+        token_data.username, now, offsets=offsets, versions=versions, compact=compact
+    )
+    if _etag_matches(if_none_match, etag):
+        return fa.Response(
+            status_code=fa.status.HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag)
+        )
+    response.headers.update(_etag_headers(etag))
+
+    user_db = await _get_user(token_data.username)
+
+    lb_managers = await _init_lb_managers(
+        username=token_data.username,
+        user_db=user_db,
+        target_datetime=now,
+        offsets=offsets,
+        versions=versions,
+    )
+
+    if compact:
+        return _compact_response(
+            [lb_manager.get_compact_week_slots() for lb_manager in lb_managers],
+            accept_encoding,
+            etag,
+        )
+    return [lb_manager.week_slots for lb_manager in lb_managers]
+
+
+class SlotChangesSubscribeMsg(pyd.BaseModel):
+    """Model for the messages to subscribe to the changes of some weeks."""
+
+    offset_from: int = 0
+    count: int = pyd.Field(default=4, ge=1, le=MAX_WEEKS_PER_REQUEST)
+
+
+async def _send_subscribed_weeks(
+    websocket: fa.WebSocket,
+    subscription: lb.Subscription,
+    offsets: list[int],
+):
+    """Subscribe to the changes of some weeks, and send their current slots."""
+    now = dt.datetime.now()
+    # Subscribe before loading the weeks, so no change is missed in between.
+    lb.slot_changes_hub.set_weeks(
+        subscription,
+        [lb_dt_u.get_week_dates(now, offset)[0] for offset in offsets],
+    )
+    # The user is fetched again, its embedded bookings may have changed since.
+    user_db = await _get_user(subscription.username)
+    lb_managers = await _init_lb_managers(
+        username=subscription.username,
+        user_db=user_db,
+        target_datetime=now,
+        offsets=offsets,
+    )
+    await websocket.send_json(
+        {
+            "type": "weeks",
+            "offsets": offsets,
+            "weeks": fa.encoders.jsonable_encoder(
+                [lb_manager.week_slots for lb_manager in lb_managers]
+            ),
+        }
+    )
+
+
+async def _serve_slot_changes(websocket: fa.WebSocket, subscription: lb.Subscription):
+    """Handle the subscription messages and push the changes until disconnected."""
+    offsets: list[int] = []
+    receive = asyncio.ensure_future(websocket.receive_json())
+    changes = asyncio.ensure_future(subscription.get_changes())
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {receive, changes}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if receive in done:
+                try:
+                    msg = SlotChangesSubscribeMsg(**receive.result())
+                except (ValueError, TypeError) as exc:
+                    await websocket.send_json({"type": "error", "detail": str(exc)})
+                else:
+                    offsets = list(range(msg.offset_from, msg.offset_from + msg.count))
+                    await _send_subscribed_weeks(websocket, subscription, offsets)
+                receive = asyncio.ensure_future(websocket.receive_json())
+            if changes in done:
+                if subscription.overflowed:
+                    # Some changes were dropped, so the client needs all the slots.
+                    subscription.overflowed = False
+                    await _send_subscribed_weeks(websocket, subscription, offsets)
+                else:
+                    await websocket.send_json(
+                        {"type": "changes", "changes": changes.result()}
+                    )
+                changes = asyncio.ensure_future(subscription.get_changes())
+    finally:
+        receive.cancel()
+        changes.cancel()
+
+
+@router.websocket("/slot_changes")
+async def slot_changes(websocket: fa.WebSocket, token: str):
+    """Push the changes of the slots of some weeks, to avoid polling `get_week`.
+
+    The token goes in the query (browsers can't set headers on websockets). The client
+    sends `{"offset_from": 0, "count": 4}` to (re)subscribe to some weeks, and gets their
+    slots as `{"type": "weeks", "weeks": [...]}` (like in `get_weeks`) and then each
+    batch of changes as `{"type": "changes", "changes": [[date, slot_id, status]]}`.
+    The connection is closed when the token expires.
+    """
+    try:
+        token_data = auth.decode_token(token)
+        await _get_user(token_data.username)
+    except fa.HTTPException:
+        await websocket.close(code=fa.status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = lb.slot_changes_hub.subscribe(token_data.username)
+    expires_in = (token_data.expiration - dt.datetime.now()).total_seconds()
+    try:
+        await asyncio.wait_for(
+            _serve_slot_changes(websocket, subscription), timeout=expires_in
+        )
+    except asyncio.TimeoutError:
+        await websocket.close(code=fa.status.WS_1008_POLICY_VIOLATION)
+    except fa.WebSocketDisconnect:
+        pass
+    finally:
+        lb.slot_changes_hub.unsubscribe(subscription)
+
+
 class BookSlotReqBody(pyd.BaseModel):
     """Model for the body of a book_slot request."""
 
@@ -107,27 +811,57 @@ class BookSlotResp(pyd.BaseModel):
     matched_count: str
 
 
-def _get_week_for_booking_slot(
+async def _get_week_for_booking_slot(
     username: str,
     date: dt.date,
     user_db: lb_user.User,
 ) -> lb.SlotBookingManager:
     """Before booking/unbooking a slot, get the week slots."""
-    # Calculate the offset needed to get the correct week.
     now = dt.datetime.now()
-    today = now.date()
-    offset = ((date - today).days - (7 - today.weekday())) // 7 + 1
 
-    lb_manager = _init_lb_manager(
+    lb_manager = await _init_lb_manager(
         username=username,
         user_db=user_db,
         target_datetime=now,
-        offset=offset,
+        offset=_get_week_offset(date, today=now.date()),
     )
 
     return lb_manager
 
 
+def _get_week_offset(date: dt.date, today: dt.date) -> int:
+    """Get the offset of the week of a date, from the week of today."""
+    return ((date - today).days - (7 - today.weekday())) // 7 + 1
+
+
+def _get_booking_conflict(
+    date_slots: dict[lb_m.SlotIdInt, lb_m.SlotStatusIdInt], slot_id: lb_m.SlotIdInt
+) -> t.Optional[str]:
+    """Get why a slot can't be booked by the user, or None if it can."""
+    target_slot_status = date_slots[slot_id]
+
+    if target_slot_status == lb_m.SlotsStatus.UNAVAILABLE.value:
+        return "Selected slot is unavailable."
+    if target_slot_status == lb_m.SlotsStatus.BOOKED_BY_USER.value:
+        return "Selected slot is already booked by user."
+    if target_slot_status == lb_m.SlotsStatus.BOOKED_BY_OTHER.value:
+        return "Selected slot is already booked by another user."
+    if lb_m.SlotsStatus.BOOKED_BY_USER.value in date_slots.values():
+        return "The user already has a booking for the same date."
+    if target_slot_status != lb_m.SlotsStatus.AVAILABLE.value:
+        return "Unexpected error."
+    return None
+
+
+def _get_unbooking_conflict(
+    date_slots: dict[lb_m.SlotIdInt, lb_m.SlotStatusIdInt], slot_id: lb_m.SlotIdInt
+) -> t.Optional[str]:
+    """Get why a slot can't be unbooked by the user, or None if it can."""
+    if date_slots[slot_id] != lb_m.SlotsStatus.BOOKED_BY_USER.value:
+        return "Cannot unbook this slot because it's not booked by the user."
+    return None
+
+
 @router.post("/book_slot")
 async def book_slot(
     req_body: BookSlotReqBody,
@@ -145,53 +879,24 @@ async def book_slot(
 
     # Get user data from the DB.
     token_data = auth.decode_token(token)
-    user_db = lb_user.User.get(
-        user_coll=lb_user_coll,
-        username=token_data.username,
-    )
+    user_db = await _get_user(token_data.username)
 
-    lb_manager = _get_week_for_booking_slot(
+    lb_manager = await _get_week_for_booking_slot(
         username=token_data.username,
         date=date,
         user_db=user_db,
     )
 
-    date = lb_dt_u.parse_date_from_string(req_body.date_str)
-    date_slots = lb_manager.week_slots[date]
-    slot_id = req_body.slot_id
-    target_slot_status = date_slots[slot_id]
-
-    if target_slot_status == lb_m.SlotsStatus.UNAVAILABLE.value:
-        raise fa.HTTPException(
-            status_code=fa.status.HTTP_409_CONFLICT,
-            detail="Selected slot is unavailable.",
-        )
-    if target_slot_status == lb_m.SlotsStatus.BOOKED_BY_USER.value:
-        raise fa.HTTPException(
-            status_code=fa.status.HTTP_409_CONFLICT,
-            detail="Selected slot is already booked by user.",
-        )
-    if target_slot_status == lb_m.SlotsStatus.BOOKED_BY_OTHER.value:
-        raise fa.HTTPException(
-            status_code=fa.status.HTTP_409_CONFLICT,
-            detail="Selected slot is already booked by another user.",
-        )
-    if lb_m.SlotsStatus.BOOKED_BY_USER.value in date_slots.values():
-        raise fa.HTTPException(
-            status_code=fa.status.HTTP_409_CONFLICT,
-            detail="The user already has a booking for the same date.",
-        )
-    if target_slot_status != lb_m.SlotsStatus.AVAILABLE.value:
-        raise fa.HTTPException(
-            status_code=fa.status.HTTP_409_CONFLICT,
-            detail="Unexpected error.",
-        )
+    date_slots = lb_manager.get_date_slots(date)
+    conflict = _get_booking_conflict(date_slots, req_body.slot_id)
+    if conflict is not None:
+        raise fa.HTTPException(status_code=fa.status.HTTP_409_CONFLICT, detail=conflict)
 
     # If here, the slot is actually available for the user, so we try to book it.
-    result = user_db.add_booking(
-        user_coll=lb_user_coll,
+    result = await _add_booking(
+        user_db=user_db,
         username=token_data.username,
-        date_str=req_body.date_str,
+        date_str=lb_dt_u.format_date_to_string(date),
         slot_id=req_body.slot_id,
     )
 
@@ -223,32 +928,23 @@ async def unbook_slot(
 
     # Get user data from the DB.
     token_data = auth.decode_token(token)
-    user_db = lb_user.User.get(
-        user_coll=lb_user_coll,
-        username=token_data.username,
-    )
+    user_db = await _get_user(token_data.username)
 
-    lb_manager = _get_week_for_booking_slot(
+    lb_manager = await _get_week_for_booking_slot(
         username=token_data.username,
         date=date,
         user_db=user_db,
     )
 
-    date = lb_dt_u.parse_date_from_string(req_body.date_str)
-    date_slots = lb_manager.week_slots[date]
-    slot_id = req_body.slot_id
-    target_slot_status = date_slots[slot_id]
-
-    if target_slot_status != lb_m.SlotsStatus.BOOKED_BY_USER.value:
-        raise fa.HTTPException(
-            status_code=fa.status.HTTP_409_CONFLICT,
-            detail="Cannot unbook this slot because it's not booked by the user.",
-        )
+    date_slots = lb_manager.get_date_slots(date)
+    conflict = _get_unbooking_conflict(date_slots, req_body.slot_id)
+    if conflict is not None:
+        raise fa.HTTPException(status_code=fa.status.HTTP_409_CONFLICT, detail=conflict)
 
-    result = user_db.delete_booking(
-        user_coll=lb_user_coll,
+    result = await _delete_booking(
+        user_db=user_db,
         username=token_data.username,
-        date_str=req_body.date_str,
+        date_str=lb_dt_u.format_date_to_string(date),
         slot_id=req_body.slot_id,
     )
 
@@ -259,3 +955,181 @@ async def unbook_slot(
         slot_id=req_body.slot_id,
         matched_count=str(result.matched_count),
     )
+
+
+class BatchItemResp(pyd.BaseModel):
+    """Model for the result of each item of a batch of bookings or unbookings."""
+
+    status_code: int
+    detail: t.Optional[str] = None
+    booking: t.Optional[BookSlotResp] = None
+
+
+async def _get_batch_dates_slots(
+    username: str,
+    user_db: lb_user.User,
+    dates: list[dt.date],
+) -> dict[dt.date, dict[lb_m.SlotIdInt, lb_m.SlotStatusIdInt]]:
+    """Get the slots of the dates of a batch, from a single snapshot of their weeks."""
+    now = dt.datetime.now()
+    offsets = sorted({_get_week_offset(date, today=now.date()) for date in dates})
+    lb_managers = await _init_lb_managers(
+        username=username,
+        user_db=user_db,
+        target_datetime=now,
+        offsets=offsets,
+    )
+    lb_manager_by_week = {
+        lb_manager.week_dates[0]: lb_manager for lb_manager in lb_managers
+    }
+    return {
+        date: lb_manager_by_week[lb_dt_u.get_week_start_date(date)].get_date_slots(date)
+        for date in dates
+    }
+
+
+async def _check_batch(
+    req_body: list[BookSlotReqBody],
+    username: str,
+    user_db: lb_user.User,
+    get_conflict: t.Callable[
+        [dict[lb_m.SlotIdInt, lb_m.SlotStatusIdInt], lb_m.SlotIdInt], t.Optional[str]
+    ],
+    new_status: lb_m.SlotStatusIdInt,
+) -> tuple[list[t.Optional[BatchItemResp]], list[tuple[int, dt.date]]]:
+    """Check the items of a batch against a single snapshot of the slots.
+
+    Returns:
+        The response of each rejected item (None for the rest), and the index and date
+        of the accepted ones.
+    """
+    if len(req_body) > MAX_SLOTS_PER_BATCH:
+        raise fa.HTTPException(
+            status_code=fa.status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many slots, the maximum is {MAX_SLOTS_PER_BATCH}.",
+        )
+
+    items_resp: list[t.Optional[BatchItemResp]] = [None] * len(req_body)
+    dates: list[t.Optional[dt.date]] = []
+    for i, item in enumerate(req_body):
+        try:
+            dates.append(lb_dt_u.parse_date_from_string(item.date_str))
+        except ValueError:
+            dates.append(None)
+            items_resp[i] = BatchItemResp(
+                status_code=fa.status.HTTP_400_BAD_REQUEST,
+                detail="Bad date format, please use YYYY-MM-DD.",
+            )
+
+    dates_slots = await _get_batch_dates_slots(
+        username=username,
+        user_db=user_db,
+        dates=[date for date in dates if date is not None],
+    )
+
+    accepted: list[tuple[int, dt.date]] = []
+    for i, (item, date) in enumerate(zip(req_body, dates)):
+        if date is None:
+            continue
+        conflict = get_conflict(dates_slots[date], item.slot_id)
+        if conflict is not None:
+            items_resp[i] = BatchItemResp(
+                status_code=fa.status.HTTP_409_CONFLICT, detail=conflict
+            )
+            continue
+        # The next items of the batch are checked with this one already applied.
+        dates_slots[date][item.slot_id] = new_status
+        accepted.append((i, date))
+
+    return items_resp, accepted
+
+
+@router.post("/book_slots")
+async def book_slots(
+    req_body: list[BookSlotReqBody],
+    token: str = fa.Depends(auth_router.oauth2_scheme),
+) -> list[BatchItemResp]:
+    """Book several slots at once, e.g. the same slot every week.
+
+    All the slots are checked against the same snapshot of their weeks, and the valid
+    ones are booked with a single bulk write. Each item gets its own result.
+    """
+    token_data = auth.decode_token(token)
+    user_db = await _get_user(token_data.username)
+
+    items_resp, accepted = await _check_batch(
+        req_body,
+        username=token_data.username,
+        user_db=user_db,
+        get_conflict=_get_booking_conflict,
+        new_status=lb_m.SlotsStatus.BOOKED_BY_USER.value,
+    )
+    if accepted:
+        exceptions, result = await _add_bookings(
+            user_db=user_db,
+            username=token_data.username,
+            slots=[
+                (lb_dt_u.format_date_to_string(date), req_body[i].slot_id)
+                for i, date in accepted
+            ],
+        )
+        for (i, _), exc in zip(accepted, exceptions):
+            if exc is not None:
+                items_resp[i] = BatchItemResp(
+                    status_code=exc.status_code, detail=exc.detail
+                )
+                continue
+            items_resp[i] = BatchItemResp(
+                status_code=fa.status.HTTP_200_OK,
+                booking=BookSlotResp(
+                    username=token_data.username,
+                    full_name=user_db.name,
+                    date=req_body[i].date_str,
+                    slot_id=req_body[i].slot_id,
+                    matched_count=str(
+                        t.cast(pym_res.UpdateResult, result).matched_count
+                    ),
+                ),
+            )
+
+    return t.cast(list[BatchItemResp], items_resp)
+
+
+@router.delete("/unbook_slots")
+async def unbook_slots(
+    req_body: list[BookSlotReqBody],
+    token: str = fa.Depends(auth_router.oauth2_scheme),
+) -> list[BatchItemResp]:
+    """Unbook several slots at once, with a single bulk write (like `book_slots`)."""
+    token_data = auth.decode_token(token)
+    user_db = await _get_user(token_data.username)
+
+    items_resp, accepted = await _check_batch(
+        req_body,
+        username=token_data.username,
+        user_db=user_db,
+        get_conflict=_get_unbooking_conflict,
+        new_status=lb_m.SlotsStatus.AVAILABLE.value,
+    )
+    if accepted:
+        result = await _delete_bookings(
+            user_db=user_db,
+            username=token_data.username,
+            slots=[
+                (lb_dt_u.format_date_to_string(date), req_body[i].slot_id)
+                for i, date in accepted
+            ],
+        )
+        for i, _ in accepted:
+            items_resp[i] = BatchItemResp(
+                status_code=fa.status.HTTP_200_OK,
+                booking=BookSlotResp(
+                    username=token_data.username,
+                    full_name=user_db.name,
+                    date=req_body[i].date_str,
+                    slot_id=req_body[i].slot_id,
+                    matched_count=str(result.matched_count),
+                ),
+            )
+
+    return t.cast(list[BatchItemResp], items_resp)
@@ -0,0 +1,94 @@
+"""Routes for the runtime statistics of the API."""
+import asyncio
+import hmac
+import os
+import typing as t
+
+import fastapi as fa
+
+from src import config, invalidation
+from src import slot_booking as lb
+from src.auth.utils import login_limit as auth_login_limit
+from src.auth.utils import password as auth_pwd
+from src.auth.utils import token as auth_token
+from src.mongodb import user_cache as m_user_cache
+from src.utils import profiling
+
+# Maximum number of profiles summarized at once in `get_profiles_stats`, each one is
+# loaded from its file.
+MAX_PROFILES_PER_REQUEST = 50
+
+router = fa.APIRouter(
+    prefix="/stats",
+    tags=["stats"],
+)
+
+
+@router.get("/password_pool")
+async def get_password_pool_stats() -> dict:
+    """Get the saturation metrics of the password hashing pool."""
+    return auth_pwd.pool.stats()
+
+
+@router.get("/login_limiter")
+async def get_login_limiter_stats() -> dict:
+    """Get the statistics of the admission control of the logins."""
+    return auth_login_limit.stats()
+
+
+@router.get("/week_cache")
+async def get_week_cache_stats() -> dict:
+    """Get the statistics of the cache of the week occupancy."""
+    return lb.week_occupancy_cache.stats()
+
+
+@router.get("/token_cache")
+async def get_token_cache_stats() -> dict:
+    """Get the statistics of the cache of verified tokens."""
+    return auth_token.token_cache.stats()
+
+
+@router.get("/slot_changes")
+async def get_slot_changes_stats() -> dict:
+    """Get the statistics of the subscriptions to the live slot changes."""
+    return lb.slot_changes_hub.stats()
+
+
+@router.get("/invalidation_bus")
+async def get_invalidation_bus_stats() -> dict:
+    """Get the statistics of the bus that invalidates the caches of all the workers."""
+    return invalidation.bus.stats()
+
+
+@router.get("/user_cache")
+async def get_user_cache_stats() -> dict:
+    """Get the statistics of the cache of the user profiles."""
+    return m_user_cache.user_cache.stats()
+
+
+@router.get("/profiles")
+async def get_profiles_stats(
+    count: int = fa.Query(default=20, ge=1, le=MAX_PROFILES_PER_REQUEST),
+    limit: int = fa.Query(default=30, ge=1, le=200),
+    sort: t.Literal["tottime", "cumtime"] = "tottime",
+    x_profile_token: t.Optional[str] = fa.Header(default=None),
+) -> dict:
+    """Get the hottest functions across the latest `count` profiled requests.
+
+    The profiles show the code of the API, so they're only sent to the requests with
+    the "X-Profile-Token" header of the profiling (a 404 for the rest, like when the
+    token is disabled).
+    """
+    if not config.PROFILING_HEADER_TOKEN or not hmac.compare_digest(
+        (x_profile_token or "").encode(), config.PROFILING_HEADER_TOKEN.encode()
+    ):
+        raise fa.HTTPException(status_code=fa.status.HTTP_404_NOT_FOUND)
+    paths = profiling.list_profiles(config.PROFILING_DIR)[:count]
+    loop = asyncio.get_running_loop()
+    top_functions = await loop.run_in_executor(
+        None, profiling.get_top_functions, paths, limit, sort
+    )
+    return {
+        "profiles": [os.path.basename(path) for path in paths],
+        "top_functions": top_functions,
+    }
@@ -0,0 +1,55 @@
+"""Fixtures to run the API in-process on top of an in-memory MongoDB."""
+import mongomock
+import mongomock_motor
+import pytest
+from fastapi import testclient
+
+from src import config, main, mongodb
+from src import slot_booking as lb
+from src.auth.utils import token as auth_token
+from src.mongodb import user_cache as m_user_cache
+from src.routers import auth_router
+from src.routers import slot_booking_router as lb_router
+
+
+@pytest.fixture(name="database")
+def fixture_database(request, monkeypatch):
+    """In-memory database that the routers use instead of MongoDB.
+
+    It's used through the "pymongo" driver, or "motor" when the fixture is parametrized
+    with it.
+    """
+    if getattr(request, "param", "pymongo") == "motor":
+        database = mongomock_motor.AsyncMongoMockClient()["dc_slot_booking"]
+        monkeypatch.setattr(mongodb, "IS_ASYNC", True)
+    else:
+        database = mongomock.MongoClient()["dc_slot_booking"]
+        monkeypatch.setattr(mongodb, "IS_ASYNC", False)
+    monkeypatch.setattr(config, "MONGO_WARMUP", False)
+    monkeypatch.setattr(auth_router, "user_coll", database["auth"])
+    monkeypatch.setattr(lb_router, "lb_user_coll", database["users"])
+    monkeypatch.setattr(lb_router, "lb_booking_coll", database["bookings"])
+    monkeypatch.setattr(lb_router, "lb_week_version_coll", database["week_versions"])
+    lb.week_occupancy_cache.clear()
+    m_user_cache.user_cache.clear()
+    yield database
+    lb.week_occupancy_cache.clear()
+    m_user_cache.user_cache.clear()
+
+
+@pytest.fixture(name="client")
+def fixture_client(database):  # pylint: disable=unused-argument
+    """Client of the API, started and stopped around the test."""
+    with testclient.TestClient(main.app) as client:
+        yield client
+
+
+def add_user(client: testclient.TestClient, username: str) -> dict[str, str]:
+    """Add a Slot Booking user and get the headers of its requests."""
+    token = auth_token.create_access_token(username).access_token
+    headers = {"Authorization": f"Bearer {token}"}
+    resp = client.post(
+        "/booking/add_user", json={"appartment": 1, "name": username}, headers=headers
+    )
+    assert resp.status_code == 200, resp.text
+    return headers
@@ -0,0 +1,86 @@
+"""Tests for the admission control of the logins."""
+import pytest
+
+from src.auth.utils import login_limit
+from src.utils import rate_limit as rl
+
+PASSWORD = "Sup3r-Secret-Passw0rd!"
+
+
+def _login(client, username: str, password: str = PASSWORD):
+    return client.post("/auth/login", data={"username": username, "password": password})
+
+
+@pytest.fixture(name="limits")
+def fixture_limits(client, monkeypatch):
+    """Registered users, and no login limit until the test sets them."""
+    monkeypatch.setattr(login_limit, "ip_limiter", None)
+    monkeypatch.setattr(login_limit, "username_limiter", None)
+    monkeypatch.setattr(login_limit, "verifications", None)
+    for username in ("dan", "eve"):
+        resp = client.post(
+            "/auth/register",
+            json={
+                "username": username,
+                "email": f"{username}@example.com",
+                "password": PASSWORD,
+            },
+        )
+        assert resp.status_code == 200, resp.text
+    return monkeypatch
+
+
+def test_failed_logins_are_limited_per_username(client, limits):
+    """Once the bucket of a username is empty, even its right password is refused."""
+    limits.setattr(
+        login_limit,
+        "username_limiter",
+        rl.TokenBucketLimiter(rate=1 / 60, burst=3, maxsize=10),
+    )
+    for _ in range(3):
+        assert _login(client, "dan", "wrong").status_code == 401
+
+    for password in ("wrong", PASSWORD):
+        resp = _login(client, "dan", password)
+        assert resp.status_code == 429, resp.text
+        assert 1 <= int(resp.headers["Retry-After"]) <= 60
+
+    # The other usernames have their own bucket.
+    assert _login(client, "eve").status_code == 200
+
+
+def test_logins_are_limited_per_ip(client, limits):
+    """The logins of a client IP are limited whatever the username."""
+    limits.setattr(
+        login_limit,
+        "ip_limiter",
+        rl.TokenBucketLimiter(rate=1 / 60, burst=2, maxsize=10),
+    )
+    assert _login(client, "dan", "wrong").status_code == 401
+    assert _login(client, "eve", "wrong").status_code == 401
+
+    resp = _login(client, "eve")
+    assert resp.status_code == 429, resp.text
+    assert "Retry-After" in resp.headers
+
+
+def test_verifications_are_limited_when_all_in_progress(client, limits):
+    """A login is refused while all the password verifications are in progress."""
+    verifications = rl.ConcurrencyLimiter(1)
+    limits.setattr(login_limit, "verifications", verifications)
+    assert verifications.try_acquire()
+
+    resp = _login(client, "dan")
+    assert resp.status_code == 429, resp.text
+    assert resp.headers["Retry-After"] == "1"
+
+    verifications.release()
+    assert _login(client, "dan", "wrong").status_code == 401
+    assert _login(client, "dan").status_code == 200
+    # The failed and the successful verifications gave their slot back.
+    assert verifications.stats() == {
+        "limit": 1,
+        "in_flight": 0,
+        "peak_in_flight": 1,
+        "rejected": 1,
+    }
@@ -0,0 +1,312 @@
+"""Tests for the Slot Booking routes."""
+import asyncio
+import datetime as dt
+
+import httpx
+import pytest
+from fastapi import testclient
+
+from src import config, main
+from src.auth.utils import token as auth_token
+from src.mongodb.models.slot_booking import week_version as lb_week_version
+from src.routers import slot_booking_router as lb_router
+from src.slot_booking.utils import datetime_utils as lb_dt_u
+
+from .conftest import add_user
+
+
+def _next_week_date(weekday: int) -> dt.date:
+    """Date of a weekday of next week (offset 1), whose slots aren't past."""
+    return lb_dt_u.get_week_dates(dt.datetime.now(), 1)[weekday]
+
+
+def test_get_week_reloads_cached_week_of_another_version(client, database):
+    """A week changed by another worker is reloaded before its new ETag is sent."""
+    headers = add_user(client, "dan")
+    first = client.get("/booking/get_week?offset=1", headers=headers)
+    date = _next_week_date(2)
+    assert first.json()[date.isoformat()]["1"] == 1
+
+    # Booked and bumped elsewhere, this worker didn't get the invalidation.
+    database["bookings"].insert_one(
+        {"date": date.isoformat(), "slot_id": 1, "username": "eve"}
+    )
+    lb_week_version.bump(database["week_versions"], _next_week_date(0))
+
+    second = client.get(
+        "/booking/get_week?offset=1",
+        headers={**headers, "If-None-Match": first.headers["ETag"]},
+    )
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.json()[date.isoformat()]["1"] == 2
+
+
+def test_refuses_to_start_before_the_bookings_migration(database, monkeypatch):
+    """The weeks aren't read from an empty bookings collection that isn't migrated."""
+    monkeypatch.setattr(config, "BOOKINGS_STORE", "collection")
+    database["users"].insert_one(
+        {"_id": "dan", "appartment": 1, "name": "Dan", "bookings": {"2022-12-07": 1}}
+    )
+    with pytest.raises(RuntimeError, match="migration"):
+        with testclient.TestClient(main.app):
+            pass
+
+    monkeypatch.setattr(config, "BOOKINGS_STORE", "embedded")
+    with testclient.TestClient(main.app) as client:
+        assert client.get("/").status_code == 200
+
+
+def test_book_slots_and_unbook_slots(client):
+    """Each item of a batch gets its own result, checked with the previous ones."""
+    headers = add_user(client, "dan")
+    monday, tuesday = (_next_week_date(i).isoformat() for i in (0, 1))
+
+    resp = client.post(
+        "/booking/book_slots",
+        json=[
+            {"date_str": monday, "slot_id": 1},
+            {"date_str": monday, "slot_id": 2},
+            {"date_str": tuesday, "slot_id": 3},
+            {"date_str": "not a date", "slot_id": 3},
+        ],
+        headers=headers,
+    )
+    assert resp.status_code == 200, resp.text
+    assert [item["status_code"] for item in resp.json()] == [200, 409, 200, 400]
+    week = client.get("/booking/get_week?offset=1", headers=headers).json()
+    assert (week[monday]["1"], week[monday]["2"], week[tuesday]["3"]) == (3, 1, 3)
+
+    resp = client.request(
+        "DELETE",
+        "/booking/unbook_slots",
+        json=[
+            {"date_str": monday, "slot_id": 1},
+            {"date_str": tuesday, "slot_id": 2},
+        ],
+        headers=headers,
+    )
+    assert resp.status_code == 200, resp.text
+    assert [item["status_code"] for item in resp.json()] == [200, 409]
+    week = client.get("/booking/get_week?offset=1", headers=headers).json()
+    assert (week[monday]["1"], week[tuesday]["3"]) == (1, 3)
+
+
+def test_unbook_slots_publishes_only_the_deleted_slots(client, database, monkeypatch):
+    """A slot already unbooked elsewhere isn't published as available again."""
+    headers = add_user(client, "dan")
+    monday, tuesday = (_next_week_date(i).isoformat() for i in (0, 1))
+    slots = [{"date_str": monday, "slot_id": 1}, {"date_str": tuesday, "slot_id": 1}]
+    resp = client.post("/booking/book_slots", json=slots, headers=headers)
+    assert [item["status_code"] for item in resp.json()] == [200, 200]
+
+    # Unbooked elsewhere, while this worker still has the week cached as booked.
+    client.get("/booking/get_week?offset=1", headers=headers)
+    database["bookings"].delete_one({"date": tuesday})
+    published = []
+
+    async def publish_slot_change(date_str, slot_id, username):
+        published.append((date_str, slot_id, username))
+
+    monkeypatch.setattr(lb_router, "_publish_slot_change", publish_slot_change)
+    resp = client.request(
+        "DELETE", "/booking/unbook_slots", json=slots, headers=headers
+    )
+    assert [item["status_code"] for item in resp.json()] == [200, 200]
+    assert published == [(monday, 1, None)]
+
+
+def test_get_weeks_matches_get_week(client):
+    """Each week of `get_weeks` is the week of `get_week` at its offset."""
+    headers = add_user(client, "dan")
+    for offset in (1, 2):
+        date_str = lb_dt_u.get_week_dates(dt.datetime.now(), offset)[3].isoformat()
+        resp = client.post(
+            "/booking/book_slot",
+            json={"date_str": date_str, "slot_id": offset},
+            headers=headers,
+        )
+        assert resp.status_code == 200, resp.text
+
+    resp = client.get("/booking/get_weeks?offset_from=0&count=4", headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == [
+        client.get(f"/booking/get_week?offset={offset}", headers=headers).json()
+        for offset in range(4)
+    ]
+
+
+def test_get_weeks_count_limit(client):
+    """At most `MAX_WEEKS_PER_REQUEST` weeks are returned at once."""
+    headers = add_user(client, "dan")
+    count = lb_router.MAX_WEEKS_PER_REQUEST
+    resp = client.get(f"/booking/get_weeks?count={count}", headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert len(resp.json()) == count
+
+    resp = client.get(f"/booking/get_weeks?count={count + 1}", headers=headers)
+    assert resp.status_code == 422
+
+
+@pytest.mark.parametrize("database", ["motor"], indirect=True)
+def test_booking_flow_with_motor(client):
+    """A user registers, logs in and books with the async driver."""
+    resp = client.post(
+        "/auth/register",
+        json={"username": "dan", "email": "dan@dc.com", "password": "secret"},
+    )
+    assert resp.status_code == 200, resp.text
+    resp = client.post("/auth/login", data={"username": "dan", "password": "secret"})
+    assert resp.status_code == 200, resp.text
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    resp = client.post(
+        "/booking/add_user", json={"appartment": 1, "name": "Dan"}, headers=headers
+    )
+    assert resp.status_code == 200, resp.text
+
+    monday, tuesday = (_next_week_date(i).isoformat() for i in (0, 1))
+    resp = client.post(
+        "/booking/book_slots",
+        json=[{"date_str": monday, "slot_id": 1}, {"date_str": tuesday, "slot_id": 2}],
+        headers=headers,
+    )
+    assert [item["status_code"] for item in resp.json()] == [200, 200]
+    resp = client.request(
+        "DELETE",
+        "/booking/unbook_slot",
+        json={"date_str": tuesday, "slot_id": 2},
+        headers=headers,
+    )
+    assert resp.status_code == 200, resp.text
+
+    week = client.get("/booking/get_week?offset=1", headers=headers).json()
+    assert (week[monday]["1"], week[tuesday]["2"]) == (3, 1)
+
+
+@pytest.mark.parametrize("contended", ["slot", "user"])
+@pytest.mark.parametrize("database", ["motor"], indirect=True)
+def test_concurrent_book_slot(client, database, monkeypatch, contended):
+    """Requests booking at once with the async driver: exactly one booking wins.
+
+    Either many users book the same slot, or a user books every slot of a date. They
+    all pass the checks against the same week, and the unique indexes pick the winner.
+    """
+    add_booking = lb_router._add_booking  # pylint: disable=protected-access
+    n_requests = 10
+    date_str = _next_week_date(2).isoformat()
+    if contended == "slot":
+        requests = [
+            (add_user(client, f"u{i}"), {"date_str": date_str, "slot_id": 2})
+            for i in range(n_requests)
+        ]
+    else:
+        headers = add_user(client, "dan")
+        requests = [
+            (headers, {"date_str": date_str, "slot_id": i % 5})
+            for i in range(n_requests)
+        ]
+
+    async def book_all() -> list[int]:
+        checked: list[None] = []
+        all_checked = asyncio.Event()
+
+        async def add_booking_once_all_checked(**kwargs):
+            checked.append(None)
+            if len(checked) == n_requests:
+                all_checked.set()
+            await all_checked.wait()
+            return await add_booking(**kwargs)
+
+        monkeypatch.setattr(lb_router, "_add_booking", add_booking_once_all_checked)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver"
+        ) as async_client:
+            responses = await asyncio.gather(
+                *(
+                    async_client.post(
+                        "/booking/book_slot", json=req_body, headers=headers
+                    )
+                    for headers, req_body in requests
+                )
+            )
+        return [resp.status_code for resp in responses]
+
+    status_codes = asyncio.run(book_all())
+
+    assert sorted(status_codes) == [200] + [409] * (n_requests - 1)
+    assert asyncio.run(database["bookings"].count_documents({})) == 1
+
+
+def test_get_week_not_modified(client):
+    """A matching "If-None-Match" gets a 304, with any of its forms."""
+    headers = add_user(client, "dan")
+    etag = client.get("/booking/get_week?offset=1", headers=headers).headers["ETag"]
+
+    for if_none_match in [etag, f"W/{etag}", "*", f'"other", {etag}']:
+        resp = client.get(
+            "/booking/get_week?offset=1",
+            headers={**headers, "If-None-Match": if_none_match},
+        )
+        assert resp.status_code == 304, if_none_match
+        assert resp.headers["ETag"] == etag
+        assert not resp.content
+    resp = client.get(
+        "/booking/get_week?offset=1", headers={**headers, "If-None-Match": '"other"'}
+    )
+    assert resp.status_code == 200
+
+
+def test_get_week_etag_per_user_and_format(client):
+    """The slots, and so the ETag, depend on the user and on the format."""
+    headers = add_user(client, "dan")
+    etags = {
+        client.get(url, headers=headers).headers["ETag"]
+        for url, headers in [
+            ("/booking/get_week?offset=1", headers),
+            ("/booking/get_week?offset=1&format=compact", headers),
+            ("/booking/get_week?offset=1", add_user(client, "eve")),
+        ]
+    }
+    assert len(etags) == 3
+
+
+def test_get_week_etag_changes_with_the_bookings(client):
+    """A booking and an unbooking change the ETag of the week."""
+    headers = add_user(client, "dan")
+    body = {"date_str": _next_week_date(2).isoformat(), "slot_id": 1}
+    etags = [client.get("/booking/get_week?offset=1", headers=headers).headers["ETag"]]
+
+    assert client.post("/booking/book_slot", json=body, headers=headers).is_success
+    etags.append(
+        client.get("/booking/get_week?offset=1", headers=headers).headers["ETag"]
+    )
+    resp = client.request("DELETE", "/booking/unbook_slot", json=body, headers=headers)
+    assert resp.is_success
+    etags.append(
+        client.get("/booking/get_week?offset=1", headers=headers).headers["ETag"]
+    )
+    assert len(set(etags)) == 3
+
+
+def test_add_user_with_embedded_bookings_changes_the_etag(client, monkeypatch):
+    """With the embedded store, a user added with bookings changes their weeks."""
+    monkeypatch.setattr(config, "BOOKINGS_STORE", "embedded")
+    headers = add_user(client, "eve")
+    first = client.get("/booking/get_week?offset=1", headers=headers)
+    date_str = _next_week_date(2).isoformat()
+
+    token = auth_token.create_access_token("dan").access_token
+    resp = client.post(
+        "/booking/add_user",
+        json={"appartment": 2, "name": "Dan", "bookings": {date_str: 1}},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert resp.status_code == 200, resp.text
+
+    second = client.get(
+        "/booking/get_week?offset=1",
+        headers={**headers, "If-None-Match": first.headers["ETag"]},
+    )
+    assert second.status_code == 200
+    assert second.json()[date_str]["1"] == 2
@@ -0,0 +1,85 @@
+"""Tests for the websocket of the live slot changes."""
+import datetime as dt
+
+import pytest
+from fastapi import websockets
+
+from src import slot_booking as lb
+from src.auth.utils import token as auth_token
+from src.slot_booking.utils import datetime_utils as lb_dt_u
+
+from .conftest import add_user
+
+
+def _next_week_date_str(weekday: int) -> str:
+    return lb_dt_u.get_week_dates(dt.datetime.now(), 1)[weekday].isoformat()
+
+
+def _connect(client, headers: dict[str, str]):
+    token = headers["Authorization"].removeprefix("Bearer ")
+    return client.websocket_connect(f"/booking/slot_changes?token={token}")
+
+
+def test_push_of_a_booking_by_another_user(client):
+    """A subscribed client gets the weeks, then the slots booked by others."""
+    dan_headers = add_user(client, "dan")
+    eve_headers = add_user(client, "eve")
+    date_str = _next_week_date_str(2)
+
+    with _connect(client, dan_headers) as websocket:
+        websocket.send_json({"offset_from": 1, "count": 1})
+        msg = websocket.receive_json()
+        assert (msg["type"], msg["offsets"]) == ("weeks", [1])
+        assert msg["weeks"][0][date_str]["1"] == 1
+
+        resp = client.post(
+            "/booking/book_slot",
+            json={"date_str": date_str, "slot_id": 1},
+            headers=eve_headers,
+        )
+        assert resp.status_code == 200, resp.text
+        assert websocket.receive_json() == {
+            "type": "changes",
+            "changes": [[date_str, 1, 2]],
+        }
+
+        websocket.send_json({"count": 100})
+        assert websocket.receive_json()["type"] == "error"
+
+
+@pytest.mark.parametrize("username", [None, "nobody"], ids=["bad token", "no user"])
+def test_refused_without_a_user(client, username):
+    """The connection is closed with a policy violation without a valid user."""
+    if username is None:
+        headers = {"Authorization": "Bearer not-a-token"}
+    else:
+        token = auth_token.create_access_token(username).access_token
+        headers = {"Authorization": f"Bearer {token}"}
+
+    with pytest.raises(websockets.WebSocketDisconnect) as exc_info:
+        with _connect(client, headers) as websocket:
+            websocket.receive_json()
+    assert exc_info.value.code == 1008
+
+
+def test_resync_after_an_overflow(client, monkeypatch):
+    """A client whose queue overflowed gets all the slots of its weeks again."""
+    monkeypatch.setattr(lb.slot_changes_hub, "max_queue", 1)
+    dan_headers = add_user(client, "dan")
+    eve_headers = add_user(client, "eve")
+    date_strs = [_next_week_date_str(weekday) for weekday in (2, 3)]
+
+    with _connect(client, dan_headers) as websocket:
+        websocket.send_json({"offset_from": 1, "count": 1})
+        assert websocket.receive_json()["type"] == "weeks"
+
+        # Both are published before the client gets the first one.
+        resp = client.post(
+            "/booking/book_slots",
+            json=[{"date_str": date_str, "slot_id": 1} for date_str in date_strs],
+            headers=eve_headers,
+        )
+        assert resp.status_code == 200, resp.text
+        msg = websocket.receive_json()
+        assert msg["type"] == "weeks"
+        assert [msg["weeks"][0][date_str]["1"] for date_str in date_strs] == [2, 2]
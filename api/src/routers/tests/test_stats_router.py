@@ -0,0 +1,27 @@
+"""Tests for the statistics routes."""
+import pytest
+
+from src import config
+
+
+@pytest.mark.parametrize(
+    "token, headers",
+    [("", {}), ("", {"X-Profile-Token": ""}), ("secret", {"X-Profile-Token": "guess"})],
+    ids=["disabled", "disabled with header", "wrong token"],
+)
+def test_profiles_refused_without_the_token(client, monkeypatch, token, headers):
+    """The profiles are hidden without the token of the profiling."""
+    monkeypatch.setattr(config, "PROFILING_HEADER_TOKEN", token)
+    assert client.get("/stats/profiles", headers=headers).status_code == 404
+
+
+def test_profiles_with_the_token(client, monkeypatch, tmp_path):
+    """The profiles are summarized for the requests with the token."""
+    monkeypatch.setattr(config, "PROFILING_HEADER_TOKEN", "secret")
+    monkeypatch.setattr(config, "PROFILING_DIR", str(tmp_path))
+    headers = {"X-Profile-Token": "secret"}
+
+    resp = client.get("/stats/profiles", headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == {"profiles": [], "top_functions": []}
+    assert client.get("/stats/profiles?count=51", headers=headers).status_code == 422
@@ -0,0 +1,99 @@
+"""Tests for the formats of the weeks of `get_week` and `get_weeks`."""
+import datetime as dt
+
+import pytest
+
+from src import config
+from src.routers import slot_booking_router as lb_router
+from src.slot_booking.utils import datetime_utils as lb_dt_u
+
+from .conftest import add_user
+
+
+def _from_compact(compact_week: dict) -> dict:
+    """Get the slots of a week in the compact format as in the default format."""
+    week_start = lb_dt_u.parse_date_from_string(compact_week["week_start"])
+    return {
+        (week_start + dt.timedelta(days=i)).isoformat(): {
+            str(slot_id): status
+            for slot_id, status in zip(compact_week["slot_ids"], date_statuses)
+        }
+        for i, date_statuses in enumerate(compact_week["statuses"])
+    }
+
+
+@pytest.fixture(name="headers")
+def fixture_headers(client):
+    """Headers of a user with a booking next week."""
+    headers = add_user(client, "dan")
+    date_str = lb_dt_u.get_week_dates(dt.datetime.now(), 1)[2].isoformat()
+    resp = client.post(
+        "/booking/book_slot", json={"date_str": date_str, "slot_id": 1}, headers=headers
+    )
+    assert resp.status_code == 200, resp.text
+    return headers
+
+
+def test_compact_format_has_the_same_slots(client, headers):
+    """The compact weeks decode to the weeks of the default format."""
+    default = client.get("/booking/get_weeks?count=3", headers=headers).json()
+    compact = client.get(
+        "/booking/get_weeks?count=3&format=compact", headers=headers
+    ).json()
+    assert any(3 in date_slots.values() for date_slots in default[1].values())
+    assert [_from_compact(week) for week in compact] == default
+
+    compact_week = client.get(
+        "/booking/get_week?offset=1&format=compact", headers=headers
+    ).json()
+    assert _from_compact(compact_week) == default[1]
+
+
+@pytest.mark.parametrize(
+    "accept, content_type",
+    [
+        (None, "application/json"),
+        ("application/json", "application/json"),
+        (lb_router.COMPACT_MEDIA_TYPE, lb_router.COMPACT_MEDIA_TYPE),
+        (
+            f"{lb_router.COMPACT_MEDIA_TYPE}, application/json;q=0.5",
+            lb_router.COMPACT_MEDIA_TYPE,
+        ),
+    ],
+)
+def test_content_type_by_accept(client, headers, accept, content_type):
+    """The compact format is also asked for with its media type."""
+    if accept is not None:
+        headers = {**headers, "Accept": accept}
+    for url in ("/booking/get_week?offset=1", "/booking/get_weeks?count=2"):
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200, resp.text
+        assert resp.headers["Content-Type"] == content_type
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, content_encoding",
+    [
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("br, gzip;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+    ],
+)
+def test_gzip_only_when_accepted(
+    client, headers, monkeypatch, accept_encoding, content_encoding
+):
+    """The compact weeks are compressed only for the clients that accept gzip."""
+    monkeypatch.setattr(config, "COMPACT_GZIP_MIN_SIZE", 1)
+    expected = client.get(
+        "/booking/get_weeks?count=2&format=compact",
+        headers={**headers, "Accept-Encoding": "identity"},
+    ).json()
+
+    resp = client.get(
+        "/booking/get_weeks?count=2&format=compact",
+        headers={**headers, "Accept-Encoding": accept_encoding},
+    )
+    assert resp.headers.get("Content-Encoding") == content_encoding
+    # The client decompresses the body.
+    assert resp.json() == expected
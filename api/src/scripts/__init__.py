@@ -0,0 +1,5 @@
+"""Command line scripts to maintain the DB.
+
+Run them from the `api` directory as modules, e.g.
+`python -m src.scripts.migrate_bookings`.
+"""
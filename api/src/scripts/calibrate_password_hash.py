@@ -0,0 +1,36 @@
+"""Pick the cost of the password hashes for a target verification time on this host.
+
+Run it on the hardware the API runs on, and set the printed PASSWORD_HASH_ROUNDS. The
+login latency is about the verification time (plus the wait for the password pool), and
+the users are rehashed with the new cost as they log in.
+"""
+import argparse
+
+from src import config
+from src.auth.utils import password as auth_pwd
+
+
+def main():
+    """Run the calibration."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scheme",
+        choices=config.PASSWORD_HASH_SCHEMES,
+        default=config.PASSWORD_HASH_SCHEME,
+    )
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250,
+        help="Maximum time of a verification, in milliseconds (default: 250).",
+    )
+    args = parser.parse_args()
+
+    rounds, duration = auth_pwd.calibrate_rounds(args.scheme, args.target_ms / 1000)
+    print(f"A verification takes {1000 * duration:.0f} ms with {rounds} rounds.")
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    print(f"PASSWORD_HASH_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Migrate the embedded `bookings` maps into the "slot_booking.bookings" collection.
+
+The migration path is:
+1. Deploy with `BOOKINGS_STORE=embedded`: new bookings are written to both the user
+   documents and the bookings collection, while weeks are still read from the former.
+2. Run this script (it can be run as many times as needed).
+3. Restart with `BOOKINGS_STORE=collection` (the default).
+
+The API refuses to start with `BOOKINGS_STORE=collection` while the bookings collection
+is empty and users still have embedded bookings, i.e. before the first step.
+"""
+from src import mongodb
+from src.mongodb.models.slot_booking import booking as lb_booking
+
+
+def main():
+    """Run the migration."""
+    # Scripts always use the synchronous driver, whatever the API is configured with.
+    mongo_db_conn = mongodb.MongoDBConnection()
+    mongo_db_conn.open_client()
+    user_coll = mongo_db_conn.get_coll(db_name="dc_slot_booking", coll_name="users")
+    booking_coll = mongo_db_conn.get_coll(
+        db_name="dc_slot_booking", coll_name="bookings"
+    )
+    inserted_count = lb_booking.migrate_from_embedded(
+        user_coll=user_coll, booking_coll=booking_coll
+    )
+    print(f"Migrated {inserted_count} bookings.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Import or export the residents of a building, with their bookings, in bulk.
+
+Onboard a building from a file instead of registering each resident through the API:
+
+    python -m src.scripts.residents import residents.csv
+    python -m src.scripts.residents export residents.ndjson
+
+The format is taken from the extension of the file ("-" is stdin or stdout, in NDJSON
+unless `--format` says otherwise). See `src.mongodb.residents` for the fields. An
+interrupted import is resumed by running it again.
+
+The caches of the running API workers are invalidated through the bus configured with
+INVALIDATION_BUS. With the "inprocess" bus they can't be reached, so the API must be
+restarted after an import.
+"""
+import argparse
+import asyncio
+import concurrent.futures as cf
+import contextlib
+import functools
+import os
+import sys
+import typing as t
+
+from src import config, invalidation, mongodb
+from src.mongodb import residents
+
+
+def _open(path: str, mode: str) -> t.ContextManager[t.TextIO]:
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin if mode == "r" else sys.stdout)
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def _get_format(path: str, fmt: t.Optional[str]) -> str:
+    if fmt is not None:
+        return fmt
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    return extension if extension in residents.FORMATS else "ndjson"
+
+
+def _get_invalidation_bus(
+    mongo_db_conn: mongodb.MongoDBConnection,
+) -> t.Optional[invalidation.InvalidationBus]:
+    """Get a bus to the API workers, None if they can't be reached (single worker)."""
+    if config.INVALIDATION_BUS == "ipc":
+        backend: invalidation.Backend = invalidation.UnixSocketBackend(
+            directory=config.INVALIDATION_BUS_DIR
+        )
+    elif config.INVALIDATION_BUS == "change_stream":
+        backend = invalidation.ChangeStreamBackend(
+            get_coll=lambda: mongo_db_conn.get_coll(
+                db_name="dc_slot_booking", coll_name="invalidations"
+            ),
+            is_async=False,
+        )
+    else:
+        return None
+    return invalidation.InvalidationBus(backend=backend)
+
+
+async def _import(
+    bus: t.Optional[invalidation.InvalidationBus], **kwargs: t.Any
+) -> residents.ImportResult:
+    """Run the import in a thread, and publish its invalidations on the bus."""
+    loop = asyncio.get_running_loop()
+    if bus is None:
+        return await loop.run_in_executor(
+            None, functools.partial(residents.import_residents, **kwargs)
+        )
+
+    def invalidate(topic: str, payload: dict):
+        asyncio.run_coroutine_threadsafe(bus.publish(topic, payload), loop).result()
+
+    await bus.start()
+    try:
+        return await loop.run_in_executor(
+            None,
+            functools.partial(
+                residents.import_residents, invalidate=invalidate, **kwargs
+            ),
+        )
+    finally:
+        await bus.stop()
+
+
+def main():
+    """Run the import or the export."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help='File to read or write, "-" for stdin/stdout.')
+    parser.add_argument("--format", choices=residents.FORMATS, default=None)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=residents.IMPORT_BATCH_SIZE,
+        help="Residents hashed and written at once.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes hashing the passwords of the import.",
+    )
+    args = parser.parse_args()
+    fmt = _get_format(args.path, args.format)
+
+    # Scripts always use the synchronous driver, whatever the API is configured with.
+    mongo_db_conn = mongodb.MongoDBConnection()
+    mongo_db_conn.open_client()
+    auth_coll = mongo_db_conn.get_coll(db_name="dc_slot_booking", coll_name="auth")
+    user_coll = mongo_db_conn.get_coll(db_name="dc_slot_booking", coll_name="users")
+
+    if args.command == "export":
+        with _open(args.path, "w") as file:
+            count = residents.write_records(
+                file,
+                fmt,
+                residents.export_residents(auth_coll, user_coll, args.batch_size),
+            )
+        print(f"Exported {count} residents.", file=sys.stderr)
+        return
+
+    booking_coll = mongo_db_conn.get_coll(
+        db_name="dc_slot_booking", coll_name="bookings"
+    )
+    week_version_coll = mongo_db_conn.get_coll(
+        db_name="dc_slot_booking", coll_name="week_versions"
+    )
+    bus = _get_invalidation_bus(mongo_db_conn)
+    if bus is None:
+        print(
+            'With INVALIDATION_BUS="inprocess" the caches of a running API worker '
+            "can't be invalidated, restart it after the import.",
+            file=sys.stderr,
+        )
+    with _open(args.path, "r") as file, cf.ProcessPoolExecutor(
+        max_workers=args.workers
+    ) as executor:
+        result = asyncio.run(
+            _import(
+                bus,
+                records=residents.read_records(file, fmt),
+                auth_coll=auth_coll,
+                user_coll=user_coll,
+                booking_coll=booking_coll,
+                week_version_coll=week_version_coll,
+                executor=executor,
+                batch_size=args.batch_size,
+            )
+        )
+    print(
+        f"Imported {result.imported} residents with {result.bookings} bookings, "
+        f"skipped {result.skipped} already imported.",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Move the past bookings embedded in the user documents into the booking history.
+
+Run it periodically (e.g. daily from a cron job), so the user documents only hold the
+present and future bookings. It can be run as many times as needed, and while the API
+is running: the profiles cached by the API workers may still hold the moved bookings
+until they expire, which changes nothing as past slots are unavailable anyway.
+"""
+import argparse
+import datetime as dt
+
+from src import config, mongodb
+from src.mongodb.models.slot_booking import history as lb_history
+from src.slot_booking.utils import datetime_utils as lb_dt_u
+
+
+def main():
+    """Run the rollover."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--before",
+        type=lb_dt_u.parse_date_from_string,
+        default=dt.date.today(),
+        help="Move the bookings of the dates before this one (default: today).",
+    )
+    args = parser.parse_args()
+
+    # Scripts always use the synchronous driver, whatever the API is configured with.
+    mongo_db_conn = mongodb.MongoDBConnection()
+    mongo_db_conn.open_client()
+    user_coll = mongo_db_conn.get_coll(db_name="dc_slot_booking", coll_name="users")
+    history_coll = mongo_db_conn.get_coll(
+        db_name="dc_slot_booking", coll_name="booking_history"
+    )
+    lb_history.create_indexes(history_coll, ttl_days=config.BOOKING_HISTORY_TTL_DAYS)
+    moved_count = lb_history.rollover(
+        user_coll=user_coll, history_coll=history_coll, before=args.before
+    )
+    print(f"Moved {moved_count} bookings before {args.before} to the history.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,4 @@
 """Package for slot booking logic."""
-from .slot_booking import SlotBookingManager
+from .occupancy import split_occupancy, split_weeks, week_occupancy_cache
+from .slot_booking import MultiResourceSlotBookingManager, SlotBookingManager
+from .slot_changes import SlotChangesHub, Subscription, slot_changes_hub
@@ -20,6 +20,21 @@ SlotsTakenDict = dict[dt.date, list[SlotIdInt]]
 
 WeekSlotsDict = dict[dt.date, dict[SlotIdInt, SlotStatusIdInt]]
 
+# Compact form of the statuses of the slots of a week: the date of its first day
+# ("YYYY-MM-DD"), the slot ids in order of start time, and for each day of the week the
+# statuses of its slots in that order.
+CompactWeekSlotsDict = t.TypedDict(
+    "CompactWeekSlotsDict",
+    {
+        "week_start": str,
+        "slot_ids": list[SlotIdInt],
+        "statuses": list[list[SlotStatusIdInt]],
+    },
+)
+
+# Username of the user that booked each slot of a week.
+WeekOccupancyDict = dict[dt.date, dict[SlotIdInt, str]]
+
 slots_hours: dict[SlotIdInt, SlotTimesDict] = {
     0: {"start_hour": 7, "end_hour": 10},
     1: {"start_hour": 10, "end_hour": 13},
@@ -28,6 +43,57 @@ slots_hours: dict[SlotIdInt, SlotTimesDict] = {
     4: {"start_hour": 19, "end_hour": 22},
 }
 
+# Id of a resource that can be booked (e.g. a washer or a dryer of a laundry room).
+ResourceId = str
+
+# Slots taken on each resource.
+ResourceSlotsTakenDict = dict[ResourceId, SlotsTakenDict]
+
+# Statuses of the slots of a week on each resource.
+ResourceWeekSlotsDict = dict[ResourceId, WeekSlotsDict]
+
+# Resource of the sites with a single machine, as the API only handles those so far.
+DEFAULT_RESOURCE: ResourceId = "0"
+
+
+class SlotTable(t.NamedTuple):
+    """Slots of a day: their ids sorted by start time, and when each starts."""
+
+    slot_ids: tuple[int, ...]
+    start_offsets: tuple[dt.timedelta, ...]
+
+
+def make_slot_table(slots_times: t.Mapping[int, SlotTimesDict]) -> SlotTable:
+    """Make the slot table of slots given by their start and end hours."""
+    slot_ids = sorted(
+        slots_times, key=lambda slot_id: slots_times[slot_id]["start_hour"]
+    )
+    return SlotTable(
+        slot_ids=tuple(slot_ids),
+        start_offsets=tuple(
+            dt.timedelta(hours=slots_times[slot_id]["start_hour"])
+            for slot_id in slot_ids
+        ),
+    )
+
+
+def make_uniform_slot_table(
+    first_start: dt.timedelta, last_end: dt.timedelta, duration: dt.timedelta
+) -> SlotTable:
+    """Make the slot table of back to back slots of the same duration, e.g. of 30 min."""
+    n_slots = (last_end - first_start) // duration
+    return SlotTable(
+        slot_ids=tuple(range(n_slots)),
+        start_offsets=tuple(first_start + i * duration for i in range(n_slots)),
+    )
+
+
+default_slot_table = make_slot_table(slots_hours)
+
+# Slot ids sorted by their start time, and the time since midnight at which each starts.
+slot_ids_by_start = t.cast(list[SlotIdInt], list(default_slot_table.slot_ids))
+slots_start_offsets: list[dt.timedelta] = list(default_slot_table.start_offsets)
+
 
 class SlotsStatus(e.Enum):
     """Enum for the statuses that each slot can have."""
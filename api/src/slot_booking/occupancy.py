@@ -0,0 +1,51 @@
+"""Occupancy of the weeks, i.e. the user that booked each slot.
+
+The occupancy only changes when someone books or unbooks a slot, so it's cached per week
+(keyed by the date of its monday) with the version of the week it was loaded for, and the
+cache entry is invalidated on every change.
+"""
+import datetime as dt
+
+from src import config
+from src.utils import cache
+
+from . import models as m
+from .utils import datetime_utils as dt_u
+
+week_occupancy_cache: cache.TTLCache[
+    dt.date, tuple[int, m.WeekOccupancyDict]
+] = cache.TTLCache(maxsize=config.WEEK_CACHE_SIZE, ttl=config.WEEK_CACHE_TTL)
+
+
+def split_occupancy(
+    occupancy: m.WeekOccupancyDict, username: str
+) -> tuple[m.SlotsTakenDict, m.SlotsTakenDict]:
+    """Split the occupancy into the slots booked by the user and the ones by others."""
+    booked_by_user: m.SlotsTakenDict = {}
+    booked_by_others: m.SlotsTakenDict = {}
+    for date, date_occupancy in occupancy.items():
+        for slot_id, slot_username in date_occupancy.items():
+            if slot_username == username:
+                taken_slots = booked_by_user
+            else:
+                taken_slots = booked_by_others
+            if date not in taken_slots:
+                taken_slots[date] = []
+            taken_slots[date].append(slot_id)
+
+    return booked_by_user, booked_by_others
+
+
+def split_weeks(
+    occupancy: m.WeekOccupancyDict, week_starts: list[dt.date]
+) -> dict[dt.date, m.WeekOccupancyDict]:
+    """Split the occupancy of several weeks into the occupancy of each week."""
+    weeks_occupancy: dict[dt.date, m.WeekOccupancyDict] = {
+        week_start: {} for week_start in week_starts
+    }
+    for date, date_occupancy in occupancy.items():
+        week_occupancy = weeks_occupancy.get(dt_u.get_week_start_date(date))
+        if week_occupancy is not None:
+            week_occupancy[date] = date_occupancy
+
+    return weeks_occupancy
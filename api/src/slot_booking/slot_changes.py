@@ -0,0 +1,126 @@
+"""Live changes of the slots, pushed to the subscribed clients.
+
+Clients subscribe to some weeks (keyed by the date of their monday), and every booking
+or unbooking of a slot of those weeks is put in the queue of each subscription, with the
+status of the slot as seen by its user. Publishing only touches the subscriptions of the
+week of the slot, so its cost doesn't depend on how many clients watch other weeks.
+
+Each queue is bounded: when a client doesn't keep up, its pending changes are dropped
+and the subscription is flagged to get a full snapshot of its weeks instead.
+
+Slots that become unavailable as time goes by aren't published, clients can tell them
+from the current time.
+"""
+import asyncio
+import datetime as dt
+import typing as t
+
+from src import config
+
+from . import models as m
+from .utils import datetime_utils as dt_u
+
+# A change of a slot, as (date "YYYY-MM-DD", slot id, new status id).
+SlotChange = tuple[str, m.SlotIdInt, m.SlotStatusIdInt]
+
+
+class Subscription:
+    """Subscription of a client of a user to the changes of some weeks."""
+
+    def __init__(self, username: str, max_queue: int):
+        self.username = username
+        self.week_starts: frozenset[dt.date] = frozenset()
+        self.changes: asyncio.Queue[SlotChange] = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def put(self, change: SlotChange) -> bool:
+        """Queue a change, or flag the subscription to resync if the queue is full."""
+        try:
+            self.changes.put_nowait(change)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+        return True
+
+    async def get_changes(self) -> list[SlotChange]:
+        """Wait for changes, and get all the ones queued so far at once."""
+        changes = [await self.changes.get()]
+        while not self.changes.empty():
+            changes.append(self.changes.get_nowait())
+        return changes
+
+
+class SlotChangesHub:
+    """Registry of the subscriptions of the clients connected to this worker."""
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._subscriptions: dict[dt.date, set[Subscription]] = {}
+        # Counters for the statistics.
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def subscribe(self, username: str) -> Subscription:
+        """Create a subscription of a user, still without weeks."""
+        return Subscription(username=username, max_queue=self.max_queue)
+
+    def set_weeks(self, subscription: Subscription, week_starts: t.Iterable[dt.date]):
+        """Replace the weeks a subscription receives the changes of."""
+        self.unsubscribe(subscription)
+        subscription.week_starts = frozenset(week_starts)
+        for week_start in subscription.week_starts:
+            self._subscriptions.setdefault(week_start, set()).add(subscription)
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop sending changes to a subscription."""
+        for week_start in subscription.week_starts:
+            week_subscriptions = self._subscriptions.get(week_start)
+            if week_subscriptions is None:
+                continue
+            week_subscriptions.discard(subscription)
+            if not week_subscriptions:
+                del self._subscriptions[week_start]
+        subscription.week_starts = frozenset()
+
+    def publish(self, date: dt.date, slot_id: m.SlotIdInt, username: t.Optional[str]):
+        """Publish that a slot was booked by `username`, or unbooked if it's `None`."""
+        self.published += 1
+        week_subscriptions = self._subscriptions.get(dt_u.get_week_start_date(date))
+        if not week_subscriptions:
+            return
+
+        date_str = dt_u.format_date_to_string(date)
+        if username is None:
+            change_for_user = change_for_others = (
+                date_str,
+                slot_id,
+                m.SlotsStatus.AVAILABLE.value,
+            )
+        else:
+            change_for_user = (date_str, slot_id, m.SlotsStatus.BOOKED_BY_USER.value)
+            change_for_others = (date_str, slot_id, m.SlotsStatus.BOOKED_BY_OTHER.value)
+
+        for subscription in week_subscriptions:
+            if subscription.username == username:
+                queued = subscription.put(change_for_user)
+            else:
+                queued = subscription.put(change_for_others)
+            if not queued:
+                self.overflows += 1
+        self.delivered += len(week_subscriptions)
+
+    def stats(self) -> dict:
+        """Get the statistics of the subscriptions."""
+        subscriptions = set().union(*self._subscriptions.values())
+        return {
+            "subscriptions": len(subscriptions),
+            "weeks": len(self._subscriptions),
+            "max_queue": self.max_queue,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+slot_changes_hub = SlotChangesHub(max_queue=config.SLOT_CHANGES_QUEUE_SIZE)
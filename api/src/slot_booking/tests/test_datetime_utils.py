@@ -0,0 +1,39 @@
+"""Tests for the datetime_utils module."""
+import datetime as dt
+
+import pytest
+
+from ..utils import datetime_utils as dt_u
+
+
+@pytest.mark.parametrize(
+    "date_str, expected",
+    [
+        ("2022-12-06", dt.date(2022, 12, 6)),
+        # Not zero padded, only accepted by strptime.
+        ("2022-1-5", dt.date(2022, 1, 5)),
+    ],
+)
+def test_parse_date_from_string(date_str, expected):
+    """Both the fast path and the strptime fallback parse the dates."""
+    assert dt_u.parse_date_from_string(date_str) == expected
+
+
+@pytest.mark.parametrize(
+    "date_str", ["2022-13-01", "2022-02-30", "06-12-2022", "2022-١٢-06", ""]
+)
+def test_parse_date_from_string_bad_format(date_str):
+    """Invalid dates still raise a ValueError."""
+    with pytest.raises(ValueError):
+        dt_u.parse_date_from_string(date_str)
+
+
+def test_parse_booking_map():
+    """The date strings are parsed, and formatted back as stored in the DB."""
+    taken_slots = dt_u.parse_booking_map({"2022-12-06": 1, "2022-12-07": 0})
+
+    assert taken_slots == {dt.date(2022, 12, 6): [1], dt.date(2022, 12, 7): [0]}
+    assert [dt_u.format_date_to_string(date) for date in taken_slots] == [
+        "2022-12-06",
+        "2022-12-07",
+    ]
@@ -0,0 +1,38 @@
+"""Tests for the occupancy module."""
+import datetime as dt
+
+from .. import occupancy
+
+
+def test_split_weeks():
+    """Each date goes to the week of its monday, sunday included."""
+    weeks_occupancy = occupancy.split_weeks(
+        {
+            dt.date(2022, 12, 5): {0: "dan"},
+            dt.date(2022, 12, 11): {1: "eve"},
+            dt.date(2022, 12, 12): {2: "dan"},
+            dt.date(2022, 12, 27): {3: "eve"},
+        },
+        week_starts=[
+            dt.date(2022, 12, 5),
+            dt.date(2022, 12, 12),
+            dt.date(2022, 12, 19),
+        ],
+    )
+    assert weeks_occupancy == {
+        dt.date(2022, 12, 5): {
+            dt.date(2022, 12, 5): {0: "dan"},
+            dt.date(2022, 12, 11): {1: "eve"},
+        },
+        dt.date(2022, 12, 12): {dt.date(2022, 12, 12): {2: "dan"}},
+        # A week without bookings is still there, and dates of other weeks are left out.
+        dt.date(2022, 12, 19): {},
+    }
+
+
+def test_split_weeks_empty():
+    """Every week is empty without bookings."""
+    assert occupancy.split_weeks({}, [dt.date(2022, 12, 5)]) == {
+        dt.date(2022, 12, 5): {}
+    }
+    assert occupancy.split_weeks({dt.date(2022, 12, 5): {0: "dan"}}, []) == {}
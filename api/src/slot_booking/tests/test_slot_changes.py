@@ -0,0 +1,56 @@
+"""Tests for the slot_changes module."""
+import asyncio
+import datetime as dt
+
+from .. import models as lbm
+from .. import slot_changes as sc
+
+MONDAY = dt.date(2022, 12, 5)
+
+
+def test_publish_to_subscribed_weeks():
+    """Each subscription of the week gets the status of the slot as seen by its user."""
+
+    async def run():
+        hub = sc.SlotChangesHub(max_queue=8)
+        alice, bob, carol = (hub.subscribe(name) for name in ("alice", "bob", "carol"))
+        hub.set_weeks(alice, [MONDAY])
+        hub.set_weeks(bob, [MONDAY, MONDAY + dt.timedelta(weeks=1)])
+        hub.set_weeks(carol, [MONDAY + dt.timedelta(weeks=1)])
+
+        hub.publish(MONDAY + dt.timedelta(days=1), slot_id=2, username="alice")
+        hub.publish(MONDAY + dt.timedelta(days=1), slot_id=2, username=None)
+
+        assert await alice.get_changes() == [
+            ("2022-12-06", 2, lbm.SlotsStatus.BOOKED_BY_USER.value),
+            ("2022-12-06", 2, lbm.SlotsStatus.AVAILABLE.value),
+        ]
+        assert await bob.get_changes() == [
+            ("2022-12-06", 2, lbm.SlotsStatus.BOOKED_BY_OTHER.value),
+            ("2022-12-06", 2, lbm.SlotsStatus.AVAILABLE.value),
+        ]
+        assert carol.changes.empty()
+
+        hub.unsubscribe(bob)
+        hub.publish(MONDAY, slot_id=0, username="carol")
+        assert bob.changes.empty()
+        assert hub.stats()["subscriptions"] == 2
+
+    asyncio.run(run())
+
+
+def test_overflowed_subscription_is_flagged():
+    """A client that falls behind is flagged to resync instead of blocking the rest."""
+
+    async def run():
+        hub = sc.SlotChangesHub(max_queue=2)
+        subscription = hub.subscribe("alice")
+        hub.set_weeks(subscription, [MONDAY])
+        for slot_id in range(3):
+            hub.publish(MONDAY, slot_id=slot_id, username="bob")
+
+        assert subscription.overflowed
+        assert len(await subscription.get_changes()) == 2
+        assert hub.stats()["overflows"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,105 @@
+"""Tests for the week_grid module."""
+import datetime as dt
+
+from .. import models as lbm
+from .. import slot_booking as lb
+from .. import week_grid as wg
+from ..utils import datetime_utils as dt_u
+
+MONDAY = dt.date(2022, 12, 5)
+
+
+def test_week_grid_statuses_precedence():
+    """Unavailable wins over booked by others, that wins over booked by the user."""
+    week_grid = wg.WeekGrid(dt_u.get_week_dates(dt_u.parse_date_to_datetime(MONDAY)))
+    tuesday = MONDAY + dt.timedelta(days=1)
+    week_grid.set_taken_slots(
+        {tuesday: [0, 1, 2]}, lbm.SlotsStatus.BOOKED_BY_USER.value
+    )
+    week_grid.set_taken_slots({tuesday: [1, 2]}, lbm.SlotsStatus.BOOKED_BY_OTHER.value)
+    week_grid.set_taken_slots({tuesday: [2]}, lbm.SlotsStatus.UNAVAILABLE.value)
+    # Dates outside the week are ignored.
+    week_grid.set_taken_slots({MONDAY - dt.timedelta(days=1): [0]}, 0)
+
+    assert week_grid.get_date_slots(tuesday) == {0: 3, 1: 2, 2: 0, 3: 1, 4: 1}
+    assert week_grid.get_date_slots(MONDAY) == {0: 1, 1: 1, 2: 1, 3: 1, 4: 1}
+
+
+def test_week_grid_many_slots_per_date():
+    """The past slots are found with the start offsets of any number of slots."""
+    slot_ids = list(range(48))
+    starts = [dt.timedelta(minutes=30 * i) for i in slot_ids]
+    week_dates = dt_u.get_week_dates(dt_u.parse_date_to_datetime(MONDAY))
+    week_grid = wg.WeekGrid(week_dates, slot_ids=slot_ids, slots_start_offsets=starts)
+    week_grid.set_past_slots(dt.datetime(2022, 12, 6, 9, 55))
+
+    week_slots = week_grid.to_week_slots()
+    assert set(week_slots[MONDAY].values()) == {0}
+    # On tuesday the slots that started at 9:30 or before are past.
+    assert [week_slots[MONDAY + dt.timedelta(days=1)][i] for i in (19, 20)] == [0, 1]
+    assert set(week_slots[MONDAY + dt.timedelta(days=2)].values()) == {1}
+
+
+def test_count_past_slots():
+    """The count only changes when a slot starts."""
+    week_dates = dt_u.get_week_dates(dt_u.parse_date_to_datetime(MONDAY))
+    n_slots = len(lbm.slots_start_offsets)
+
+    assert wg.count_past_slots(week_dates, dt.datetime(2022, 12, 4, 23)) == 0
+    # On tuesday the first slot started at 7:00.
+    assert wg.count_past_slots(week_dates, dt.datetime(2022, 12, 6, 7)) == n_slots + 1
+    assert wg.count_past_slots(week_dates, dt.datetime(2022, 12, 6, 9)) == n_slots + 1
+    assert wg.count_past_slots(week_dates, dt.datetime(2022, 12, 12)) == 7 * n_slots
+
+
+def test_multi_resource_manager():
+    """Each resource has its own bookings, and the past slots are past for all."""
+    slot_table = lbm.make_uniform_slot_table(
+        first_start=dt.timedelta(hours=7),
+        last_end=dt.timedelta(hours=22),
+        duration=dt.timedelta(minutes=30),
+    )
+    assert len(slot_table.slot_ids) == 30
+    tuesday = MONDAY + dt.timedelta(days=1)
+    wednesday = MONDAY + dt.timedelta(days=2)
+    manager = lb.MultiResourceSlotBookingManager(
+        target_datetime=dt.datetime(2022, 12, 6, 8, 15),
+        resources=["washer", "dryer"],
+        slot_table=slot_table,
+        slots_booked_by_user={"dryer": {wednesday: [29]}},
+        slots_booked_by_others={"washer": {wednesday: [0, 29]}},
+        slots_unavailable={"washer": {wednesday: [29]}},
+    )
+
+    assert manager.week_grid.statuses.shape == (2, 7, 30)
+    washer_slots = manager.get_resource_week_slots("washer")
+    dryer_slots = manager.get_resource_week_slots("dryer")
+    # On tuesday the slots that started at 8:00 or before are past, on both resources.
+    for week_slots in (washer_slots, dryer_slots):
+        assert [week_slots[tuesday][i] for i in range(4)] == [0, 0, 0, 1]
+    assert [washer_slots[wednesday][i] for i in (0, 1, 29)] == [2, 1, 0]
+    assert [dryer_slots[wednesday][i] for i in (0, 1, 29)] == [1, 1, 3]
+    assert manager.get_resources_week_slots() == {
+        "washer": washer_slots,
+        "dryer": dryer_slots,
+    }
+    assert manager.get_resource_date_slots("dryer", wednesday) == dryer_slots[wednesday]
+
+
+def test_compact_week_slots():
+    """The compact week has the same statuses, as a list per date in slot order."""
+    tuesday = MONDAY + dt.timedelta(days=1)
+    manager = lb.SlotBookingManager(
+        target_datetime=dt.datetime(2022, 12, 5, 12),
+        slots_booked_by_user={tuesday: [4]},
+        slots_booked_by_others={tuesday: [0]},
+    )
+
+    compact = manager.get_compact_week_slots()
+    assert compact["week_start"] == "2022-12-05"
+    assert compact["statuses"][1] == [2, 1, 1, 1, 3]
+    week_slots = manager.week_slots
+    assert [
+        dict(zip(compact["slot_ids"], date_statuses))
+        for date_statuses in compact["statuses"]
+    ] == list(week_slots.values())
@@ -1,14 +1,62 @@
 """Module with utilities for date parsing."""
 import datetime as dt
+import functools
+import typing as t
+
+from .. import models as m
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# Number of distinct date strings whose parsed date is memoized. A building only uses
+# a few hundred dates a year, so this holds years of bookings.
+DATE_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_iso_date(date_str: str) -> dt.date:
+    return dt.date.fromisoformat(date_str)
+
+
+def _is_iso_date(date_str: str) -> bool:
+    """Check if a string is strictly formatted as "YYYY-MM-DD"."""
+    return (
+        len(date_str) == 10
+        and date_str[4] == "-"
+        and date_str[7] == "-"
+        and date_str.isascii()
+        and date_str[:4].isdigit()
+        and date_str[5:7].isdigit()
+        and date_str[8:].isdigit()
+    )
 
 
 def parse_date_from_string(
-    date_str: str, format_specifier: str = "%Y-%m-%d"
+    date_str: str, format_specifier: str = DATE_FORMAT
 ) -> dt.date:
-    """Parse a date from a string to a date object."""
+    """Parse a date from a string to a date object.
+
+    Strings strictly formatted as "YYYY-MM-DD" (like the ones stored in the DB) take a
+    fast and memoized path, anything else is parsed with `strptime` so the same strings
+    are accepted and rejected (with a ValueError) as always.
+    """
+    if format_specifier == DATE_FORMAT and _is_iso_date(date_str):
+        return _parse_iso_date(date_str)
     return dt.datetime.strptime(date_str, format_specifier).date()
 
 
+def parse_booking_map(bookings: t.Mapping[str, m.SlotIdInt]) -> m.SlotsTakenDict:
+    """Parse a map of "YYYY-MM-DD" date strings to slot ids, like the embedded bookings."""
+    return {
+        parse_date_from_string(date_str): [slot_id]
+        for date_str, slot_id in bookings.items()
+    }
+
+
+def format_date_to_string(date: dt.date) -> str:
+    """Format a date as a "YYYY-MM-DD" string, like the ones stored in the DB."""
+    return date.strftime(DATE_FORMAT)
+
+
 def parse_datetime_from_string(
     datetime_str: str, format_specifier: str = "%Y-%m-%d %H:%M"
 ) -> dt.datetime:
@@ -25,6 +73,11 @@ def parse_date_to_datetime(date: dt.date) -> dt.datetime:
     )
 
 
+def get_week_start_date(date: dt.date) -> dt.date:
+    """Get the date of the monday of the week of a date."""
+    return date - dt.timedelta(days=date.weekday())
+
+
 def get_week_dates(target_datetime: dt.datetime, offset: int = 0) -> list[dt.date]:
     """Get the dates of a week from a date."""
     week_starting_date = (
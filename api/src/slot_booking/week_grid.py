@@ -0,0 +1,168 @@
+"""Statuses of the slots of a week, for any number of resources (e.g. machines)."""
+import bisect
+import datetime as dt
+import typing as t
+
+import numpy as np
+
+from . import models as m
+
+# Statuses that are set through masks, from the lowest to the highest precedence: a
+# slot with several of them set (e.g. a past slot booked by the user) has the last one.
+MASKED_STATUSES: tuple[m.SlotStatusIdInt, ...] = (
+    m.SlotsStatus.BOOKED_BY_USER.value,
+    m.SlotsStatus.BOOKED_BY_OTHER.value,
+    m.SlotsStatus.UNAVAILABLE.value,
+)
+
+
+def count_past_slots_by_date(
+    week_dates: list[dt.date],
+    target_datetime: dt.datetime,
+    slots_start_offsets: t.Sequence[dt.timedelta] = tuple(m.slots_start_offsets),
+) -> list[int]:
+    """Count the slots of each date that started before or at the target datetime."""
+    target_date = target_datetime.date()
+    n_past_slots = []
+    for date in week_dates:
+        if date < target_date:
+            n_past_slots.append(len(slots_start_offsets))
+        elif date == target_date:
+            time_since_midnight = target_datetime - dt.datetime.combine(date, dt.time())
+            n_past_slots.append(
+                bisect.bisect_right(slots_start_offsets, time_since_midnight)
+            )
+        else:
+            n_past_slots.append(0)
+    return n_past_slots
+
+
+def count_past_slots(
+    week_dates: list[dt.date],
+    target_datetime: dt.datetime,
+    slots_start_offsets: t.Sequence[dt.timedelta] = tuple(m.slots_start_offsets),
+) -> int:
+    """Count the slots of the week that started before or at the target datetime.
+
+    The statuses of the slots of a week only change with time when this count does.
+    """
+    return sum(
+        count_past_slots_by_date(week_dates, target_datetime, slots_start_offsets)
+    )
+
+
+class WeekGrid:
+    """Statuses of the slots of a week, as a (resources x dates x slots) array.
+
+    Each masked status has a boolean mask of the same shape, set with vectorized
+    assignments, and the statuses are resolved from the masks in a few array operations,
+    so the cost barely depends on the number of resources and slots. Slot `i` of a date
+    is the i-th one in order of start time. The slots are converted to a `WeekSlotsDict`
+    only when needed by the API.
+    """
+
+    def __init__(
+        self,
+        week_dates: list[dt.date],
+        slot_ids: t.Sequence[m.SlotIdInt] = tuple(m.slot_ids_by_start),
+        slots_start_offsets: t.Sequence[dt.timedelta] = tuple(m.slots_start_offsets),
+        n_resources: int = 1,
+    ):
+        self.week_dates = week_dates
+        self.slot_ids = list(slot_ids)
+        self.slots_start_offsets = slots_start_offsets
+        self.date_indexes = {date: i for i, date in enumerate(week_dates)}
+        self.slot_indexes = {slot_id: i for i, slot_id in enumerate(slot_ids)}
+        self.shape = (n_resources, len(week_dates), len(self.slot_ids))
+        self.masks: dict[m.SlotStatusIdInt, np.ndarray] = {
+            status: np.zeros(self.shape, dtype=bool) for status in MASKED_STATUSES
+        }
+        self._statuses: t.Optional[np.ndarray] = None
+
+    def set_taken_slots(
+        self,
+        taken_slots: m.SlotsTakenDict,
+        status: m.SlotStatusIdInt,
+        resource_index: int = 0,
+    ):
+        """Set a status to the taken slots of a resource that are in the week."""
+        self.set_resources_taken_slots({resource_index: taken_slots}, status)
+
+    def set_resources_taken_slots(
+        self,
+        resources_taken_slots: t.Mapping[int, m.SlotsTakenDict],
+        status: m.SlotStatusIdInt,
+    ):
+        """Set a status to the taken slots of several resources, by resource index.
+
+        The flat indexes of all the slots are gathered first, so the mask is set in a
+        single vectorized assignment.
+        """
+        _, n_dates, n_slots = self.shape
+        get_slot_index = self.slot_indexes.__getitem__
+        cell_indexes: list[int] = []
+        for resource_index, taken_slots in resources_taken_slots.items():
+            for date, slot_ids in taken_slots.items():
+                date_index = self.date_indexes.get(date)
+                if date_index is None:
+                    continue
+                first_cell_index = (resource_index * n_dates + date_index) * n_slots
+                cell_indexes.extend(
+                    map(first_cell_index.__add__, map(get_slot_index, slot_ids))
+                )
+        if cell_indexes:
+            self.masks[status].reshape(-1)[
+                np.fromiter(cell_indexes, dtype=np.intp, count=len(cell_indexes))
+            ] = True
+            self._statuses = None
+
+    def set_past_slots(self, target_datetime: dt.datetime):
+        """Set as unavailable the slots that started before or at the target datetime.
+
+        It's the same slots for all the resources.
+        """
+        n_past_slots = count_past_slots_by_date(
+            self.week_dates, target_datetime, self.slots_start_offsets
+        )
+        # Slot i of a date is past when i < the number of past slots of that date.
+        past_mask = np.arange(self.shape[2]) < np.array(n_past_slots)[:, np.newaxis]
+        self.masks[m.SlotsStatus.UNAVAILABLE.value] |= past_mask
+        self._statuses = None
+
+    @property
+    def statuses(self) -> np.ndarray:
+        """The status of each slot, of each date and resource."""
+        if self._statuses is None:
+            statuses = np.full(self.shape, m.SlotsStatus.AVAILABLE.value, dtype=np.int8)
+            for status in MASKED_STATUSES:
+                statuses[self.masks[status]] = status
+            self._statuses = statuses
+        return self._statuses
+
+    def get_date_slots(
+        self, date: dt.date, resource_index: int = 0
+    ) -> dict[m.SlotIdInt, m.SlotStatusIdInt]:
+        """Get the status of each slot of a date, on a resource."""
+        date_statuses = self.statuses[resource_index, self.date_indexes[date]]
+        return dict(zip(self.slot_ids, date_statuses.tolist()))
+
+    def to_week_slots(self, resource_index: int = 0) -> m.WeekSlotsDict:
+        """Get the status of each slot of each date of the week, on a resource."""
+        slot_ids = self.slot_ids
+        return {
+            date: dict(zip(slot_ids, date_statuses))
+            for date, date_statuses in zip(
+                self.week_dates, self.statuses[resource_index].tolist()
+            )
+        }
+
+    def to_compact_week_slots(self, resource_index: int = 0) -> m.CompactWeekSlotsDict:
+        """Get the statuses of the week on a resource, in the compact form.
+
+        No dict is built per date or slot, the statuses are converted as a whole.
+        """
+        return {
+            "week_start": self.week_dates[0].isoformat(),
+            "slot_ids": t.cast(list[m.SlotIdInt], self.slot_ids),
+            "statuses": self.statuses[resource_index].tolist(),
+        }
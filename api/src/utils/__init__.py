@@ -0,0 +1 @@
+"""Utilities shared by the packages of the API."""
@@ -0,0 +1,106 @@
+"""In-process cache with LRU eviction and a TTL."""
+import collections
+import threading
+import time
+import typing as t
+
+K = t.TypeVar("K")
+V = t.TypeVar("V")
+
+# Sentinel returned by `TTLCache.get` when the key is not cached (so `None` can be a
+# cached value).
+MISSING: t.Any = object()
+
+
+class TTLCache(t.Generic[K, V]):
+    """Cache with least-recently-used eviction and a time to live for every entry.
+
+    Invalidations bump a generation counter. A caller that loads a value from the DB can
+    take the generation before loading, and pass it to `set`: if anything was
+    invalidated in the meantime the value may already be stale, so it's not stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: t.Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.generation = 0
+        self._entries: collections.OrderedDict[
+            K, tuple[float, V]
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Counters for the statistics.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: K) -> V:
+        """Get a cached value, or `MISSING` if not cached or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= self.timer():
+                del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+        self,
+        key: K,
+        value: V,
+        generation: t.Optional[int] = None,
+        ttl: t.Optional[float] = None,
+    ):
+        """Cache a value, unless the cache was invalidated since `generation`."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: K):
+        """Remove a value from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self.generation += 1
+            self.invalidations += 1
+
+    def clear(self):
+        """Remove all the values from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Get the statistics of the cache, to size it."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
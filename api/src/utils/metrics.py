@@ -0,0 +1,180 @@
+"""Metrics in the Prometheus text format, with no dependencies.
+
+Each metric has a fixed set of label names, and keeps one series per combination of
+label values. Recording a value is a dict lookup and a few additions under a lock, so
+the metrics can be recorded on every request and DB command.
+"""
+import bisect
+import contextlib
+import math
+import threading
+import time
+import typing as t
+
+# Buckets (upper bounds in seconds) of the latency histograms.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+Labels = tuple[str, ...]
+
+
+def _format_labels(names: Labels, values: Labels) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base of the metrics, with its series by label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        """Get the lines of the metric in the Prometheus text format."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ] + self._render_series()
+
+    def _render_series(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Value that only goes up, e.g. a number of requests."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """Increment the series of some label values."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def _render_series(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in values
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. a number of requests in progress."""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1):
+        """Decrement the series of some label values."""
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(Metric):
+    """Distribution of values (e.g. durations in seconds) in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label values: count of each bucket (not cumulative, plus +Inf), and sum.
+        self._series: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        """Record a value in the series of some label values."""
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = (
+                    [0] * (len(self.buckets) + 1),
+                    [0],
+                )
+            series[0][bucket_index] += 1
+            series[1][0] += value
+
+    @contextlib.contextmanager
+    def time(self, *labelvalues: str) -> t.Iterator[None]:
+        """Record the duration of a block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def _render_series(self) -> list[str]:
+        with self._lock:
+            series = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._series.items()
+            ]
+        le_values = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        lines = []
+        for labels, counts, total in series:
+            pairs = _format_labels(self.labelnames, labels)[1:-1]
+            bucket_prefix = f"{self.name}_bucket{{{pairs + ',' if pairs else ''}le="
+            cumulative = 0
+            for le_value, count in zip(le_values, counts):
+                cumulative += count
+                lines.append(f'{bucket_prefix}"{le_value}"}} {cumulative}')
+            label_str = f"{{{pairs}}}" if pairs else ""
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Set of metrics exposed together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric, its name must be unique."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Get all the metrics in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+M = t.TypeVar("M", bound=Metric)
+
+
+def register(metric: M) -> M:
+    """Add a metric to the registry exposed by the API."""
+    registry.register(metric)
+    return metric
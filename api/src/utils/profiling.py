@@ -0,0 +1,130 @@
+"""Profiling of a sample of the requests with cProfile.
+
+Each profiled request is written as a pstats file in a directory, named after the time,
+method, path and duration of the request, so it can be opened with `pstats` or
+`snakeviz`. Only the latest profiles are kept, and their hottest functions can be
+summarized together.
+
+cProfile records everything running in the thread of the event loop while the request is
+handled, so concurrent requests show up in the profile too. Only one request is profiled
+at a time.
+"""
+import asyncio
+import contextlib
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import re
+import time
+import typing as t
+
+PROFILE_SUFFIX = ".prof"
+
+# Header that asks for the profiling of a request, its value must be the token.
+HEADER = b"x-profile-token"
+
+
+class ProfilingMiddleware:
+    """Profile a random sample of the requests, and the ones with the profiling header."""
+
+    def __init__(
+        self,
+        app: t.Any,
+        directory: str,
+        sample_rate: float,
+        header_token: str,
+        max_profiles: int,
+    ):
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header_token = header_token.encode()
+        self.max_profiles = max_profiles
+        self._profiling = False
+
+    async def __call__(self, scope: dict, receive: t.Callable, send: t.Callable):
+        if scope["type"] != "http" or self._profiling or not self._is_sampled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._profiling = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self._profiling = False
+            duration = time.perf_counter() - start
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._save, profiler, scope, duration
+            )
+
+    def _is_sampled(self, scope: dict) -> bool:
+        if self.header_token:
+            for name, value in scope["headers"]:
+                if name == HEADER:
+                    return hmac.compare_digest(value, self.header_token)
+        return random.random() < self.sample_rate
+
+    def _save(self, profiler: cProfile.Profile, scope: dict, duration: float):
+        os.makedirs(self.directory, exist_ok=True)
+        path_slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_")
+        name = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}-"
+            f"{scope['method']}-{path_slug or 'root'}-{duration * 1000:.0f}ms"
+        )
+        profiler.dump_stats(os.path.join(self.directory, name + PROFILE_SUFFIX))
+        for path in list_profiles(self.directory)[self.max_profiles :]:
+            # Another worker may have removed it already.
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+def list_profiles(directory: str) -> list[str]:
+    """Get the paths of the profiles in a directory, the latest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if name.endswith(PROFILE_SUFFIX)]
+    return [os.path.join(directory, name) for name in sorted(names, reverse=True)]
+
+
+def get_top_functions(
+    paths: t.Sequence[str], limit: int, sort: str = "tottime"
+) -> list[dict]:
+    """Get the hottest functions across some profiles.
+
+    Args:
+        paths (Sequence[str]): Paths of the profiles.
+        limit (int): Number of functions returned.
+        sort (str): "tottime" for the time spent in the functions themselves, or
+            "cumtime" for the time including the functions they call.
+
+    Returns:
+        functions (list[dict]): For each function: its location, its number of calls,
+            and its total and cumulative times in seconds, summed across the profiles.
+    """
+    stats = pstats.Stats()
+    for path in paths:
+        # The profile may have been removed since it was listed.
+        with contextlib.suppress(FileNotFoundError):
+            stats.add(path)
+    # Value of each function: (primitive calls, calls, tottime, cumtime, callers).
+    sort_index = 2 if sort == "tottime" else 3
+    entries = sorted(
+        stats.stats.items(),  # type: ignore[attr-defined]
+        key=lambda entry: entry[1][sort_index],
+        reverse=True,
+    )
+    return [
+        {
+            "function": pstats.func_std_string(func),
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for func, (_, calls, tottime, cumtime, _) in entries[:limit]
+    ]
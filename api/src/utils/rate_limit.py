@@ -0,0 +1,121 @@
+"""In-process rate limiting and concurrency limiting."""
+import collections
+import threading
+import time
+import typing as t
+
+K = t.TypeVar("K")
+
+
+class TokenBucketLimiter(t.Generic[K]):
+    """Token bucket per key: `burst` requests at once, refilled at `rate` per second.
+
+    The buckets are kept as the generic cell rate algorithm: a single float per key, the
+    time at which its bucket is full again. A full bucket is the same as no bucket, so
+    the keys are dropped once their bucket is full, and at most `maxsize` keys are kept
+    (the least recently limited ones are dropped first). Memory stays bounded when
+    flooded with distinct keys.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        maxsize: int,
+        timer: t.Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self.timer = timer
+        # Seconds to refill one token, and the whole bucket.
+        self.interval = 1 / rate
+        self.capacity = burst * self.interval
+        self._full_at: collections.OrderedDict[K, float] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Counters for the statistics.
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def acquire(self, key: K) -> float:
+        """Take a token from the bucket of a key.
+
+        Returns:
+            0 if a token was taken, otherwise the seconds until one is available.
+        """
+        with self._lock:
+            now = self.timer()
+            self._expire(now)
+            full_at = max(self._full_at.get(key, now), now) + self.interval
+            retry_after = full_at - now - self.capacity
+            if retry_after > 0:
+                self.limited += 1
+                return retry_after
+            self._full_at[key] = full_at
+            self._full_at.move_to_end(key)
+            while len(self._full_at) > self.maxsize:
+                self._full_at.popitem(last=False)
+                self.evictions += 1
+            self.allowed += 1
+            return 0.0
+
+    def _expire(self, now: float):
+        # The least recently limited keys come first, stop at the first one not full.
+        while self._full_at:
+            key, full_at = next(iter(self._full_at.items()))
+            if full_at > now:
+                return
+            del self._full_at[key]
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def stats(self) -> dict:
+        """Get the statistics of the limiter."""
+        return {
+            "size": len(self._full_at),
+            "maxsize": self.maxsize,
+            "rate": self.rate,
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evictions": self.evictions,
+        }
+
+
+class ConcurrencyLimiter:
+    """Limit the number of operations in progress at the same time.
+
+    Meant for the event loop: an operation that can't start right away is rejected
+    instead of queued.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        # Counters for the statistics.
+        self.peak_in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        """Start an operation if below the limit, `release` must be called after it."""
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return True
+
+    def release(self):
+        """End an operation started with `try_acquire`."""
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Get the statistics of the limiter."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "rejected": self.rejected,
+        }
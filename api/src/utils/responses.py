@@ -0,0 +1,50 @@
+"""JSON responses serialized with orjson, and gzip-compressed when worth it."""
+import gzip
+import typing as t
+
+import fastapi as fa
+import orjson
+
+# Compression level of the responses: the larger levels barely shrink the small JSON
+# payloads of the API, for a lot more CPU.
+GZIP_LEVEL = 6
+
+
+def accepts_gzip(accept_encoding: t.Optional[str]) -> bool:
+    """Check if an "Accept-Encoding" header allows gzip."""
+    if not accept_encoding:
+        return False
+    qualities: dict[str, float] = {}
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    # A quality of 0 means the coding is refused, "gzip" takes precedence over "*".
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def json_response(
+    content: t.Any,
+    media_type: str = "application/json",
+    accept_encoding: t.Optional[str] = None,
+    gzip_min_size: int = 1024,
+    headers: t.Optional[t.Mapping[str, str]] = None,
+) -> fa.Response:
+    """Serialize content that orjson handles natively, without `jsonable_encoder`.
+
+    The body is gzip-compressed when it's at least `gzip_min_size` bytes and the client
+    accepts it (a `gzip_min_size` of 0 disables the compression).
+    """
+    body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    response_headers = dict(headers or {})
+    if 0 < gzip_min_size <= len(body) and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        response_headers["Content-Encoding"] = "gzip"
+    return fa.Response(content=body, media_type=media_type, headers=response_headers)
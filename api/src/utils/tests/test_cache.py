@@ -0,0 +1,44 @@
+"""Tests for the cache module."""
+from .. import cache
+
+
+class FakeTimer:
+    """Timer that only moves forward when told so."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expiration_and_eviction():
+    """Entries expire after the TTL and the least recently used one is evicted."""
+    timer = FakeTimer()
+    ttl_cache: cache.TTLCache[str, int] = cache.TTLCache(maxsize=2, ttl=10, timer=timer)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    assert ttl_cache.get("a") == 1
+    # "b" is now the least recently used one.
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("b") is cache.MISSING
+    assert ttl_cache.get("c") == 3
+
+    timer.now = 10
+    assert ttl_cache.get("a") is cache.MISSING
+
+    stats = ttl_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
+    assert stats["size"] == 1
+
+
+def test_ttl_cache_invalidation_during_load():
+    """A value loaded before an invalidation isn't cached."""
+    ttl_cache: cache.TTLCache[str, int] = cache.TTLCache(maxsize=2, ttl=10)
+    generation = ttl_cache.generation
+    ttl_cache.invalidate("a")
+    ttl_cache.set("a", 1, generation=generation)
+    assert ttl_cache.get("a") is cache.MISSING
+
+    ttl_cache.set("a", 2, generation=ttl_cache.generation)
+    assert ttl_cache.get("a") == 2
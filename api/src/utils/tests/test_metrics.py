@@ -0,0 +1,52 @@
+"""Tests for the metrics module."""
+import fastapi as fa
+from fastapi import testclient
+
+from src import main
+
+from .. import metrics
+
+
+def test_histogram_render():
+    """Buckets are cumulative, with the sum and count of each series."""
+    registry = metrics.Registry()
+    histogram = registry.register(
+        metrics.Histogram("op_seconds", "Op.", ("op",), buckets=(0.1, 1))
+    )
+    histogram.observe(0.05, "read")
+    histogram.observe(0.5, "read")
+    histogram.observe(2, "read")
+    with histogram.time('wr"ite'):
+        pass
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP op_seconds Op.", "# TYPE op_seconds histogram"]
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{op="read",le="1"} 2' in lines
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 3' in lines
+    assert 'op_seconds_sum{op="read"} 2.55' in lines
+    assert 'op_seconds_count{op="read"} 3' in lines
+    assert 'op_seconds_bucket{op="wr\\"ite",le="0.1"} 1' in lines
+
+
+def test_metrics_middleware_labels_by_route():
+    """Requests are labelled by route template, and unknown paths share one label."""
+    app = fa.FastAPI()
+    app.add_middleware(main.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    client = testclient.TestClient(app)
+    before = main.request_duration.render()
+    for item_id in range(3):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    assert client.get("/nowhere/1").status_code == 404
+
+    lines = set(main.request_duration.render()) - set(before)
+    prefix = "http_request_duration_seconds_count"
+    assert (
+        f'{prefix}{{method="GET",route="/items/{{item_id}}",status="200"}} 3' in lines
+    )
+    assert f'{prefix}{{method="GET",route="<unmatched>",status="404"}} 1' in lines
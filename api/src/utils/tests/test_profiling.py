@@ -0,0 +1,43 @@
+"""Tests for the profiling module."""
+import fastapi as fa
+from fastapi import testclient
+
+from .. import profiling
+
+TOKEN = "secret"
+
+
+def busy_function() -> int:
+    """Function that shows up in the profiles."""
+    return sum(i * i for i in range(10000))
+
+
+def test_profiling_on_demand(tmp_path):
+    """Only the requests with the right header are profiled, and the latest are kept."""
+    app = fa.FastAPI()
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        directory=str(tmp_path),
+        sample_rate=0,
+        header_token=TOKEN,
+        max_profiles=2,
+    )
+
+    @app.get("/busy")
+    async def busy():
+        return busy_function()
+
+    client = testclient.TestClient(app)
+    client.get("/busy")
+    client.get("/busy", headers={"X-Profile-Token": "wrong"})
+    assert profiling.list_profiles(str(tmp_path)) == []
+
+    for _ in range(3):
+        client.get("/busy", headers={"X-Profile-Token": TOKEN})
+    paths = profiling.list_profiles(str(tmp_path))
+    assert len(paths) == 2
+    assert all("-GET-busy-" in path for path in paths)
+
+    top_functions = profiling.get_top_functions(paths, limit=100, sort="cumtime")
+    busy_stats = [f for f in top_functions if f["function"].endswith("(busy_function)")]
+    assert busy_stats and busy_stats[0]["calls"] == 2
@@ -0,0 +1,61 @@
+"""Tests for the rate limiting module."""
+import pytest
+
+from .. import rate_limit as rl
+
+
+class FakeTimer:
+    """Clock moved by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_burst_and_refill():
+    """A burst is allowed at once, then one request per refilled token."""
+    timer = FakeTimer()
+    limiter = rl.TokenBucketLimiter(rate=2, burst=3, maxsize=10, timer=timer)
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    # Other keys have their own bucket.
+    assert limiter.acquire("b") == 0
+
+    timer.now += 0.5
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    assert limiter.stats()["limited"] == 2
+
+
+def test_token_bucket_state_is_bounded():
+    """Full buckets are dropped, and at most `maxsize` keys are kept."""
+    timer = FakeTimer()
+    limiter = rl.TokenBucketLimiter(rate=1, burst=2, maxsize=100, timer=timer)
+
+    for i in range(1000):
+        limiter.acquire(f"10.0.{i // 256}.{i % 256}")
+    assert len(limiter) == 100
+    assert limiter.stats()["evictions"] == 900
+
+    # All the buckets are full again after `burst / rate` seconds.
+    timer.now += 2
+    limiter.acquire("10.1.0.0")
+    assert len(limiter) == 1
+
+
+def test_concurrency_limiter():
+    """Operations beyond the limit are rejected until one is released."""
+    limiter = rl.ConcurrencyLimiter(limit=2)
+
+    assert [limiter.try_acquire() for _ in range(3)] == [True, True, False]
+    limiter.release()
+    assert limiter.try_acquire()
+    assert limiter.stats() == {
+        "limit": 2,
+        "in_flight": 2,
+        "peak_in_flight": 2,
+        "rejected": 1,
+    }
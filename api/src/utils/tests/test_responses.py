@@ -0,0 +1,39 @@
+"""Tests for the responses module."""
+import gzip
+
+import orjson
+import pytest
+
+from .. import responses
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, False),
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.5", True),
+        ("gzip;q=0", False),
+        ("*", True),
+        ("gzip;q=0, *", False),
+        ("identity", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding, expected):
+    """The gzip coding is accepted explicitly or with "*", unless its quality is 0."""
+    assert responses.accepts_gzip(accept_encoding) is expected
+
+
+def test_json_response_gzip_threshold():
+    """Only the bodies of at least `gzip_min_size` bytes are compressed."""
+    content = {"statuses": [[0, 1, 2, 3, 0]] * 50}
+    body = orjson.dumps(content)
+
+    small = responses.json_response(content, "application/json", "gzip", len(body) + 1)
+    assert small.body == body
+    assert "content-encoding" not in small.headers
+
+    large = responses.json_response(content, "application/json", "gzip", len(body))
+    assert large.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(large.body) == body
+    assert len(large.body) < len(body)